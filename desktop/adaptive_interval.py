@@ -0,0 +1,157 @@
+"""
+Adaptive reporting interval
+Slows reporting down while metrics are flat and speeds it up on changes, alerts and AC power
+"""
+
+
+class AdaptiveInterval:
+    """Picks the next reporting interval from the latest snapshot"""
+
+    # Change since the last significant snapshot that counts as "something happened"
+    DEFAULT_THRESHOLDS = {
+        "cpu_percent": 15,
+        "memory_percent": 5,
+        "disk_percent": 1,
+        "battery_percent": 3,
+        "net_bytes_per_sec": 1_000_000,
+        "temperature": 5,
+    }
+
+    # Same limits the server uses for warning alerts (battery is a lower bound).
+    # Disk usage is left out: a nearly full disk stays that way for days, and
+    # growth is already caught by its change threshold.
+    DEFAULT_ALERT_LIMITS = {
+        "cpu_percent": 75,
+        "memory_percent": 80,
+        "temperature": 75,
+        "battery_percent": 20,
+    }
+
+    def __init__(self, min_interval=5, max_interval=120, initial=None, growth=1.5,
+                 battery_factor=2.0, thresholds=None, alert_limits=None):
+        """
+        Initialize adaptive interval
+
+        Args:
+            min_interval: Fastest reporting interval in seconds (default: 5)
+            max_interval: Slowest reporting interval in seconds (default: 120)
+            initial: Interval to start from (default: min_interval)
+            growth: Factor the interval grows by per flat snapshot (default: 1.5)
+            battery_factor: Factor the interval is stretched by on battery (default: 2.0)
+            thresholds: Overrides for DEFAULT_THRESHOLDS
+            alert_limits: Overrides for DEFAULT_ALERT_LIMITS
+        """
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.growth = growth
+        self.battery_factor = battery_factor
+        self.thresholds = dict(self.DEFAULT_THRESHOLDS, **(thresholds or {}))
+        self.alert_limits = dict(self.DEFAULT_ALERT_LIMITS, **(alert_limits or {}))
+        self.current = self._clamp(initial or min_interval)
+        self.reference = None  # Metrics at the last significant change
+        self.reason = None
+
+    def _clamp(self, interval):
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def reset(self, interval=None):
+        """Start over from `interval` (e.g., after an update_interval command)"""
+        self.current = self._clamp(interval or self.min_interval)
+        self.reference = None
+
+    @staticmethod
+    def extract(data):
+        """Pull the compared metrics out of a get_all_data() snapshot"""
+        metrics = {}
+        cpu = data.get("cpu_info") or {}
+        stats = data.get("interval_stats") or {}
+        # Peak between reports catches spikes the instantaneous value misses
+        peak = (stats.get("cpu_percent") or {}).get("max")
+        if cpu.get("cpu_usage_percent") is not None:
+            metrics["cpu_percent"] = max(cpu["cpu_usage_percent"], peak or 0)
+
+        memory = data.get("memory_info") or {}
+        if memory.get("percent") is not None:
+            metrics["memory_percent"] = memory["percent"]
+
+        disks = data.get("disk_info") or []
+        if disks:
+            metrics["disk_percent"] = max(disk["percent"] for disk in disks)
+
+        network = data.get("network_info") or {}
+        rates = [network.get("bytes_sent_per_sec"), network.get("bytes_received_per_sec")]
+        if any(rate is not None for rate in rates):
+            metrics["net_bytes_per_sec"] = sum(rate or 0 for rate in rates)
+
+        temperatures = [
+            sensor["current"]
+            for sensors in (data.get("temperature_info") or {}).values()
+            for sensor in sensors
+            if sensor.get("current") is not None
+        ]
+        if temperatures:
+            metrics["temperature"] = max(temperatures)
+
+        battery = data.get("battery_info") or {}
+        if battery.get("percent") is not None:
+            metrics["battery_percent"] = battery["percent"]
+        return metrics
+
+    def alerting(self, metrics, on_battery):
+        """Metrics currently past an alert limit"""
+        alerts = [
+            name for name, limit in self.alert_limits.items()
+            if name != "battery_percent" and metrics.get(name, 0) > limit
+        ]
+        if on_battery and metrics.get("battery_percent", 100) < self.alert_limits["battery_percent"]:
+            alerts.append("battery_percent")
+        return alerts
+
+    def changed(self, metrics):
+        """Metrics that moved past their threshold since the reference snapshot"""
+        if self.reference is None:
+            return []
+        return [
+            name for name, threshold in self.thresholds.items()
+            if name in metrics and name in self.reference
+            and abs(metrics[name] - self.reference[name]) >= threshold
+        ]
+
+    def update(self, data):
+        """
+        Choose the interval until the next report
+
+        Args:
+            data: Snapshot returned by LaptopMonitor.get_all_data()
+
+        Returns:
+            Seconds to wait before the next report
+        """
+        metrics = self.extract(data)
+        battery = data.get("battery_info") or {}
+        on_battery = battery.get("plugged_in") is False
+
+        alerts = self.alerting(metrics, on_battery)
+        changes = self.changed(metrics)
+        if alerts:
+            # Report as often as allowed while something is wrong, even on battery
+            self.current = self.min_interval
+            self.reference = metrics
+            self.reason = f"alert: {', '.join(alerts)}"
+            return self.current
+
+        if changes:
+            self.current = self.min_interval
+            self.reference = metrics
+            self.reason = f"changed: {', '.join(changes)}"
+        elif self.reference is None:
+            self.reference = metrics
+            self.reason = "first snapshot"
+        else:
+            self.current = self._clamp(self.current * self.growth)
+            self.reason = "flat"
+
+        if on_battery:
+            self.reason += ", on battery"
+            return round(self._clamp(self.current * self.battery_factor), 1)
+        return round(self.current, 1)
@@ -0,0 +1,28 @@
+"""
+Agent data folder
+Per-user location for the spool, local history and startup cache, so the agent
+never writes into whatever folder it happened to be started from
+"""
+import os
+import sys
+
+
+def data_dir():
+    """Platform app-data folder for the agent (not created here)"""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser(os.path.join("~", "AppData", "Local"))
+        return os.path.join(base, "LaptopMonitor")
+    if sys.platform == "darwin":
+        return os.path.expanduser(os.path.join("~", "Library", "Application Support", "LaptopMonitor"))
+    base = os.environ.get("XDG_DATA_HOME") or os.path.expanduser(os.path.join("~", ".local", "share"))
+    return os.path.join(base, "laptop-monitor")
+
+
+def data_path(name):
+    """Absolute path of `name` inside the agent data folder"""
+    return os.path.join(data_dir(), name)
+
+
+def ensure_parent(path):
+    """Create the folder that will hold `path`"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
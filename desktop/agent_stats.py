@@ -0,0 +1,188 @@
+"""
+Agent self-instrumentation
+Tracks the client's own collection time, HTTP cost and process footprint
+"""
+import os
+import threading
+import time
+
+import psutil
+
+
+class EndpointStats:
+    """Request counters for one server endpoint"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.seconds_total = 0.0
+        self.last_seconds = None
+
+
+class AgentStats:
+    """Accumulates the agent's own costs for reports and the metrics endpoint"""
+
+    def __init__(self):
+        self.process = psutil.Process(os.getpid())
+        self.started = time.monotonic()
+        self.endpoints = {}  # endpoint name -> EndpointStats
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.retries = 0
+        self.collections = 0
+        self.collect_seconds_total = 0.0
+        self.last_collect_seconds = None
+        self.collector_seconds = {}  # collector name -> duration of its latest run
+        self._cpu_mark = None  # (monotonic time, process CPU seconds) at the previous report
+        self._lock = threading.Lock()
+
+    def record_collection(self, seconds, scheduler=None):
+        """Record one get_all_data() call and the latest per-collector durations"""
+        with self._lock:
+            self.collections += 1
+            self.collect_seconds_total += seconds
+            self.last_collect_seconds = seconds
+            if scheduler is not None:
+                for name, collector in scheduler.collectors.items():
+                    if collector.duration is not None:
+                        self.collector_seconds[name] = collector.duration
+
+    def record_request(self, endpoint, seconds, sent=0, received=0, ok=True):
+        """Record one HTTP round-trip (e.g., endpoint='send_data')"""
+        with self._lock:
+            stats = self.endpoints.setdefault(endpoint, EndpointStats())
+            stats.requests += 1
+            stats.seconds_total += seconds
+            stats.last_seconds = seconds
+            if not ok:
+                stats.errors += 1
+            self.bytes_sent += sent
+            self.bytes_received += received
+
+    def record_retry(self):
+        """Record a request that had to be sent again"""
+        with self._lock:
+            self.retries += 1
+
+    def _process_usage(self):
+        """Process CPU seconds, RSS bytes and thread count"""
+        with self.process.oneshot():
+            cpu = self.process.cpu_times()
+            return cpu.user + cpu.system, self.process.memory_info().rss, self.process.num_threads()
+
+    def report(self):
+        """Compact summary attached to every snapshot as 'agent_stats'"""
+        cpu_seconds, rss, threads = self._process_usage()
+        now = time.monotonic()
+        with self._lock:
+            cpu_percent = None
+            if self._cpu_mark and now > self._cpu_mark[0]:
+                # Agent CPU since the previous report (100 = one full core)
+                cpu_percent = round((cpu_seconds - self._cpu_mark[1]) / (now - self._cpu_mark[0]) * 100, 2)
+            self._cpu_mark = (now, cpu_seconds)
+
+            return {
+                "uptime_seconds": round(now - self.started),
+                "cpu_percent": cpu_percent,
+                "cpu_seconds": round(cpu_seconds, 2),
+                "rss_mb": round(rss / (1024**2), 1),
+                "threads": threads,
+                "collect_ms": round(self.last_collect_seconds * 1000, 2) if self.last_collect_seconds is not None else None,
+                "collector_ms": {name: round(seconds * 1000, 2) for name, seconds in self.collector_seconds.items()},
+                "http": {
+                    endpoint: {
+                        "requests": stats.requests,
+                        "errors": stats.errors,
+                        "last_ms": round(stats.last_seconds * 1000, 2),
+                        "avg_ms": round(stats.seconds_total / stats.requests * 1000, 2),
+                    }
+                    for endpoint, stats in self.endpoints.items()
+                },
+                "bytes_sent": self.bytes_sent,
+                "bytes_received": self.bytes_received,
+                "retries": self.retries,
+            }
+
+    def prometheus_text(self):
+        """Render all counters in the Prometheus text exposition format"""
+        cpu_seconds, rss, threads = self._process_usage()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP laptop_agent_{name} {help_text}")
+            lines.append(f"# TYPE laptop_agent_{name} {kind}")
+            for labels, value in samples:
+                lines.append(f"laptop_agent_{name}{labels} {value}")
+
+        with self._lock:
+            metric("cpu_seconds_total", "counter", "CPU time used by the agent process",
+                   [("", round(cpu_seconds, 3))])
+            metric("resident_memory_bytes", "gauge", "Resident set size of the agent process", [("", rss)])
+            metric("threads", "gauge", "Threads in the agent process", [("", threads)])
+            metric("collections_total", "counter", "Snapshots collected", [("", self.collections)])
+            metric("collect_seconds_total", "counter", "Time spent collecting snapshots",
+                   [("", round(self.collect_seconds_total, 6))])
+            metric("collector_last_duration_seconds", "gauge", "Duration of each collector's latest run",
+                   [(f'{{collector="{name}"}}', round(seconds, 6)) for name, seconds in self.collector_seconds.items()])
+            metric("http_requests_total", "counter", "HTTP requests per endpoint",
+                   [(f'{{endpoint="{name}"}}', stats.requests) for name, stats in self.endpoints.items()])
+            metric("http_errors_total", "counter", "Failed HTTP requests per endpoint",
+                   [(f'{{endpoint="{name}"}}', stats.errors) for name, stats in self.endpoints.items()])
+            metric("http_request_seconds_total", "counter", "Time spent in HTTP round-trips per endpoint",
+                   [(f'{{endpoint="{name}"}}', round(stats.seconds_total, 6)) for name, stats in self.endpoints.items()])
+            metric("bytes_sent_total", "counter", "Request body bytes sent", [("", self.bytes_sent)])
+            metric("bytes_received_total", "counter", "Response body bytes received", [("", self.bytes_received)])
+            metric("retries_total", "counter", "Requests sent again after a failure", [("", self.retries)])
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Local HTTP endpoint serving AgentStats as Prometheus metrics on /metrics"""
+
+    def __init__(self, stats, port, host="127.0.0.1"):
+        """
+        Initialize metrics server
+
+        Args:
+            stats: AgentStats to expose
+            port: Port to listen on
+            host: Interface to bind (default: localhost only)
+        """
+        self.stats = stats
+        self.address = (host, port)
+        self.server = None
+        self.server_thread = None
+
+    def start(self):
+        """Start serving in a background thread"""
+        # Imported here - the endpoint is opt-in and http.server is slow to import
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        stats = self.stats
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = stats.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(self.address, Handler)
+        self.server_thread = threading.Thread(target=self.server.serve_forever)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        print(f"📈 Agent metrics at http://{self.address[0]}:{self.server.server_port}/metrics")
+
+    def stop(self):
+        """Stop serving"""
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
@@ -0,0 +1,311 @@
+"""
+On-device alert rules
+Evaluates threshold, rate-of-change and sustained conditions on every local sample
+"""
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+
+OPERATORS = {
+    ">": lambda value, threshold: value > threshold,
+    ">=": lambda value, threshold: value >= threshold,
+    "<": lambda value, threshold: value < threshold,
+    "<=": lambda value, threshold: value <= threshold,
+}
+
+SEVERITIES = ("info", "warning", "critical")
+
+# Mirrors the server-side thresholds; CPU must stay high for 30 s so a single
+# busy sample doesn't raise an alert
+DEFAULT_RULES = [
+    {"name": "cpu_warning", "alert_type": "cpu_high", "metric": "cpu_percent", "op": ">", "threshold": 75,
+     "duration": 30, "severity": "warning"},
+    {"name": "cpu_critical", "alert_type": "cpu_high", "metric": "cpu_percent", "op": ">", "threshold": 90,
+     "duration": 30, "severity": "critical"},
+    {"name": "memory_warning", "alert_type": "memory_high", "metric": "memory_percent", "op": ">", "threshold": 80,
+     "duration": 10, "severity": "warning"},
+    {"name": "memory_critical", "alert_type": "memory_high", "metric": "memory_percent", "op": ">", "threshold": 90,
+     "duration": 10, "severity": "critical"},
+    {"name": "memory_leak", "alert_type": "memory_climbing", "type": "rate", "metric": "memory_percent",
+     "op": ">", "threshold": 0.02, "window": 300, "duration": 120, "severity": "warning"},
+    {"name": "battery_low", "alert_type": "battery_low", "metric": "battery_percent", "op": "<", "threshold": 20,
+     "clear": 22, "on_battery": True, "severity": "warning"},
+    {"name": "battery_critical", "alert_type": "battery_critical", "metric": "battery_percent", "op": "<",
+     "threshold": 10, "clear": 12, "on_battery": True, "severity": "critical"},
+    {"name": "disk_warning", "alert_type": "disk_full", "metric": "disk_percent", "op": ">", "threshold": 80,
+     "severity": "warning"},
+    {"name": "disk_critical", "alert_type": "disk_full", "metric": "disk_percent", "op": ">", "threshold": 90,
+     "severity": "critical"},
+    {"name": "temperature_warning", "alert_type": "temperature_high", "metric": "temperature_c", "op": ">",
+     "threshold": 75, "duration": 15, "severity": "warning"},
+    {"name": "temperature_critical", "alert_type": "temperature_high", "metric": "temperature_c", "op": ">",
+     "threshold": 85, "duration": 15, "severity": "critical"},
+]
+
+
+class AlertRule:
+    """One declarative condition on a metric"""
+
+    TYPES = ("threshold", "rate", "sustained")
+
+    def __init__(self, name, metric, op, threshold, type="threshold", duration=0, window=60,
+                 clear=None, on_battery=False, severity="warning", alert_type=None):
+        """
+        Initialize rule
+
+        Args:
+            name: Unique rule name
+            metric: Metric the rule watches (e.g., 'cpu_percent', 'battery_percent')
+            op: Comparison with the threshold ('>', '>=', '<', '<=')
+            threshold: Value (or per-second change for rate rules) the metric is compared to
+            type: 'threshold' (current value), 'rate' (change per second over `window`)
+                  or 'sustained' (threshold that must hold for `duration`)
+            duration: Seconds the condition must hold before the alert fires (default: 0)
+            window: Seconds the rate of change is measured over (rate rules, default: 60)
+            clear: Value the metric must get back past before the alert resolves
+                   (default: threshold, i.e. no hysteresis)
+            on_battery: Only evaluate while unplugged (default: False)
+            severity: 'info', 'warning' or 'critical' (default: warning)
+            alert_type: Alert type reported to the server (default: name)
+
+        Raises:
+            ValueError: If the rule is malformed
+        """
+        if type not in self.TYPES:
+            raise ValueError(f"Rule {name}: unknown type {type!r}")
+        if op not in OPERATORS:
+            raise ValueError(f"Rule {name}: unknown operator {op!r}")
+        if severity not in SEVERITIES:
+            raise ValueError(f"Rule {name}: unknown severity {severity!r}")
+        if type == "sustained" and not duration:
+            raise ValueError(f"Rule {name}: sustained rules need a duration")
+        if duration < 0 or window <= 0:
+            raise ValueError(f"Rule {name}: duration and window must be positive")
+        self.name = name
+        self.metric = metric
+        self.op = op
+        self.threshold = float(threshold)
+        self.type = type
+        self.duration = duration
+        self.window = window
+        self.clear = float(clear) if clear is not None else None
+        self.on_battery = on_battery
+        self.severity = severity
+        self.alert_type = alert_type or name
+
+    @classmethod
+    def from_dict(cls, rule):
+        """
+        Build a rule from its JSON form (as pushed by the server)
+
+        Raises:
+            ValueError: If required keys are missing or unknown keys are present
+        """
+        if not isinstance(rule, dict):
+            raise ValueError(f"Rule must be an object, got {rule!r}")
+        try:
+            return cls(**rule)
+        except TypeError as e:
+            raise ValueError(f"Invalid rule {rule.get('name', '?')}: {e}")
+
+    def to_dict(self):
+        """JSON form of the rule"""
+        return {
+            "name": self.name, "alert_type": self.alert_type, "type": self.type,
+            "metric": self.metric, "op": self.op, "threshold": self.threshold,
+            "duration": self.duration, "window": self.window, "clear": self.clear,
+            "on_battery": self.on_battery, "severity": self.severity,
+        }
+
+    def matches(self, value):
+        """Check if `value` (metric or rate) meets the alert condition"""
+        return OPERATORS[self.op](value, self.threshold)
+
+    def cleared(self, value):
+        """Check if a firing alert may resolve (honours the clear hysteresis)"""
+        if self.clear is None:
+            return not self.matches(value)
+        return not OPERATORS[self.op](value, self.clear)
+
+
+class RuleState:
+    """Per-rule evaluation state"""
+
+    def __init__(self):
+        self.since = None  # Monotonic time the condition started holding
+        self.firing = False
+        self.history = deque()  # (monotonic time, value) within the rate window
+
+
+class AlertEngine:
+    """Evaluates AlertRules on metric samples and emits firing/resolved events"""
+
+    def __init__(self, rules=None, on_event=None):
+        """
+        Initialize engine
+
+        Args:
+            rules: AlertRules or their JSON form (default: DEFAULT_RULES)
+            on_event: Callable(event) invoked for every firing/resolved event
+                      (from the thread that evaluated the sample)
+        """
+        self.on_event = on_event
+        self.rules = []
+        self.states = {}
+        self.plugged_in = None
+        # Row layout -> [(rule, column index)] for the rules whose metric it has
+        self._columns = {}
+        self._lock = threading.Lock()
+        self.set_rules(DEFAULT_RULES if rules is None else rules)
+
+    def set_rules(self, rules):
+        """
+        Replace the rule set (alerts of removed or changed rules are resolved)
+
+        Raises:
+            ValueError: If any rule is malformed (the current rules are kept)
+        """
+        parsed = [rule if isinstance(rule, AlertRule) else AlertRule.from_dict(rule) for rule in rules]
+        names = [rule.name for rule in parsed]
+        if len(set(names)) != len(names):
+            raise ValueError("Rule names must be unique")
+
+        events = []
+        with self._lock:
+            kept = {rule.name: rule.to_dict() for rule in parsed}
+            for rule in self.rules:
+                state = self.states[rule.name]
+                if state.firing and kept.get(rule.name) != rule.to_dict():
+                    events.append(self._event(rule, "resolved", None, "rule removed or changed"))
+            old_states = {
+                rule.name: self.states[rule.name]
+                for rule in self.rules
+                if kept.get(rule.name) == rule.to_dict()
+            }
+            self.rules = parsed
+            self.states = {rule.name: old_states.get(rule.name) or RuleState() for rule in parsed}
+            self._columns = {}
+        self._emit(events)
+
+    def evaluate(self, values, now=None):
+        """
+        Evaluate every rule whose metric is in `values`
+
+        Args:
+            values: {metric: value} from one snapshot (None/NaN values are skipped)
+            now: Monotonic time of the snapshot (default: now)
+
+        Returns:
+            List of events raised by this snapshot
+        """
+        return self.evaluate_row(tuple(values), tuple(values.values()), now)
+
+    def evaluate_row(self, fields, row, now=None):
+        """
+        Evaluate every rule whose metric is in `fields` on one sample, read by
+        column from `row` (no dict is built per sample)
+
+        Args:
+            fields: Metric names in row order (the same tuple for every sample)
+            row: Values of one sample (None/NaN values are skipped)
+            now: Monotonic time of the sample (default: now)
+
+        Returns:
+            List of events raised by this sample
+        """
+        now = time.monotonic() if now is None else now
+        events = []
+        with self._lock:
+            columns = self._columns.get(fields)
+            if columns is None:
+                columns = self._columns[fields] = [
+                    (rule, fields.index(rule.metric)) for rule in self.rules if rule.metric in fields
+                ]
+            if "plugged_in" in fields:
+                plugged_in = row[fields.index("plugged_in")]
+                if plugged_in is not None:
+                    self.plugged_in = bool(plugged_in) if plugged_in >= 0 else None
+            for rule, index in columns:
+                value = row[index]
+                if value is None or value != value:
+                    continue
+                event = self._evaluate_rule(rule, self.states[rule.name], float(value), now)
+                if event:
+                    events.append(event)
+        self._emit(events)
+        return events
+
+    def _evaluate_rule(self, rule, state, value, now):
+        """Update one rule's state; returns an event on a firing/resolved transition"""
+        observed = value
+        if rule.type == "rate":
+            state.history.append((now, value))
+            while state.history and now - state.history[0][0] > rule.window:
+                state.history.popleft()
+            first_time, first_value = state.history[0]
+            if now - first_time < rule.window / 2:
+                # Not enough history for a meaningful rate yet
+                return None
+            observed = (value - first_value) / (now - first_time)
+
+        if rule.on_battery and self.plugged_in is not False:
+            # Plugged in (or unknown) - battery rules don't apply
+            state.since = None
+            if state.firing:
+                state.firing = False
+                return self._event(rule, "resolved", observed, "back on AC power")
+            return None
+
+        if state.firing:
+            if rule.cleared(observed):
+                state.firing = False
+                state.since = None
+                return self._event(rule, "resolved", observed)
+            return None
+
+        if not rule.matches(observed):
+            state.since = None
+            return None
+        if state.since is None:
+            state.since = now
+        if now - state.since >= rule.duration:
+            state.firing = True
+            return self._event(rule, "firing", observed)
+        return None
+
+    def _event(self, rule, state, value, reason=None):
+        """Build the event sent to the server"""
+        unit = "/s" if rule.type == "rate" else ""
+        if state == "firing":
+            held = f" for {rule.duration:g}s" if rule.duration else ""
+            message = f"{rule.metric} {value:.2f}{unit} {rule.op} {rule.threshold:g}{unit}{held}"
+        else:
+            message = f"{rule.metric} back to normal" + (f" ({reason})" if reason else "")
+        return {
+            "rule": rule.name,
+            "type": rule.alert_type,
+            "severity": rule.severity,
+            "state": state,
+            "metric": rule.metric,
+            "value": round(value, 2) if value is not None else None,
+            "threshold": rule.threshold,
+            "message": message,
+            "timestamp": datetime.now().isoformat(),
+        }
+
+    def _emit(self, events):
+        """Hand events to the callback (outside the lock)"""
+        if self.on_event is None:
+            return
+        for event in events:
+            try:
+                self.on_event(event)
+            except Exception as e:
+                print(f"Error handling alert event: {e}")
+
+    def firing(self):
+        """Names of the rules currently firing"""
+        with self._lock:
+            return [rule.name for rule in self.rules if self.states[rule.name].firing]
@@ -0,0 +1,242 @@
+"""
+Asyncio-based client for Next.js Server Integration
+Runs collection, upload, command polling and command execution as independent tasks
+"""
+import asyncio
+
+from client import SimpleClient
+from transport import Transport
+
+
+class AsyncClient(SimpleClient):
+    """Client that overlaps collection, upload and command handling"""
+
+    def __init__(self, server_url, device_id=None, update_interval=10, parallel=False,
+                 spool_path=None, compact=False, long_poll=False, poll_interval=None,
+                 metrics_port=None, adaptive=False, min_interval=5, max_interval=120,
+                 connect_timeout=3.05, read_timeout=10, history_dir=None, history_days=30,
+                 cache_path=None, fast_start=False, edge_alerts=False, events=False,
+                 event_thresholds=None):
+        """
+        Initialize client
+
+        Args:
+            server_url: Your Next.js server URL (e.g., 'http://localhost:3000')
+            device_id: Unique device ID (auto-generated if None)
+            update_interval: Seconds between data collections (default: 10)
+            parallel: Run data collectors concurrently (default: False)
+            spool_path: SQLite file for snapshots queued while offline (None = disabled)
+            compact: Send delta-encoded, gzip-compressed payloads when the server supports it
+            long_poll: Receive commands over a long-poll channel instead of polling
+            poll_interval: Seconds between command checks (default: update_interval,
+                           or min_interval in adaptive mode)
+            metrics_port: Serve the agent's own metrics on localhost:<port>/metrics (None = disabled)
+            adaptive: Adjust the interval to how much the metrics change and to power state
+            min_interval: Fastest interval in adaptive mode (default: 5)
+            max_interval: Slowest interval in adaptive mode (default: 120)
+            connect_timeout: Seconds to wait for a connection to the server (default: 3.05)
+            read_timeout: Seconds to wait for a response (default: 10)
+            history_dir: Folder for the local metric history (None = disabled)
+            history_days: Days of local history kept (default: 30)
+            cache_path: JSON file caching the device ID and static system info between
+                        runs (None = computed on every start)
+            fast_start: Send the first report right away with only the cheap metrics
+            edge_alerts: Evaluate alert rules on every local sample and send alerts as they fire
+            events: Collect and upload right away when the laptop is plugged in or unplugged,
+                    a threshold is crossed or partitions change
+            event_thresholds: [{'metric', 'op', 'threshold'}] crossings that trigger a
+                              report in events mode (default: event_watcher.DEFAULT_THRESHOLDS)
+        """
+        super().__init__(server_url, device_id=device_id, update_interval=update_interval,
+                         parallel=parallel, spool_path=spool_path, compact=compact,
+                         long_poll=long_poll, metrics_port=metrics_port,
+                         adaptive=adaptive, min_interval=min_interval, max_interval=max_interval,
+                         connect_timeout=connect_timeout, read_timeout=read_timeout,
+                         history_dir=history_dir, history_days=history_days,
+                         cache_path=cache_path, fast_start=fast_start, edge_alerts=edge_alerts,
+                         events=events, event_thresholds=event_thresholds)
+        self.poll_interval = poll_interval
+        # Uploads and command polling run concurrently, so they get separate connections
+        # (but share the circuit breaker - it's the same server)
+        self.command_transport = Transport(connect_timeout=connect_timeout, read_timeout=read_timeout,
+                                           breaker=self.transport.breaker, stats=self.stats)
+        self.latest_data = None
+        self._data_ready = None
+        self._commands = None
+        self._stopped = None
+        self._loop = None
+        self._report_requested = None
+        self._collect_lock = None
+
+    async def _fixed_rate(self, get_interval, func):
+        """Run func on a fixed-rate schedule, correcting for drift and skipping missed ticks"""
+        loop = asyncio.get_running_loop()
+        next_run = loop.time()
+        while self.running:
+            try:
+                await func()
+            except Exception as e:
+                print(f"❌ Error: {e}")
+
+            now = loop.time()
+            try:
+                interval = get_interval()
+                if not interval > 0:
+                    raise ValueError(f"invalid interval {interval!r}")
+                next_run += interval
+                if next_run < now:
+                    # Fell behind - skip the missed ticks instead of running them back to back
+                    missed = int((now - next_run) // interval) + 1
+                    next_run += missed * interval
+            except Exception as e:
+                # Keep the task alive; try again in a second
+                print(f"❌ Error scheduling next run: {e}")
+                next_run = now + 1
+            await asyncio.sleep(next_run - now)
+
+    def _command_poll_interval(self):
+        """Seconds between command checks (adaptive mode keeps polling at the fastest rate)"""
+        if self.poll_interval:
+            return self.poll_interval
+        if self.adaptive is not None:
+            return self.adaptive.min_interval
+        return self.update_interval
+
+    async def _collect(self, events=False):
+        """
+        Collect a snapshot and hand it to the uploader
+
+        Args:
+            events: Refresh the collectors made stale by triggered events first
+        """
+        # collect() isn't thread-safe (scheduler, stats, alerts, history), so an
+        # event report waits for a running tick instead of collecting alongside it
+        async with self._collect_lock:
+            if events:
+                # An event right after a scheduled report is deferred, not sent back to back
+                await asyncio.sleep(self.report_gap_remaining())
+                self.take_triggered_events()
+            self.latest_data = await asyncio.to_thread(self.collect)
+        self._data_ready.set()
+
+    async def upload_loop(self):
+        """Upload the newest snapshot whenever one is ready"""
+        while self.running:
+            await self._data_ready.wait()
+            self._data_ready.clear()
+            # If an upload is slow, intermediate snapshots are superseded by the newest one
+            payload = self.build_payload(self.latest_data)
+            await asyncio.to_thread(self.post_payload, payload)
+
+    def request_report(self, events):
+        """Ask for a report right away (called from the event watcher thread)"""
+        super().request_report(events)
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._report_requested.set)
+
+    async def event_report_loop(self):
+        """Collect and upload out of band whenever the event watcher asks for it"""
+        while self.running:
+            await self._report_requested.wait()
+            self._report_requested.clear()
+            # The fixed-rate schedule is left alone - this is an extra report
+            await self._collect(events=True)
+
+    async def _poll_commands(self):
+        """Fetch pending commands and queue them for execution"""
+        for command in await asyncio.to_thread(self.fetch_commands):
+            await self._commands.put(command)
+
+    def _queue_commands_threadsafe(self, loop, commands):
+        """Hand commands received on another thread to the event loop"""
+        for command in commands:
+            loop.call_soon_threadsafe(self._commands.put_nowait, command)
+
+    async def command_loop(self):
+        """Execute queued commands one at a time"""
+        while self.running:
+            command = await self._commands.get()
+            await self.execute_command_async(command)
+            if not self.running:
+                self._stopped.set()
+
+    async def execute_command_async(self, command):
+        """Execute a command without blocking the other tasks"""
+        cmd_type = command.get('type', '').lower()
+        cmd_id = command.get('id', 'unknown')
+
+        print(f"\n🎯 Command received: {cmd_type} (ID: {cmd_id})")
+
+        if cmd_type in self.POWER_COMMANDS:
+            print(f"⚠️  {cmd_type.upper()} in {self.POWER_COMMAND_DELAY} seconds... (Ctrl+C to cancel)")
+            await asyncio.sleep(self.POWER_COMMAND_DELAY)
+            await asyncio.to_thread(self.run_power_command, cmd_type)
+        else:
+            self.apply_command(command)
+
+        await asyncio.to_thread(self.acknowledge_command, cmd_id)
+
+    async def run_async(self):
+        """Start all tasks and wait until the client is stopped"""
+        self.running = True
+        self._data_ready = asyncio.Event()
+        self._commands = asyncio.Queue()
+        self._stopped = asyncio.Event()
+        self._report_requested = asyncio.Event()
+        self._collect_lock = asyncio.Lock()
+        self._loop = asyncio.get_running_loop()
+        self.start_metrics_server()
+        self.start_alert_sender()
+
+        tasks = [
+            asyncio.create_task(self._fixed_rate(lambda: self.update_interval, self._collect)),
+            asyncio.create_task(self.upload_loop()),
+            asyncio.create_task(self.command_loop()),
+        ]
+        if self.events is not None:
+            tasks.append(asyncio.create_task(self.event_report_loop()))
+            self.events.start()
+        if self.long_poll:
+            # Channel thread hands commands over to the event loop
+            loop = asyncio.get_running_loop()
+            self.start_command_channel(
+                lambda commands: self._queue_commands_threadsafe(loop, commands))
+        else:
+            tasks.append(asyncio.create_task(self._fixed_rate(
+                self._command_poll_interval, self._poll_commands)))
+        try:
+            await self._stopped.wait()
+        finally:
+            self.running = False
+            self._loop = None
+            if self.events is not None:
+                self.events.stop()
+            if self.command_channel:
+                self.command_channel.stop()
+            self.stop_metrics_server()
+            self.stop_alert_sender()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def run(self):
+        """Main loop - run the async tasks until stopped"""
+        print("=" * 60)
+        print("🚀 Laptop Monitor Client for Next.js (async)")
+        print("=" * 60)
+        print(f"📡 Server: {self.server_url}")
+        print(f"🆔 Device: {self.device_id}")
+        if self.adaptive is not None:
+            print(f"⏱️  Interval: adaptive, {self.adaptive.min_interval}-{self.adaptive.max_interval}s")
+        else:
+            print(f"⏱️  Interval: {self.update_interval}s")
+        if self.alerts is not None:
+            print(f"🔔 Edge alerting: {len(self.alerts.rules)} rule(s)")
+        if self.events is not None:
+            print(f"⚡ Immediate reports on power, partition and {len(self.events.thresholds)} threshold change(s)")
+        print("Press Ctrl+C to stop\n")
+
+        try:
+            asyncio.run(self.run_async())
+        except KeyboardInterrupt:
+            print("\n\n👋 Stopped by user")
@@ -0,0 +1,159 @@
+"""
+Shared fixtures of the benchmark and the load generator
+Deterministic fake psutil/WMI backend and a nearest-rank percentile
+"""
+import contextlib
+from collections import namedtuple
+
+import psutil
+
+import cpu_sampler
+import disk_monitor
+import metric_buffer
+import process_table
+
+
+# Modules whose psutil reference is swapped for the fake backend
+PSUTIL_MODULES = (cpu_sampler, metric_buffer, disk_monitor, process_table)
+
+class FakePsutil:
+    """Deterministic stand-in for the psutil calls the agent makes"""
+
+    scputimes = namedtuple("scputimes", "user nice system idle iowait irq softirq steal guest guest_nice")
+    scpufreq = namedtuple("scpufreq", "current min max")
+    svmem = namedtuple("svmem", "total available percent used free")
+    sdiskpart = namedtuple("sdiskpart", "device mountpoint fstype opts")
+    sdiskusage = namedtuple("sdiskusage", "total used free percent")
+    sdiskio = namedtuple("sdiskio", "read_count write_count read_bytes write_bytes read_time write_time")
+    sbattery = namedtuple("sbattery", "percent secsleft power_plugged")
+    snetio = namedtuple("snetio", "bytes_sent bytes_recv packets_sent packets_recv errin errout dropin dropout")
+    shwtemp = namedtuple("shwtemp", "label current high critical")
+    pmem = namedtuple("pmem", "rss vms")
+    pio = namedtuple("pio", "read_count write_count read_bytes write_bytes")
+
+    POWER_TIME_UNLIMITED = psutil.POWER_TIME_UNLIMITED
+    POWER_TIME_UNKNOWN = psutil.POWER_TIME_UNKNOWN
+    MACOS = False
+    NoSuchProcess = psutil.NoSuchProcess
+    AccessDenied = psutil.AccessDenied
+    ZombieProcess = psutil.ZombieProcess
+
+    def __init__(self, cores=8, processes=300):
+        self.cores = cores
+        self.process_count = processes
+        self.ticks = 0
+
+    def _tick(self):
+        self.ticks += 1
+        return self.ticks
+
+    def cpu_times(self, percpu=False):
+        t = self._tick()
+        times = [
+            self.scputimes(t * 0.3 + i, 0.0, t * 0.1, t * 0.6, 0.01 * t, 0.0, 0.0, 0.0, 0.0, 0.0)
+            for i in range(self.cores)
+        ]
+        return times if percpu else times[0]
+
+    def cpu_count(self, logical=True):
+        return self.cores if logical else self.cores // 2
+
+    def cpu_freq(self):
+        return self.scpufreq(2400.0, 400.0, 4200.0)
+
+    def virtual_memory(self):
+        total = 16 * 1024**3
+        return self.svmem(total, total // 2, 50.0, total // 2, total // 4)
+
+    def disk_partitions(self, all=False):
+        return [
+            self.sdiskpart("/dev/nvme0n1p2", "/", "ext4", "rw"),
+            self.sdiskpart("/dev/nvme0n1p1", "/boot/efi", "vfat", "rw"),
+            self.sdiskpart("nas:/share", "/mnt/nas", "nfs4", "rw"),
+        ]
+
+    def disk_usage(self, path):
+        total = 512 * 1024**3
+        return self.sdiskusage(total, total * 6 // 10, total * 4 // 10, 60.0)
+
+    def disk_io_counters(self, perdisk=False):
+        t = self._tick()
+        counters = {name: self.sdiskio(t * 10, t * 5, t * 40960, t * 20480, t, t) for name in ("nvme0n1", "sda")}
+        return counters if perdisk else counters["nvme0n1"]
+
+    def sensors_battery(self):
+        return self.sbattery(80.0, psutil.POWER_TIME_UNLIMITED, True)
+
+    def net_io_counters(self, pernic=False):
+        t = self._tick()
+        counters = {
+            name: self.snetio(t * 1500, t * 3000, t, t * 2, 0, 0, 0, 0)
+            for name in ("eth0", "wlan0", "lo")
+        }
+        if pernic:
+            return counters
+        return self.snetio(*(sum(values) for values in zip(*counters.values())))
+
+    def sensors_temperatures(self):
+        return {"coretemp": [self.shwtemp(f"Core {i}", 55.0 + i, 90.0, 100.0) for i in range(4)]}
+
+    def process_iter(self, attrs=None, ad_value=None):
+        for pid in range(1, self.process_count + 1):
+            proc = FakeProcess(self, pid)
+            proc.info = {name: getattr(proc, name)() for name in attrs or () if name != "pid"}
+            proc.info["pid"] = pid
+            yield proc
+
+
+class FakeProcess:
+    """Minimal psutil.Process replacement used by FakePsutil"""
+
+    def __init__(self, backend, pid):
+        self.backend = backend
+        self.pid = pid
+
+    def oneshot(self):
+        return contextlib.nullcontext()
+
+    def name(self):
+        return f"proc{self.pid}"
+
+    def create_time(self):
+        return 1700000000.0 + self.pid
+
+    def cpu_percent(self, interval=None):
+        return float(self.pid % 50)
+
+    def memory_info(self):
+        return self.backend.pmem(self.pid * 1024**2, self.pid * 2 * 1024**2)
+
+    def io_counters(self):
+        t = self.backend.ticks
+        return self.backend.pio(t, t, t * self.pid, t * self.pid)
+
+
+class FakeWMI:
+    """WMI provider returning fixed battery objects"""
+
+    Item = namedtuple("Item", "FullChargedCapacity DesignedCapacity DefaultAlert1 DischargeRate Voltage RemainingCapacity BatteryStatus EstimatedRunTime")
+
+    def __init__(self, namespace=None):
+        self.item = self.Item(50000, 60000, 600, 12000, 11400, 40000, 2, 120)
+
+    def __getattr__(self, class_name):
+        return lambda: [self.item]
+
+
+def install_fake_backend():
+    """Point every collector module at the fake psutil backend"""
+    fake = FakePsutil()
+    for module in PSUTIL_MODULES:
+        module.psutil = fake
+    return fake
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
@@ -0,0 +1,271 @@
+"""
+Benchmark suite for the laptop monitor agent
+Measures per-collector cost, snapshot latency, payload size and HTTP round-trips
+"""
+import argparse
+import contextlib
+import gzip
+import io
+import json
+import platform
+import statistics
+import struct
+import sys
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import psutil
+
+from bench_support import FakeWMI, install_fake_backend, percentile
+from client import SimpleClient
+from laptop_data import LaptopMonitor
+from payload_codec import DeltaEncoder
+from snapshot_store import snapshot_to_record, RECORD_FIELDS
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+# Timing metrics smaller than this (seconds) are never reported as regressions
+NOISE_FLOOR = 0.0005
+
+
+def bench_collectors(monitor, iterations):
+    """Wall time, CPU time and allocations per collector"""
+    results = {}
+    for name, collector in monitor.scheduler.collectors.items():
+        collector.func()  # Warm up (starts samplers, primes counters)
+        wall, cpu = [], []
+        for _ in range(iterations):
+            start_wall, start_cpu = time.perf_counter(), time.process_time()
+            collector.func()
+            wall.append(time.perf_counter() - start_wall)
+            cpu.append(time.process_time() - start_cpu)
+
+        # Allocations are measured separately so tracing doesn't skew the timings
+        tracemalloc.start()
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        collector.func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        results[name] = {
+            "wall_p50": statistics.median(wall),
+            "wall_p99": percentile(wall, 99),
+            "cpu_mean": statistics.fmean(cpu),
+            "alloc_peak_bytes": peak - before,
+        }
+    return results
+
+
+def time_per_call(func, iterations):
+    """Mean seconds per call of func()"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations
+
+
+def bench_snapshot(monitor, iterations):
+    """End-to-end get_all_data latency and payload sizes"""
+    latencies = []
+    data = None
+    for _ in range(iterations):
+        start = time.perf_counter()
+        data = monitor.get_all_data()
+        latencies.append(time.perf_counter() - start)
+
+    encoded = json.dumps(data, separators=(',', ':')).encode('utf-8')
+    encoder = DeltaEncoder()
+    encoder.commit(encoder.encode(data))
+    delta = json.dumps(encoder.encode(monitor.get_all_data()), separators=(',', ':')).encode('utf-8')
+    record = struct.Struct("<" + "".join(fmt for _, fmt in RECORD_FIELDS))
+    results = {
+        "get_all_data_p50": statistics.median(latencies),
+        "get_all_data_p99": percentile(latencies, 99),
+        "payload_json_bytes": len(encoded),
+        "payload_gzip_bytes": len(gzip.compress(encoded)),
+        "payload_delta_gzip_bytes": len(gzip.compress(delta)),
+        "payload_msgpack_bytes": None,
+        "record_bytes": record.size,
+        "encode_json_indented": time_per_call(lambda: json.dumps(data, indent=2), iterations),
+        "encode_json": time_per_call(lambda: json.dumps(data, separators=(',', ':')), iterations),
+        "encode_msgpack": None,
+        "encode_record": time_per_call(lambda: record.pack(*snapshot_to_record(data)), iterations),
+    }
+    if msgpack is not None:
+        results["payload_msgpack_bytes"] = len(msgpack.packb(data))
+        results["encode_msgpack"] = time_per_call(lambda: msgpack.packb(data), iterations)
+    return results
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Local stand-in for the Next.js device endpoints"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, body):
+        encoded = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._reply({"success": True, "message": "OK"})
+
+    def do_GET(self):
+        self._reply({"success": True, "commands": []})
+
+
+def bench_client(monitor, iterations):
+    """Round-trip times of send_data and check_commands against a stub server"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = SimpleClient(f"http://127.0.0.1:{server.server_port}", device_id="bench")
+        client.monitor = monitor
+        send, poll = [], []
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(iterations):
+                start = time.perf_counter()
+                client.send_data()
+                send.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                client.check_commands()
+                poll.append(time.perf_counter() - start)
+    finally:
+        server.shutdown()
+    return {
+        "send_data_p50": statistics.median(send),
+        "send_data_p99": percentile(send, 99),
+        "check_commands_p50": statistics.median(poll),
+        "check_commands_p99": percentile(poll, 99),
+    }
+
+
+def run(backend="fake", iterations=200):
+    """Run every benchmark and return the results"""
+    if backend == "fake":
+        monitor = LaptopMonitor(update_interval=1, wmi_provider=FakeWMI, backend=install_fake_backend())
+    elif backend == "psutil":
+        # The real machine without the /proc fast path, to compare against 'real'
+        monitor = LaptopMonitor(update_interval=1, backend=psutil)
+    else:
+        monitor = LaptopMonitor(update_interval=1)
+
+    try:
+        return {
+            "backend": backend,
+            "python": platform.python_version(),
+            "iterations": iterations,
+            "collectors": bench_collectors(monitor, iterations),
+            "snapshot": bench_snapshot(monitor, iterations),
+            "client": bench_client(monitor, max(iterations // 4, 10)),
+        }
+    finally:
+        monitor.stop()
+
+
+def flatten(results):
+    """Flatten numeric results to {'section.name.metric': value}"""
+    flat = {}
+    for section in ("collectors", "snapshot", "client"):
+        for key, value in results[section].items():
+            if isinstance(value, dict):
+                for metric, number in value.items():
+                    flat[f"{section}.{key}.{metric}"] = number
+            else:
+                flat[f"{section}.{key}"] = value
+    return flat
+
+
+def compare(results, baseline, tolerance):
+    """List metrics that got worse than the baseline by more than `tolerance`"""
+    regressions = []
+    current = flatten(results)
+    for key, old in flatten(baseline).items():
+        new = current.get(key)
+        if new is None or old is None:
+            continue
+        is_size = key.endswith("bytes")
+        if not is_size and new - old < NOISE_FLOOR:
+            continue
+        if new > old * (1 + tolerance):
+            regressions.append((key, old, new))
+    return regressions
+
+
+def print_results(results):
+    """Print results as a readable report"""
+    print("=" * 60)
+    print(f"⏱️  Agent benchmark ({results['backend']} backend, {results['iterations']} iterations)")
+    print("=" * 60)
+    print(f"\n{'Collector':<18}{'p50 ms':>10}{'p99 ms':>10}{'CPU ms':>10}{'alloc KB':>10}")
+    for name, stats in results["collectors"].items():
+        print(f"{name:<18}{stats['wall_p50'] * 1000:>10.3f}{stats['wall_p99'] * 1000:>10.3f}"
+              f"{stats['cpu_mean'] * 1000:>10.3f}{stats['alloc_peak_bytes'] / 1024:>10.1f}")
+
+    snap = results["snapshot"]
+    print(f"\n📊 get_all_data: p50 {snap['get_all_data_p50'] * 1000:.3f} ms, "
+          f"p99 {snap['get_all_data_p99'] * 1000:.3f} ms")
+    print(f"📦 Payload: {snap['payload_json_bytes']} B JSON, {snap['payload_gzip_bytes']} B gzip, "
+          f"{snap['payload_delta_gzip_bytes']} B delta+gzip, {snap['payload_msgpack_bytes'] or '-'} B msgpack, "
+          f"{snap['record_bytes']} B record")
+    encoders = [("indented JSON", "encode_json_indented"), ("JSON", "encode_json"),
+                ("msgpack", "encode_msgpack"), ("record", "encode_record")]
+    print("🔧 Encode: " + ", ".join(
+        f"{label} {snap[key] * 1e6:.1f} µs" for label, key in encoders if snap[key] is not None))
+
+    cli = results["client"]
+    print(f"📡 send_data: p50 {cli['send_data_p50'] * 1000:.3f} ms, p99 {cli['send_data_p99'] * 1000:.3f} ms")
+    print(f"📬 check_commands: p50 {cli['check_commands_p50'] * 1000:.3f} ms, "
+          f"p99 {cli['check_commands_p99'] * 1000:.3f} ms")
+
+
+def main():
+    """Run the benchmark from the command line"""
+    parser = argparse.ArgumentParser(description='Benchmark the laptop monitor agent')
+    parser.add_argument('--backend', choices=['fake', 'real', 'psutil'], default='fake',
+                        help='Collect from a deterministic fake psutil/WMI backend, the real machine, '
+                             'or the real machine through psutil only (default: fake)')
+    parser.add_argument('--iterations', type=int, default=200,
+                        help='Iterations per measurement (default: 200)')
+    parser.add_argument('--save-baseline', type=str, default=None,
+                        help='Write results to this JSON file')
+    parser.add_argument('--compare', type=str, default=None,
+                        help='Compare against a baseline JSON file and exit 1 on regressions')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed slowdown/growth vs. baseline before failing (default: 0.25 = 25%%)')
+    args = parser.parse_args()
+
+    results = run(backend=args.backend, iterations=args.iterations)
+    print_results(results)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✅ Baseline saved to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) vs. {args.compare}:")
+            for key, old, new in regressions:
+                print(f"   {key}: {old:.6g} → {new:.6g}")
+            sys.exit(1)
+        print(f"\n✅ No regressions vs. {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,16 +5,57 @@ Sends laptop data and receives commands from your Next.js backend
 import requests
 import time
 import os
+import gzip
+import json
 import platform
+import threading
 import uuid
+from collections import deque
 from datetime import datetime
 from laptop_data import LaptopMonitor
+from agent_stats import AgentStats
+from adaptive_interval import AdaptiveInterval
+from startup_cache import StartupCache
+from transport import Transport, CircuitOpenError
+from agent_paths import data_path, ensure_parent
+# Optional features (offline spool, compact encodings, long-poll, metrics endpoint)
+# import their modules when enabled so a plain start loads as little as possible
+
+
+def _load_msgpack():
+    """Import msgpack if installed (compact uploads fall back to JSON without it)"""
+    try:
+        import msgpack
+        return msgpack
+    except ImportError:
+        return None
 
 
 class SimpleClient:
     """Minimal client to communicate with Next.js server"""
     
-    def __init__(self, server_url, device_id=None, update_interval=10):
+    # Commands that power off the machine after a grace period
+    POWER_COMMANDS = ('shutdown', 'restart')
+    POWER_COMMAND_DELAY = 10
+    # Command IDs remembered to drop duplicate deliveries
+    SEEN_COMMANDS = 256
+    
+    # Maximum number of queued snapshots uploaded per bulk request
+    SPOOL_BATCH_SIZE = 100
+    
+    # Undelivered alert events kept while the server is unreachable (oldest dropped)
+    MAX_PENDING_ALERTS = 100
+    # Seconds between attempts to deliver alert events that failed to send
+    ALERT_RETRY_INTERVAL = 15
+    # Shortest gap before an event-triggered report may follow the previous report
+    MIN_REPORT_GAP = 1.0
+    
+    def __init__(self, server_url, device_id=None, update_interval=10, parallel=False,
+                 spool_path=None, compact=False, long_poll=False, metrics_port=None,
+                 adaptive=False, min_interval=5, max_interval=120,
+                 connect_timeout=3.05, read_timeout=10, history_dir=None, history_days=30,
+                 cache_path=None, fast_start=False, edge_alerts=False, events=False,
+                 event_thresholds=None):
         """
         Initialize client
         
@@ -22,14 +63,109 @@ class SimpleClient:
             server_url: Your Next.js server URL (e.g., 'http://localhost:3000')
             device_id: Unique device ID (auto-generated if None)
             update_interval: Seconds between data updates (default: 10)
+            parallel: Run data collectors concurrently (default: False)
+            spool_path: SQLite file for snapshots queued while offline (None = disabled)
+            compact: Send delta-encoded, gzip-compressed payloads when the server supports it
+            long_poll: Receive commands over a long-poll channel instead of polling every tick
+            metrics_port: Serve the agent's own metrics on localhost:<port>/metrics (None = disabled)
+            adaptive: Adjust the interval to how much the metrics change and to power state
+            min_interval: Fastest interval in adaptive mode (default: 5)
+            max_interval: Slowest interval in adaptive mode (default: 120)
+            connect_timeout: Seconds to wait for a connection to the server (default: 3.05)
+            read_timeout: Seconds to wait for a response (default: 10)
+            history_dir: Folder for the local metric history (None = disabled)
+            history_days: Days of local history kept (default: 30)
+            cache_path: JSON file caching the device ID and static system info between
+                        runs (None = computed on every start)
+            fast_start: Send the first report right away with only the cheap metrics
+                        (the slow collectors fill in from the next tick on)
+            edge_alerts: Evaluate alert rules on every local sample and send alerts as
+                         they fire instead of having the server check each report
+            events: Report immediately (between intervals) when the laptop is plugged in or
+                    unplugged, a threshold is crossed or partitions are mounted/removed
+            event_thresholds: [{'metric', 'op', 'threshold'}] crossings that trigger a
+                              report in events mode (default: event_watcher.DEFAULT_THRESHOLDS)
         """
         self.server_url = server_url.rstrip('/')
-        self.device_id = device_id or self._generate_device_id()
+        self.cache = StartupCache(cache_path) if cache_path else None
+        self.device_id = device_id or self._cached_device_id()
         self.update_interval = update_interval
-        self.monitor = LaptopMonitor(update_interval=1)
+        self.monitor = LaptopMonitor(update_interval=1, parallel=parallel,
+                                     history_dir=history_dir, history_days=history_days)
+        if self.cache is not None and self.cache.get("system_info"):
+            # Static info is refreshed in the background of the first full snapshot
+            self.monitor.scheduler.seed("system_info", self.cache.get("system_info"))
+        self.fast_start = fast_start
+        self.first_report = True
+        self.last_report_at = None  # Monotonic time of the latest collection
         self.running = False
-        self.session = requests.Session()  # Reuse connection
+        self.stats = AgentStats()
+        # Keep-alive connections, retries and a circuit breaker shared by all requests
+        self.transport = Transport(connect_timeout=connect_timeout, read_timeout=read_timeout,
+                                   stats=self.stats)
+        self.command_transport = self.transport
+        self.spool = None
+        if spool_path:
+            from spool import TelemetrySpool
+            self.spool = TelemetrySpool(spool_path)
+        self.compact = compact
+        self.encoder = None
+        self.msgpack = None
+        if compact:
+            from payload_codec import DeltaEncoder
+            self.encoder = DeltaEncoder()
+            self.msgpack = _load_msgpack()
+        # Learned from response headers of the data endpoint
+        self.server_accepts_gzip = False
+        self.server_accepts_delta = False
+        self.server_accepts_msgpack = False
+        self.long_poll = long_poll
+        self.command_channel = None
+        # IDs of recently received commands, so a redelivered one only runs once
+        self._seen_commands = deque(maxlen=self.SEEN_COMMANDS)
+        self._seen_commands_lock = threading.Lock()
+        self.metrics_port = metrics_port
+        self.metrics_server = None
+        self.adaptive = AdaptiveInterval(min_interval, max_interval, initial=update_interval) if adaptive else None
+        self.alerts = None
+        self.pending_alerts = []
+        self.server_accepts_alerts = False
+        self._alerts_lock = threading.Lock()
+        self._alerts_ready = threading.Event()
+        if edge_alerts:
+            self.alerts = self._create_alert_engine()
+            self.monitor.metric_sampler.listeners.append(self.alerts.evaluate_row)
+        self.events = None
+        self.triggered_events = []
+        self._events_lock = threading.Lock()
+        self._report_now = threading.Event()
+        if events:
+            from event_watcher import EventWatcher
+            self.events = EventWatcher(self.request_report, thresholds=event_thresholds,
+                                       backend=self.monitor.backend,
+                                       partitions=self.monitor.disk_monitor.get_partitions)
         
+    def _create_alert_engine(self):
+        """Alert engine with the rules last pushed by the server (or the defaults)"""
+        from alert_rules import AlertEngine
+        rules = self.cache.get("alert_rules") if self.cache is not None else None
+        try:
+            return AlertEngine(rules, on_event=self.queue_alert)
+        except ValueError as e:
+            print(f"⚠️  Ignoring cached alert rules: {e}")
+            return AlertEngine(on_event=self.queue_alert)
+    
+    def _cached_device_id(self):
+        """Device ID from the startup cache, generated (and cached) on the first run"""
+        if self.cache is None:
+            return self._generate_device_id()
+        device_id = self.cache.get("device_id")
+        if not device_id:
+            device_id = self._generate_device_id()
+            self.cache.set("device_id", device_id)
+            self.cache.save()
+        return device_id
+    
     def _generate_device_id(self):
         """Generate unique device ID"""
         hostname = platform.node()
@@ -37,65 +173,314 @@ class SimpleClient:
                         for i in range(0, 8*6, 8)][::-1])
         return f"{hostname}_{mac}"
     
+    def build_payload(self, data):
+        """Wrap collected data in the payload format expected by the Next.js API"""
+        payload = {
+            "deviceId": self.device_id,
+            "timestamp": datetime.now().isoformat(),
+            # Same ID when the report is re-sent (409 retry, spool), so the server stores it once
+            "reportId": uuid.uuid4().hex,
+            "hostname": platform.node(),
+            "data": dict(data, agent_stats=self.stats.report())
+        }
+        if self.alerts is not None and self.server_accepts_alerts:
+            # Alerts are evaluated here - the server can skip its own checks
+            # (older servers don't advertise the alerts endpoint and keep checking)
+            payload["edgeAlerts"] = True
+        return payload
+    
+    def collect(self):
+        """Collect laptop data, recording how long it took"""
+        start = time.perf_counter()
+        self.last_report_at = time.monotonic()
+        # In fast-start mode the first report carries only the cheap metrics
+        data = self.monitor.get_all_data(cheap_only=self.fast_start and self.first_report)
+        self.first_report = False
+        self.stats.record_collection(time.perf_counter() - start, self.monitor.scheduler)
+        self.update_cache(data)
+        if self.alerts is not None:
+            self.evaluate_alerts(data)
+        self.monitor.record_history(data)
+        if self.adaptive is not None:
+            self.adapt_interval(data)
+        return data
+    
+    def update_cache(self, data):
+        """Keep the cached static system info in line with what was collected"""
+        if self.cache is None or data["collector_age"].get("system_info") is None:
+            # Not collected yet - the reported value is the cached one
+            return
+        self.cache.set("system_info", data["system_info"])
+        self.cache.save()
+    
+    def evaluate_alerts(self, data):
+        """Run the alert rules on the slow metrics of a snapshot (battery, disk, temperature)"""
+        from snapshot_store import snapshot_to_record, RECORD_FIELDS
+        values = dict(zip((name for name, _ in RECORD_FIELDS), snapshot_to_record(data)))
+        if self.monitor.metric_sampler.running:
+            # Already evaluated on every (more frequent) sample
+            for field in self.monitor.metric_sampler.FIELDS:
+                values.pop(field, None)
+        self.alerts.evaluate(values)
+    
+    def queue_alert(self, event):
+        """Queue an alert event for immediate delivery (called from the sampling thread)"""
+        icon = "🚨" if event["state"] == "firing" else "✅"
+        print(f"{icon} Alert {event['state']}: {event['rule']} - {event['message']}")
+        with self._alerts_lock:
+            self.pending_alerts.append(event)
+            del self.pending_alerts[:-self.MAX_PENDING_ALERTS]
+        self._alerts_ready.set()
+    
+    def flush_alerts(self):
+        """Send queued alert events to the alerts endpoint"""
+        with self._alerts_lock:
+            events = list(self.pending_alerts)
+        if not events or not self.server_accepts_alerts:
+            return 0
+        try:
+            response = self.transport.request(
+                "POST", f"{self.server_url}/api/devices/{self.device_id}/alerts", "send_alerts",
+                json={"events": events},
+                headers={"Content-Type": "application/json"}
+            )
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Error sending alerts (will retry): {e}")
+            return 0
+        
+        if response.status_code not in [200, 201]:
+            print(f"⚠️  Alert upload failed: {response.status_code} - {response.text[:100]}")
+            return 0
+        
+        with self._alerts_lock:
+            # Events queued while the request was in flight stay pending
+            self.pending_alerts = [event for event in self.pending_alerts if event not in events]
+        return len(events)
+    
+    def alert_sender_loop(self):
+        """Deliver alert events as soon as they are raised, retrying failed ones"""
+        while self.running:
+            self._alerts_ready.wait(self.ALERT_RETRY_INTERVAL)
+            self._alerts_ready.clear()
+            try:
+                self.flush_alerts()
+            except Exception as e:
+                print(f"❌ Error in alert sender: {e}")
+    
+    def start_alert_sender(self):
+        """Start sampling-driven alert evaluation and the background sender"""
+        if self.alerts is None:
+            return
+        self.monitor.metric_sampler.start()
+        thread = threading.Thread(target=self.alert_sender_loop)
+        thread.daemon = True
+        thread.start()
+    
+    def stop_alert_sender(self):
+        """Wake the sender so it notices the client stopped"""
+        self._alerts_ready.set()
+    
+    def request_report(self, events):
+        """Ask for a report right away (called from the event watcher thread)"""
+        with self._events_lock:
+            self.triggered_events.extend(events)
+        self._report_now.set()
+    
+    def take_triggered_events(self):
+        """Mark the collectors the triggered events made stale for refresh; returns the events"""
+        self._report_now.clear()
+        with self._events_lock:
+            events, self.triggered_events = self.triggered_events, []
+        for event in events:
+            print(f"⚡ {event['message']}")
+            for name in event["collectors"]:
+                self.monitor.scheduler.refresh(name)
+        return events
+    
+    def report_gap_remaining(self):
+        """Seconds an event-triggered report has to wait to keep MIN_REPORT_GAP after the previous one"""
+        if self.last_report_at is None:
+            return 0.0
+        return max(0.0, self.MIN_REPORT_GAP - (time.monotonic() - self.last_report_at))
+    
+    def wait_for_next_report(self, timeout):
+        """Sleep until the next report is due or an event asks for one now"""
+        if self._report_now.wait(timeout):
+            # An event right after a scheduled report is deferred, not sent back to back
+            time.sleep(self.report_gap_remaining())
+            self.take_triggered_events()
+    
+    def adapt_interval(self, data):
+        """Pick the next interval from how much the snapshot changed"""
+        interval = self.adaptive.update(data)
+        if interval != self.update_interval:
+            print(f"⏱️  Interval {self.update_interval}s → {interval}s ({self.adaptive.reason})")
+        self.update_interval = interval
+    
     def send_data(self):
         """Send laptop data to Next.js server"""
         try:
             # Get laptop data
-            data = self.monitor.get_all_data()
-            
-            # Prepare payload for Next.js API
-            payload = {
-                "deviceId": self.device_id,
-                "timestamp": datetime.now().isoformat(),
-                "hostname": platform.node(),
-                "data": data
-            }
+            data = self.collect()
+        except Exception as e:
+            print(f"❌ Error collecting data: {e}")
+            return None
+        
+        return self.post_payload(self.build_payload(data))
+    
+    def encode_body(self, body):
+        """Serialize a request body (MessagePack and gzip in compact mode, if the server accepts them)"""
+        if self.compact and self.server_accepts_msgpack and self.msgpack is not None:
+            data = self.msgpack.packb(body)
+            headers = {"Content-Type": "application/msgpack"}
+        else:
+            data = json.dumps(body, separators=(',', ':')).encode('utf-8')
+            headers = {"Content-Type": "application/json"}
+        if self.compact and self.server_accepts_gzip:
+            data = gzip.compress(data)
+            headers["Content-Encoding"] = "gzip"
+        return data, headers
+    
+    def _update_server_capabilities(self, response):
+        """Check which compact encodings the server advertises"""
+        self.server_accepts_gzip = 'gzip' in response.headers.get('Accept-Encoding', '').lower()
+        self.server_accepts_delta = response.headers.get('X-Telemetry-Delta') == '1'
+        self.server_accepts_msgpack = 'application/msgpack' in response.headers.get('Accept-Post', '').lower()
+        accepts_alerts = response.headers.get('X-Edge-Alerts') == '1'
+        if accepts_alerts and not self.server_accepts_alerts:
+            # Deliver alerts raised before the server was known to take them
+            self._alerts_ready.set()
+        self.server_accepts_alerts = accepts_alerts
+    
+    def post_payload(self, payload):
+        """POST a prepared payload to the Next.js data endpoint"""
+        try:
+            body = payload
+            encoded = None
+            if self.encoder and self.server_accepts_delta:
+                # Replace the full data with a keyframe or a delta
+                encoded = self.encoder.encode(payload["data"])
+                body = {key: value for key, value in payload.items() if key != "data"}
+                body.update(encoded)
+            data, headers = self.encode_body(body)
             
             # Send to Next.js API endpoint
-            response = self.session.post(
-                f"{self.server_url}/api/devices/data",
-                json=payload,
-                timeout=10,
-                headers={"Content-Type": "application/json"}
+            response = self.transport.request(
+                "POST", f"{self.server_url}/api/devices/data", "send_data",
+                data=data,
+                headers=headers
             )
+            self._update_server_capabilities(response)
+            
+            if response.status_code == 409 and encoded and encoded["encoding"] == "delta":
+                # Server lost the delta base (e.g., after a restart) - resend as a keyframe
+                self.encoder.reset()
+                self.stats.record_retry()
+                return self.post_payload(payload)
             
             if response.status_code in [200, 201]:
+                if encoded:
+                    self.encoder.commit(encoded)
                 result = response.json()
                 print(f"✅ Data sent at {datetime.now().strftime('%H:%M:%S')} - {result.get('message', 'OK')}")
+                # Server is reachable again - upload anything queued while offline
+                self.flush_spool()
                 return result
             else:
                 print(f"⚠️  Server responded: {response.status_code} - {response.text[:100]}")
+                # 4xx means the snapshot itself was refused; re-sending won't help
+                if response.status_code >= 500:
+                    self.queue_payload(payload)
                 return None
                 
+        except CircuitOpenError as e:
+            # Don't spend the tick on a server that is known to be down
+            print(f"⏸️  {e}")
+            self.queue_payload(payload)
+            return None
         except requests.exceptions.ConnectionError:
             print(f"❌ Cannot connect to {self.server_url}")
+            self.queue_payload(payload)
             return None
         except requests.exceptions.Timeout:
             print(f"❌ Request timeout")
+            self.queue_payload(payload)
             return None
         except Exception as e:
             print(f"❌ Error sending data: {e}")
             return None
     
-    def check_commands(self):
-        """Check for commands from Next.js server"""
+    def queue_payload(self, payload):
+        """Keep a payload in the offline spool so it can be sent later"""
+        if self.spool is not None:
+            self.spool.push(payload)
+            print(f"💾 Snapshot queued ({len(self.spool)} waiting)")
+    
+    def flush_spool(self):
+        """Upload queued snapshots in batches through the bulk endpoint"""
+        if self.spool is None:
+            return 0
+        
+        sent = 0
+        while True:
+            batch = self.spool.peek(self.SPOOL_BATCH_SIZE)
+            if not batch:
+                break
+            data, headers = self.encode_body({"snapshots": [payload for _, payload in batch]})
+            try:
+                response = self.transport.request(
+                    "POST", f"{self.server_url}/api/devices/data/bulk", "bulk_upload",
+                    read_timeout=30,
+                    data=data,
+                    headers=headers
+                )
+            except requests.exceptions.RequestException as e:
+                print(f"❌ Error uploading queued snapshots: {e}")
+                break
+            
+            if response.status_code == 400:
+                # The batch itself can never be accepted - don't re-send it forever
+                print(f"🗑️  Dropping {len(batch)} queued snapshot(s) rejected by the server: {response.text[:100]}")
+                self.spool.remove([row_id for row_id, _ in batch])
+                continue
+            if response.status_code not in [200, 201]:
+                print(f"⚠️  Bulk upload failed: {response.status_code} - {response.text[:100]}")
+                break
+            
+            # Stored and rejected snapshots both leave the spool
+            rejected = self._bulk_rejects(response)
+            if rejected:
+                print(f"🗑️  Dropped {len(rejected)} queued snapshot(s) rejected by the server")
+            self.spool.remove([row_id for row_id, _ in batch])
+            sent += len(batch) - len(rejected)
+        
+        if sent:
+            print(f"📤 Uploaded {sent} queued snapshot(s)")
+        return sent
+    
+    @staticmethod
+    def _bulk_rejects(response):
+        """Indexes of the snapshots a bulk upload response rejected"""
+        try:
+            rejected = response.json().get('rejected') or []
+        except ValueError:
+            return []
+        return [item.get('index') for item in rejected if isinstance(item, dict)]
+    
+    def fetch_commands(self):
+        """Get pending commands from Next.js server (without executing them)"""
         try:
-            response = self.session.get(
-                f"{self.server_url}/api/devices/{self.device_id}/commands",
-                timeout=10
+            response = self.command_transport.request(
+                "GET", f"{self.server_url}/api/devices/{self.device_id}/commands", "check_commands"
             )
             
             if response.status_code == 200:
                 result = response.json()
-                commands = result.get('commands', [])
+                commands = self.new_commands(result.get('commands', []))
                 
                 if commands:
                     print(f"\n📬 Received {len(commands)} command(s)")
                 
-                # Execute each command
-                for command in commands:
-                    self.execute_command(command)
-                
                 return commands
             elif response.status_code == 404:
                 # Endpoint not found or no commands
@@ -111,6 +496,41 @@ class SimpleClient:
             # Silent fail for command checks to not spam logs
             return []
     
+    def new_commands(self, commands):
+        """Drop commands that were already received (e.g., delivered again before their ack)"""
+        fresh = []
+        with self._seen_commands_lock:
+            for command in commands:
+                cmd_id = command.get('id')
+                if cmd_id is not None:
+                    if cmd_id in self._seen_commands:
+                        continue
+                    self._seen_commands.append(cmd_id)
+                fresh.append(command)
+        return fresh
+    
+    def check_commands(self):
+        """Check for commands from Next.js server"""
+        commands = self.fetch_commands()
+        self.handle_commands(commands)
+        return commands
+    
+    def handle_commands(self, commands):
+        """Execute each received command"""
+        for command in commands:
+            self.execute_command(command)
+    
+    def start_command_channel(self, handler):
+        """Open the long-poll command channel"""
+        from command_channel import CommandChannel
+        self.command_channel = CommandChannel(
+            self.server_url, self.device_id,
+            lambda commands: handler(self.new_commands(commands)),
+            self.command_transport,
+            fallback_interval=self.update_interval
+        )
+        self.command_channel.start()
+    
     def execute_command(self, command):
         """Execute command received from server"""
         cmd_type = command.get('type', '').lower()
@@ -118,44 +538,75 @@ class SimpleClient:
         
         print(f"\n🎯 Command received: {cmd_type} (ID: {cmd_id})")
         
-        if cmd_type == 'shutdown':
-            print("⚠️  SHUTDOWN in 10 seconds... (Ctrl+C to cancel)")
-            time.sleep(10)
-            if platform.system() == "Windows":
-                os.system("shutdown /s /t 0")
-            else:
-                os.system("shutdown -h now")
-                
-        elif cmd_type == 'restart':
-            print("⚠️  RESTART in 10 seconds... (Ctrl+C to cancel)")
-            time.sleep(10)
-            if platform.system() == "Windows":
-                os.system("shutdown /r /t 0")
-            else:
-                os.system("shutdown -r now")
-                
-        elif cmd_type == 'stop':
+        if cmd_type in self.POWER_COMMANDS:
+            print(f"⚠️  {cmd_type.upper()} in {self.POWER_COMMAND_DELAY} seconds... (Ctrl+C to cancel)")
+            time.sleep(self.POWER_COMMAND_DELAY)
+            self.run_power_command(cmd_type)
+        else:
+            self.apply_command(command)
+        
+        # Acknowledge command
+        self.acknowledge_command(cmd_id)
+    
+    def run_power_command(self, cmd_type):
+        """Shut down or restart the machine"""
+        if platform.system() == "Windows":
+            os.system(f"shutdown {'/s' if cmd_type == 'shutdown' else '/r'} /t 0")
+        else:
+            os.system(f"shutdown {'-h' if cmd_type == 'shutdown' else '-r'} now")
+    
+    def apply_command(self, command):
+        """Apply a command that doesn't power off the machine"""
+        cmd_type = command.get('type', '').lower()
+        
+        if cmd_type == 'stop':
             print("🛑 Stopping client...")
             self.running = False
             
         elif cmd_type == 'update_interval':
             new_interval = command.get('value', 10)
+            if isinstance(new_interval, bool) or not isinstance(new_interval, (int, float)) or not new_interval > 0:
+                print(f"❌ update_interval needs a positive number of seconds, got {new_interval!r}")
+                return
             print(f"⏱️  Interval changed to {new_interval}s")
             self.update_interval = new_interval
+            if self.adaptive is not None:
+                # Adaptive mode continues from the requested interval
+                self.adaptive.reset(new_interval)
+            
+        elif cmd_type == 'set_alert_rules':
+            self.set_alert_rules((command.get('payload') or {}).get('rules'))
             
         else:
             print(f"❓ Unknown command: {cmd_type}")
-        
-        # Acknowledge command
-        self.acknowledge_command(cmd_id)
+    
+    def set_alert_rules(self, rules):
+        """Replace the alert rules with ones pushed by the server (kept across restarts)"""
+        if self.alerts is None:
+            print("⚠️  Alert rules received but edge alerting is off (start with --edge-alerts)")
+            return
+        if not isinstance(rules, list):
+            print("❌ set_alert_rules needs a list of rules")
+            return
+        try:
+            self.alerts.set_rules(rules)
+        except ValueError as e:
+            print(f"❌ Invalid alert rules, keeping the current ones: {e}")
+            return
+        print(f"🔔 {len(rules)} alert rule(s) applied")
+        if self.cache is not None:
+            self.cache.set("alert_rules", rules)
+            self.cache.save()
     
     def acknowledge_command(self, command_id):
         """Tell server that command was executed"""
         try:
-            response = self.session.post(
-                f"{self.server_url}/api/devices/{self.device_id}/commands/{command_id}/ack",
+            response = self.command_transport.request(
+                "POST", f"{self.server_url}/api/devices/{self.device_id}/commands/{command_id}/ack",
+                "acknowledge_command",
+                # Acknowledging twice is harmless
+                idempotent=True,
                 json={"status": "executed", "timestamp": datetime.now().isoformat()},
-                timeout=10,
                 headers={"Content-Type": "application/json"}
             )
             if response.status_code == 200:
@@ -165,6 +616,24 @@ class SimpleClient:
         except Exception as e:
             print(f"❌ Error acknowledging command: {e}")
     
+    def start_metrics_server(self):
+        """Expose agent metrics locally if a metrics port is configured"""
+        if self.metrics_port is None:
+            return
+        from agent_stats import MetricsServer
+        try:
+            self.metrics_server = MetricsServer(self.stats, self.metrics_port)
+            self.metrics_server.start()
+        except OSError as e:
+            print(f"⚠️  Cannot serve metrics on port {self.metrics_port}: {e}")
+            self.metrics_server = None
+    
+    def stop_metrics_server(self):
+        """Stop the local metrics endpoint"""
+        if self.metrics_server:
+            self.metrics_server.stop()
+            self.metrics_server = None
+    
     def run(self):
         """Main loop - send data and check for commands"""
         print("=" * 60)
@@ -172,21 +641,35 @@ class SimpleClient:
         print("=" * 60)
         print(f"📡 Server: {self.server_url}")
         print(f"🆔 Device: {self.device_id}")
-        print(f"⏱️  Interval: {self.update_interval}s")
+        if self.adaptive is not None:
+            print(f"⏱️  Interval: adaptive, {self.adaptive.min_interval}-{self.adaptive.max_interval}s")
+        else:
+            print(f"⏱️  Interval: {self.update_interval}s")
+        if self.alerts is not None:
+            print(f"🔔 Edge alerting: {len(self.alerts.rules)} rule(s)")
+        if self.events is not None:
+            print(f"⚡ Immediate reports on power, partition and {len(self.events.thresholds)} threshold change(s)")
         print("Press Ctrl+C to stop\n")
         
         self.running = True
+        self.start_metrics_server()
+        self.start_alert_sender()
+        if self.events is not None:
+            self.events.start()
+        if self.long_poll:
+            self.start_command_channel(self.handle_commands)
         
         while self.running:
             try:
                 # Send laptop data
                 self.send_data()
                 
-                # Check for commands
-                self.check_commands()
+                # Check for commands (the long-poll channel delivers them on its own)
+                if not self.long_poll:
+                    self.check_commands()
                 
-                # Wait
-                time.sleep(self.update_interval)
+                # Wait (cut short by state changes in events mode)
+                self.wait_for_next_report(self.update_interval)
                 
             except KeyboardInterrupt:
                 print("\n\n👋 Stopped by user")
@@ -194,6 +677,13 @@ class SimpleClient:
             except Exception as e:
                 print(f"❌ Error: {e}")
                 time.sleep(self.update_interval)
+        
+        if self.events is not None:
+            self.events.stop()
+        if self.command_channel:
+            self.command_channel.stop()
+        self.stop_metrics_server()
+        self.stop_alert_sender()
 
 
 def main():
@@ -207,13 +697,91 @@ def main():
                         help='Update interval in seconds (default: 10)')
     parser.add_argument('--device-id', type=str, default=None,
                         help='Device ID (auto-generated if not provided)')
+    parser.add_argument('--parallel', action='store_true',
+                        help='Run data collectors concurrently with per-collector timeouts')
+    parser.add_argument('--spool', type=str, default=data_path('telemetry_spool.db'),
+                        help='File that queues snapshots while the server is unreachable (default: %(default)s)')
+    parser.add_argument('--no-spool', action='store_true',
+                        help='Drop snapshots while offline instead of queueing them')
+    parser.add_argument('--history', type=str, default=data_path('history'),
+                        help='Folder for the local metric history queried with history.py (default: %(default)s)')
+    parser.add_argument('--no-history', action='store_true',
+                        help='Don\'t keep a local metric history')
+    parser.add_argument('--history-days', type=int, default=30,
+                        help='Days of local history kept (default: 30)')
+    parser.add_argument('--cache', type=str, default=data_path('agent_cache.json'),
+                        help='File caching the device ID and static system info between runs (default: %(default)s)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Recompute the device ID and system info on every start')
+    parser.add_argument('--fast-start', action='store_true',
+                        help='Send the first report immediately with cheap metrics only (slow collectors follow on the next tick)')
+    parser.add_argument('--edge-alerts', action='store_true',
+                        help='Evaluate alert rules on every local sample and send alerts as they fire')
+    parser.add_argument('--events', action='store_true',
+                        help='Report immediately on plug/unplug, threshold crossings and partition changes')
+    parser.add_argument('--event-threshold', action='append', default=None, metavar='METRIC<OP><VALUE>',
+                        help='Threshold that triggers an immediate report in --events mode, e.g. '
+                             'memory_percent>90 (repeatable; replaces the defaults)')
+    parser.add_argument('--compact', action='store_true',
+                        help='Send delta-encoded, gzip-compressed payloads when the server supports it')
+    parser.add_argument('--long-poll', action='store_true',
+                        help='Receive commands over a held-open request instead of polling every interval')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='Run collection, upload and command polling as independent asyncio tasks')
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help='Serve the agent\'s own CPU, memory and HTTP metrics on localhost:<port>/metrics')
+    parser.add_argument('--connect-timeout', type=float, default=3.05,
+                        help='Seconds to wait for a connection to the server (default: 3.05)')
+    parser.add_argument('--read-timeout', type=float, default=10,
+                        help='Seconds to wait for a server response (default: 10)')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='Report less often while metrics are flat or on battery, more often on changes and alerts')
+    parser.add_argument('--min-interval', type=int, default=5,
+                        help='Fastest interval in adaptive mode (default: 5)')
+    parser.add_argument('--max-interval', type=int, default=120,
+                        help='Slowest interval in adaptive mode (default: 120)')
     
     args = parser.parse_args()
     
-    client = SimpleClient(
+    event_thresholds = None
+    if args.event_threshold:
+        from event_watcher import parse_threshold
+        try:
+            event_thresholds = [parse_threshold(text) for text in args.event_threshold]
+        except ValueError as e:
+            parser.error(str(e))
+    
+    # Relative paths still resolve against the working folder; create whichever is used
+    for path in (None if args.no_spool else args.spool, None if args.no_cache else args.cache):
+        if path:
+            ensure_parent(path)
+    
+    client_class = SimpleClient
+    if args.use_async:
+        from async_client import AsyncClient
+        client_class = AsyncClient
+    
+    client = client_class(
         server_url=args.server,
         device_id=args.device_id,
-        update_interval=args.interval
+        update_interval=args.interval,
+        parallel=args.parallel,
+        spool_path=None if args.no_spool else args.spool,
+        compact=args.compact,
+        long_poll=args.long_poll,
+        metrics_port=args.metrics_port,
+        adaptive=args.adaptive,
+        min_interval=args.min_interval,
+        max_interval=args.max_interval,
+        connect_timeout=args.connect_timeout,
+        read_timeout=args.read_timeout,
+        history_dir=None if args.no_history else args.history,
+        history_days=args.history_days,
+        cache_path=None if args.no_cache else args.cache,
+        fast_start=args.fast_start,
+        edge_alerts=args.edge_alerts,
+        events=args.events,
+        event_thresholds=event_thresholds
     )
     
     try:
@@ -0,0 +1,177 @@
+"""
+Tiered collector scheduler
+Runs each data collector on its own refresh period and caches the newest value
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+class Collector:
+    """A single data collector with its own refresh period and cost budget"""
+
+    def __init__(self, name, func, period=0, budget=None, default=None,
+                 timeout=None, required=False):
+        """
+        Initialize collector
+
+        Args:
+            name: Key used in the collected data (e.g., 'disk_info')
+            func: Callable that returns the collector value
+            period: Seconds between refreshes (0 = every call, None = collect once)
+            budget: Seconds a single run may take before the period is stretched
+            default: Value reported before the first successful run
+            timeout: Seconds to wait for the collector in parallel mode
+            required: Always wait for the first value (no usable default)
+        """
+        self.name = name
+        self.func = func
+        self.period = period
+        self.budget = budget
+        self.default = default
+        self.timeout = timeout
+        self.required = required
+        self.value = default
+        self.collected_at = None
+        self.duration = None
+        self.backoff = 1
+        self.future = None  # In-flight run in parallel mode
+
+    def is_due(self, now):
+        """Check if the collector needs a refresh"""
+        if self.collected_at is None:
+            return True
+        if self.period is None:
+            return False
+        return now - self.collected_at >= self.period * self.backoff
+
+    def run(self):
+        """Run the collector and update its cached value"""
+        start = time.perf_counter()
+        try:
+            self.value = self.func()
+            # Only a successful run counts as fresh; a failed one is retried next call
+            self.collected_at = time.monotonic()
+        finally:
+            self.duration = time.perf_counter() - start
+            self._apply_budget()
+        return self.value
+
+    def _apply_budget(self):
+        """Stretch the refresh period while the collector runs over its budget"""
+        if not self.budget or not self.period:
+            return
+        if self.duration > self.budget:
+            self.backoff = min(self.backoff * 2, 8)
+        else:
+            self.backoff = 1
+
+    def age(self, now):
+        """Seconds since the cached value was collected"""
+        if self.collected_at is None:
+            return None
+        return round(now - self.collected_at, 3)
+
+
+class CollectorScheduler:
+    """Runs due collectors and returns the newest cached value of each"""
+
+    def __init__(self, max_workers=None, default_timeout=2.0):
+        """
+        Initialize scheduler
+
+        Args:
+            max_workers: Size of the worker pool for parallel collection (None = sequential)
+            default_timeout: Per-collector deadline in parallel mode when none is set
+        """
+        self.collectors = {}
+        self.default_timeout = default_timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_workers) if max_workers else None
+
+    def register(self, name, func, period=0, budget=None, default=None,
+                 timeout=None, required=False):
+        """Register a collector"""
+        self.collectors[name] = Collector(
+            name, func, period=period, budget=budget, default=default,
+            timeout=timeout, required=required,
+        )
+        return self.collectors[name]
+
+    def set_period(self, name, period):
+        """Change the refresh period of a collector"""
+        self.collectors[name].period = period
+
+    def refresh(self, name):
+        """Force a collector to run on the next collect()"""
+        self.collectors[name].collected_at = None
+
+    def seed(self, name, value):
+        """Report `value` (e.g., from a disk cache) until the collector first runs"""
+        self.collectors[name].value = value
+
+    def _should_run(self, collector, now, skip):
+        """Due and not skipped (a required collector without any value always runs)"""
+        if not collector.is_due(now):
+            return False
+        return collector.name not in skip or (collector.required and collector.value is None)
+
+    def collect(self, skip=()):
+        """
+        Run all due collectors
+
+        Args:
+            skip: Names of collectors to leave for a later collect() (cached value or
+                  default is reported)
+
+        Returns:
+            (values, ages, stale) - newest value and age in seconds per collector,
+            and the names of collectors that missed their deadline
+        """
+        if self.executor:
+            stale = self._collect_parallel(skip)
+        else:
+            stale = []
+            now = time.monotonic()
+            for collector in self.collectors.values():
+                if self._should_run(collector, now, skip):
+                    self._run(collector)
+
+        now = time.monotonic()
+        values = {name: c.value for name, c in self.collectors.items()}
+        ages = {name: c.age(now) for name, c in self.collectors.items()}
+        return values, ages, stale
+
+    def _run(self, collector):
+        """Run a collector, keeping its previous value on error"""
+        try:
+            collector.run()
+        except Exception as e:
+            print(f"Error in collector {collector.name}: {e}")
+
+    def _collect_parallel(self, skip=()):
+        """Fan due collectors out over the worker pool, each under its own deadline"""
+        start = time.monotonic()
+        for collector in self.collectors.values():
+            # A collector still running from an earlier snapshot is not resubmitted
+            if collector.future is None and self._should_run(collector, start, skip):
+                collector.future = self.executor.submit(self._run, collector)
+
+        stale = []
+        for collector in self.collectors.values():
+            if collector.future is None:
+                continue
+            if collector.required and collector.collected_at is None:
+                timeout = None
+            else:
+                timeout = collector.timeout or self.default_timeout
+                timeout = max(start + timeout - time.monotonic(), 0)
+            done, _ = wait([collector.future], timeout=timeout)
+            if done:
+                collector.future = None
+            else:
+                stale.append(collector.name)
+        return stale
+
+    def shutdown(self):
+        """Stop the worker pool without waiting for hung collectors"""
+        if self.executor:
+            self.executor.shutdown(wait=False)
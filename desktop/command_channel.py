@@ -0,0 +1,98 @@
+"""
+Long-poll command channel
+Holds one request open to the commands endpoint so commands arrive immediately
+"""
+import random
+import threading
+
+from transport import CircuitOpenError
+
+
+class CommandChannel:
+    """Background long-poll loop that hands received commands to a handler"""
+
+    def __init__(self, server_url, device_id, handler, transport, wait=25, fallback_interval=10,
+                 max_backoff=60):
+        """
+        Initialize channel
+
+        Args:
+            server_url: Next.js server URL
+            device_id: Device whose commands are received
+            handler: Callable(commands) invoked with each non-empty command list
+            transport: Client Transport the requests go through (shares its circuit
+                       breaker, keep-alive pool and AgentStats)
+            wait: Seconds the server may hold each request open (default: 25)
+            fallback_interval: Seconds between polls if the server doesn't support long-poll
+            max_backoff: Longest delay between reconnect attempts (default: 60)
+        """
+        self.url = f"{server_url.rstrip('/')}/api/devices/{device_id}/commands"
+        self.handler = handler
+        self.wait = wait
+        self.fallback_interval = fallback_interval
+        self.max_backoff = max_backoff
+        self.transport = transport
+        self.running = False
+        self.channel_thread = None
+        self._stop_event = threading.Event()
+
+    def poll_once(self):
+        """
+        Make one long-poll request
+
+        Returns:
+            (commands, long_poll_supported)
+        """
+        response = self.transport.request(
+            "GET", self.url, "commands",
+            # Read timeout must outlast the server-side wait
+            read_timeout=self.wait + 10,
+            params={"wait": self.wait},
+        )
+        response.raise_for_status()
+        result = response.json()
+        return result.get('commands', []), bool(result.get('longPoll'))
+
+    def channel_loop(self):
+        """Reconnect loop with jittered exponential backoff on errors"""
+        failures = 0
+        while not self._stop_event.is_set():
+            try:
+                commands, long_poll = self.poll_once()
+                failures = 0
+            except CircuitOpenError:
+                # The client already knows the server is down - wait for the breaker's next probe
+                self._stop_event.wait(max(1.0, self.transport.breaker.retry_in()))
+                continue
+            except Exception as e:
+                failures += 1
+                delay = min(self.max_backoff, 2 ** failures)
+                delay = random.uniform(delay / 2, delay)
+                if failures == 1:
+                    print(f"⚠️  Command channel disconnected ({e}), reconnecting...")
+                self._stop_event.wait(delay)
+                continue
+
+            if commands:
+                print(f"\n📬 Received {len(commands)} command(s)")
+                try:
+                    self.handler(commands)
+                except Exception as e:
+                    print(f"❌ Error handling commands: {e}")
+            elif not long_poll:
+                # Older server answered immediately - don't spin
+                self._stop_event.wait(self.fallback_interval)
+
+    def start(self):
+        """Start the background channel"""
+        if not self.running:
+            self.running = True
+            self._stop_event.clear()
+            self.channel_thread = threading.Thread(target=self.channel_loop)
+            self.channel_thread.daemon = True
+            self.channel_thread.start()
+
+    def stop(self):
+        """Stop the background channel (an open request finishes in the background)"""
+        self.running = False
+        self._stop_event.set()
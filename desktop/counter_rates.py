@@ -0,0 +1,57 @@
+"""
+Counter rate tracking
+Turns cumulative counters (bytes, packets, I/O ops) into per-second rates
+"""
+import time
+
+# 32-bit counters (e.g., per-NIC bytes on Windows) wrap at this value
+WRAP_MODULUS = 2 ** 32
+# A counter that drops after getting this close to WRAP_MODULUS has wrapped;
+# any other drop is a reset (reboot, driver reload)
+WRAP_MARGIN = 2 ** 30
+
+
+class CounterRates:
+    """Keeps the previous sample per key and computes per-second deltas"""
+
+    def __init__(self):
+        self.previous = {}  # key -> (monotonic time, counter values)
+
+    def update(self, key, values, now=None):
+        """
+        Record a new sample of counters for `key`
+
+        Args:
+            key: Counter source (e.g., 'net', a NIC name or a disk name)
+            values: Tuple of cumulative counter values
+            now: Monotonic timestamp of the sample (default: now)
+
+        Returns:
+            Tuple of per-second rates, or None for the first sample of a key and
+            for the sample after a counter reset
+        """
+        now = time.monotonic() if now is None else now
+        previous = self.previous.get(key)
+        self.previous[key] = (now, tuple(values))
+        if previous is None:
+            return None
+
+        elapsed = now - previous[0]
+        if elapsed <= 0:
+            return None
+
+        rates = []
+        for current, last in zip(values, previous[1]):
+            delta = current - last
+            if delta < 0:
+                if not WRAP_MODULUS - WRAP_MARGIN <= last < WRAP_MODULUS:
+                    # Reset - the time the counter restarted from zero is unknown
+                    return None
+                delta += WRAP_MODULUS
+            rates.append(round(delta / elapsed, 2))
+        return tuple(rates)
+
+    def forget(self, keys):
+        """Drop state for keys that disappeared (e.g., removed NICs)"""
+        for key in keys:
+            self.previous.pop(key, None)
@@ -0,0 +1,127 @@
+"""
+Background CPU sampling engine
+Keeps a rolling window of CPU times so usage can be answered instantly
+"""
+import threading
+import time
+from collections import deque
+
+import psutil
+
+
+class CPUSampler:
+    """Samples per-core CPU times in the background and computes usage over any window"""
+
+    # Shortest window a usage figure is computed over (shorter ones are noise)
+    MIN_WINDOW = 0.1
+
+    def __init__(self, sample_interval=0.5, history_seconds=120, backend=None):
+        """
+        Initialize sampler
+
+        Args:
+            sample_interval: Seconds between CPU time samples (default: 0.5)
+            history_seconds: How much history to keep in the rolling window (default: 120)
+            backend: psutil-compatible source of CPU times (default: psutil)
+        """
+        self.backend = backend or psutil
+        self.sample_interval = sample_interval
+        self.samples = deque(maxlen=int(history_seconds / sample_interval) + 2)
+        self.running = False
+        self.sampler_thread = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def _read_cpu_times(self):
+        """Read (busy, total) CPU time per core from one consistent sample"""
+        times = []
+        for cpu in self.backend.cpu_times(percpu=True):
+            total = sum(cpu)
+            # On Linux guest time is already counted in user/nice
+            total -= getattr(cpu, 'guest', 0) + getattr(cpu, 'guest_nice', 0)
+            idle = cpu.idle + getattr(cpu, 'iowait', 0)
+            times.append((total - idle, total))
+        return times
+
+    def sample(self):
+        """Take one sample and add it to the rolling window"""
+        entry = (time.monotonic(), self._read_cpu_times())
+        with self._lock:
+            self.samples.append(entry)
+        return entry
+
+    def sampler_loop(self):
+        """Background sampling loop"""
+        while not self._stop_event.wait(self.sample_interval):
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"Error in CPU sampler: {e}")
+
+    def start(self):
+        """Start background sampling"""
+        if not self.running:
+            self.running = True
+            self._stop_event.clear()
+            self.sample()
+            self.sampler_thread = threading.Thread(target=self.sampler_loop)
+            self.sampler_thread.daemon = True
+            self.sampler_thread.start()
+
+    def stop(self):
+        """Stop background sampling"""
+        self.running = False
+        self._stop_event.set()
+        if self.sampler_thread:
+            self.sampler_thread.join()
+            self.sampler_thread = None
+
+    def usage(self, window=1.0):
+        """
+        Get CPU usage over the last `window` seconds
+
+        Returns:
+            (aggregate_percent, per_cpu_percent) computed from the same pair of samples
+        """
+        if not self.running:
+            self.start()
+
+        with self._lock:
+            if len(self.samples) < 2:
+                newest = None
+            else:
+                newest = self.samples[-1]
+                cutoff = newest[0] - window
+                oldest = self.samples[0]
+                # Newest sample that is at least `window` seconds older than the latest one
+                for entry in reversed(self.samples):
+                    if entry[0] <= cutoff:
+                        oldest = entry
+                        break
+
+        if newest is None:
+            # Not enough history yet - measure since the first sample
+            with self._lock:
+                oldest = self.samples[0]
+            newest = self.sample()
+            if newest[0] - oldest[0] < self.MIN_WINDOW:
+                # Sampler just started - report the average since boot instead of
+                # a near-zero window (and without blocking to wait for one)
+                oldest = (0.0, [(0.0, 0.0)] * len(newest[1]))
+
+        return self._compute_usage(oldest[1], newest[1])
+
+    def _compute_usage(self, old_times, new_times):
+        """Turn two per-core samples into aggregate and per-core percentages"""
+        per_cpu = []
+        busy_sum = 0.0
+        total_sum = 0.0
+        for (old_busy, old_total), (new_busy, new_total) in zip(old_times, new_times):
+            busy = max(new_busy - old_busy, 0.0)
+            total = new_total - old_total
+            busy_sum += busy
+            total_sum += max(total, 0.0)
+            per_cpu.append(round(min(busy / total * 100, 100.0), 1) if total > 0 else 0.0)
+
+        aggregate = round(min(busy_sum / total_sum * 100, 100.0), 1) if total_sum > 0 else 0.0
+        return aggregate, per_cpu
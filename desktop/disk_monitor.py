@@ -0,0 +1,157 @@
+"""
+Disk collection subsystem
+Filters mounts, stats each one under a timeout and reports I/O throughput
+"""
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor, wait
+
+import psutil
+
+from counter_rates import CounterRates
+
+
+class DiskMonitor:
+    """Collects per-mount capacity and per-disk I/O rates without hanging on slow mounts"""
+
+    # Network and pseudo filesystems that can hang or don't describe local disks
+    DEFAULT_FSTYPE_DENY = (
+        "nfs", "nfs4", "cifs", "smbfs", "smb3", "sshfs", "fuse.sshfs",
+        "davfs", "afs", "9p", "autofs", "squashfs",
+    )
+
+    def __init__(self, fstype_allow=None, fstype_deny=DEFAULT_FSTYPE_DENY,
+                 mount_timeout=2.0, capacity_ttl=60, max_workers=4, backend=None):
+        """
+        Initialize disk monitor
+
+        Args:
+            fstype_allow: Only include these filesystem types (None = all)
+            fstype_deny: Never include these filesystem types
+            mount_timeout: Seconds to wait for a mount's usage stats (default: 2.0)
+            capacity_ttl: Seconds capacity stays cached per mount (default: 60)
+            max_workers: Threads used to stat mounts (default: 4)
+            backend: psutil-compatible source of partitions and I/O counters (default: psutil)
+        """
+        self.backend = backend or psutil
+        self.fstype_allow = {t.lower() for t in fstype_allow} if fstype_allow else None
+        self.fstype_deny = {t.lower() for t in fstype_deny or ()}
+        self.mount_timeout = mount_timeout
+        self.capacity_ttl = capacity_ttl
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.capacity = {}  # mountpoint -> (monotonic time, disk entry)
+        self.pending = {}  # mountpoint -> future still running (slow or hung mount)
+        self.pool_futures = set()  # Unfinished futures of the current pool (not of replaced ones)
+        self.io_rates = CounterRates()
+
+    def get_partitions(self):
+        """Get mounted partitions that pass the fstype allow/deny lists"""
+        partitions = []
+        for partition in self.backend.disk_partitions():
+            fstype = partition.fstype.lower()
+            if fstype in self.fstype_deny:
+                continue
+            if self.fstype_allow is not None and fstype not in self.fstype_allow:
+                continue
+            partitions.append(partition)
+        return partitions
+
+    def _stat(self, partition):
+        """Get usage for one partition (runs in a worker thread)"""
+        usage = self.backend.disk_usage(partition.mountpoint)
+        return {
+            "device": partition.device,
+            "mountpoint": partition.mountpoint,
+            "fstype": partition.fstype,
+            "total_gb": round(usage.total / (1024**3), 2),
+            "used_gb": round(usage.used / (1024**3), 2),
+            "free_gb": round(usage.free / (1024**3), 2),
+            "percent": usage.percent,
+        }
+
+    def _replace_hung_pool(self):
+        """
+        Start a fresh worker pool once every worker is stuck on a hung mount
+        (the stuck threads are left behind; each mount has at most one in flight)
+        """
+        hung = sum(1 for future in self.pool_futures if future.running())
+        if hung < self.max_workers:
+            return
+        # Probes queued behind the hung ones are cancelled and resubmitted next time;
+        # the abandoned probes stay in self.pending but no longer count as hung
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        self.pool_futures = set()
+
+    def get_disk_info(self):
+        """Get capacity per partition, refreshing stale entries under a timeout"""
+        partitions = self.get_partitions()
+        self._replace_hung_pool()
+        now = time.monotonic()
+
+        submitted = {}
+        for partition in partitions:
+            mountpoint = partition.mountpoint
+            cached = self.capacity.get(mountpoint)
+            if cached and now - cached[0] < self.capacity_ttl:
+                continue
+            if mountpoint in self.pending:
+                # Previous stat of this mount hasn't returned yet - don't pile up threads
+                continue
+            submitted[mountpoint] = self.executor.submit(self._stat, partition)
+            self.pool_futures.add(submitted[mountpoint])
+
+        if submitted:
+            wait(submitted.values(), timeout=self.mount_timeout)
+
+        for mountpoint, future in list(submitted.items()) + list(self.pending.items()):
+            if not future.done():
+                self.pending[mountpoint] = future
+                continue
+            self.pending.pop(mountpoint, None)
+            self.pool_futures.discard(future)
+            try:
+                self.capacity[mountpoint] = (time.monotonic(), future.result())
+            except CancelledError:
+                continue
+            except (PermissionError, OSError):
+                self.capacity.pop(mountpoint, None)
+
+        # Keep the original partition order; unmounted partitions drop out
+        mounted = {partition.mountpoint for partition in partitions}
+        for mountpoint in list(self.capacity):
+            if mountpoint not in mounted:
+                del self.capacity[mountpoint]
+        return [
+            self.capacity[partition.mountpoint][1]
+            for partition in partitions
+            if partition.mountpoint in self.capacity
+        ]
+
+    def get_disk_io(self):
+        """Get read/write bytes per second and IOPS per physical disk"""
+        try:
+            counters = self.backend.disk_io_counters(perdisk=True)
+        except (RuntimeError, OSError):
+            return None
+        if not counters:
+            return None
+
+        disk_io = {}
+        for disk, io in counters.items():
+            rates = self.io_rates.update(disk, (
+                io.read_bytes, io.write_bytes, io.read_count, io.write_count,
+            ))
+            read_bps, write_bps, read_iops, write_iops = rates or (None, None, None, None)
+            disk_io[disk] = {
+                "read_bytes_per_sec": read_bps,
+                "write_bytes_per_sec": write_bps,
+                "read_iops": read_iops,
+                "write_iops": write_iops,
+            }
+        self.io_rates.forget([disk for disk in self.io_rates.previous if disk not in counters])
+        return disk_io
+
+    def shutdown(self):
+        """Stop worker threads without waiting for hung mounts"""
+        self.executor.shutdown(wait=False)
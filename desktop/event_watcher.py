@@ -0,0 +1,208 @@
+"""
+State change watcher
+Polls cheap signals between reports and requests an immediate report when something important changes
+"""
+import re
+import threading
+import time
+
+import psutil
+
+from alert_rules import OPERATORS
+
+
+# Edge-triggered: each fires once when crossed and re-arms when the metric
+# goes back. Battery levels only apply while unplugged.
+DEFAULT_THRESHOLDS = [
+    {"metric": "battery_percent", "op": "<", "threshold": 20},
+    {"metric": "battery_percent", "op": "<", "threshold": 10},
+    {"metric": "memory_percent", "op": ">", "threshold": 95},
+]
+
+# Collectors whose cached value an event makes stale
+EVENT_COLLECTORS = {
+    "power": ("battery_info", "power_info"),
+    "battery_percent": ("battery_info", "power_info"),
+    "memory_percent": ("memory_info",),
+    "cpu_percent": ("cpu_info",),
+    "partitions": ("disk_info", "disk_io"),
+}
+
+_THRESHOLD_PATTERN = re.compile(r"^\s*(\w+)\s*(>=|<=|>|<)\s*(-?[\d.]+)\s*$")
+
+
+def parse_threshold(text):
+    """
+    Parse a threshold given on the command line (e.g., 'memory_percent>90')
+
+    Raises:
+        ValueError: If the text isn't '<metric><op><number>' for a watched metric
+    """
+    match = _THRESHOLD_PATTERN.match(text)
+    if not match:
+        raise ValueError(f"Invalid threshold {text!r} (expected e.g. memory_percent>90)")
+    metric, op, threshold = match.groups()
+    if metric not in EventWatcher.METRICS:
+        raise ValueError(f"Unknown metric {metric!r} (one of {', '.join(EventWatcher.METRICS)})")
+    return {"metric": metric, "op": op, "threshold": float(threshold)}
+
+
+def _busy_total(times):
+    """(busy, total) CPU seconds from cpu_times(), counted the way psutil.cpu_percent does"""
+    # guest time is already included in user/nice
+    total = sum(times) - getattr(times, "guest", 0) - getattr(times, "guest_nice", 0)
+    idle = times.idle + getattr(times, "iowait", 0)
+    return total - idle, total
+
+
+class EventWatcher:
+    """Watches power state, thresholds and mounted partitions between reports"""
+
+    METRICS = ("battery_percent", "memory_percent", "cpu_percent")
+
+    def __init__(self, on_trigger, thresholds=None, poll_interval=2.0, debounce=3.0,
+                 min_gap=15.0, backend=None, partitions=None):
+        """
+        Initialize watcher
+
+        Args:
+            on_trigger: Callable(events) invoked from the watcher thread when a
+                        report should be sent now; each event is a dict with
+                        'kind', 'message' and the 'collectors' it made stale
+            thresholds: [{'metric', 'op', 'threshold'}] crossings that trigger a
+                        report (default: DEFAULT_THRESHOLDS)
+            poll_interval: Seconds between polls (default: 2)
+            debounce: Seconds to gather related events (unplugging often also moves
+                      the battery level) before triggering (default: 3)
+            min_gap: Minimum seconds between two triggered reports (default: 15)
+            backend: psutil-compatible metrics source (default: psutil)
+            partitions: Callable returning the mounted partitions to watch
+                        (default: backend.disk_partitions)
+        """
+        self.on_trigger = on_trigger
+        self.thresholds = []
+        for threshold in DEFAULT_THRESHOLDS if thresholds is None else thresholds:
+            if threshold["metric"] not in self.METRICS or threshold["op"] not in OPERATORS:
+                raise ValueError(f"Invalid threshold {threshold!r}")
+            self.thresholds.append(dict(threshold, armed=True))
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.min_gap = min_gap
+        self.backend = backend or psutil
+        self.partitions = partitions or self.backend.disk_partitions
+        self.metrics = {threshold["metric"] for threshold in self.thresholds}
+
+        self.plugged = None
+        self.mounts = None
+        self.cpu_times = None
+        self.pending = []
+        self.pending_since = None
+        self.last_trigger = None
+        self.running = False
+        self.watcher_thread = None
+        self._stop_event = threading.Event()
+
+    def read_signals(self):
+        """Current plugged state, metric values and mount points (only what is watched)"""
+        values = {}
+        plugged = None
+        battery = self.backend.sensors_battery()
+        if battery is not None:
+            plugged = battery.power_plugged
+            values["battery_percent"] = battery.percent
+        if "memory_percent" in self.metrics:
+            values["memory_percent"] = self.backend.virtual_memory().percent
+        if "cpu_percent" in self.metrics:
+            busy, total = _busy_total(self.backend.cpu_times())
+            if self.cpu_times is not None and total > self.cpu_times[1]:
+                values["cpu_percent"] = 100.0 * (busy - self.cpu_times[0]) / (total - self.cpu_times[1])
+            self.cpu_times = (busy, total)
+        mounts = frozenset(partition.mountpoint for partition in self.partitions())
+        return plugged, values, mounts
+
+    def check(self):
+        """Poll once; returns the events detected"""
+        plugged, values, mounts = self.read_signals()
+        events = []
+
+        if plugged is not None and self.plugged is not None and plugged != self.plugged:
+            events.append(self._event("power", "AC power connected" if plugged else "Unplugged from AC power"))
+        if plugged is not None:
+            self.plugged = plugged
+
+        for threshold in self.thresholds:
+            value = values.get(threshold["metric"])
+            if value is None:
+                continue
+            holds = OPERATORS[threshold["op"]](value, threshold["threshold"])
+            if threshold["metric"] == "battery_percent" and self.plugged is not False:
+                holds = False  # Charging - battery levels are not a concern
+            if holds and threshold["armed"]:
+                threshold["armed"] = False
+                events.append(self._event(
+                    threshold["metric"],
+                    f"{threshold['metric']} {value:.1f} {threshold['op']} {threshold['threshold']:g}"))
+            elif not holds:
+                threshold["armed"] = True
+
+        if self.mounts is not None and mounts != self.mounts:
+            added = sorted(mounts - self.mounts)
+            removed = sorted(self.mounts - mounts)
+            changes = [f"+{mount}" for mount in added] + [f"-{mount}" for mount in removed]
+            events.append(self._event("partitions", f"Partitions changed: {' '.join(changes)}"))
+        self.mounts = mounts
+        return events
+
+    def _event(self, kind, message):
+        return {"kind": kind, "message": message, "collectors": EVENT_COLLECTORS[kind]}
+
+    def poll(self, now=None):
+        """Poll once and trigger a report if events have settled (debounce, min_gap)"""
+        now = time.monotonic() if now is None else now
+        events = self.check()
+        if events:
+            if not self.pending:
+                self.pending_since = now
+            self.pending.extend(events)
+        if not self.pending or now - self.pending_since < self.debounce:
+            return None
+        if self.last_trigger is not None and now - self.last_trigger < self.min_gap:
+            # Triggered recently - hold the events until the gap has passed
+            return None
+
+        events, self.pending = self.pending, []
+        self.last_trigger = now
+        try:
+            self.on_trigger(events)
+        except Exception as e:
+            print(f"Error handling state change: {e}")
+        return events
+
+    def watcher_loop(self):
+        """Background polling loop"""
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Error in event watcher: {e}")
+
+    def start(self):
+        """Start watching (the current state is the baseline - nothing fires for it)"""
+        if not self.running:
+            self.running = True
+            self._stop_event.clear()
+            try:
+                self.check()
+            except Exception as e:
+                print(f"Error in event watcher: {e}")
+            self.watcher_thread = threading.Thread(target=self.watcher_loop)
+            self.watcher_thread.daemon = True
+            self.watcher_thread.start()
+
+    def stop(self):
+        """Stop watching"""
+        self.running = False
+        self._stop_event.set()
+        if self.watcher_thread:
+            self.watcher_thread.join()
+            self.watcher_thread = None
@@ -0,0 +1,112 @@
+"""
+Local history query tool
+Answers questions about this machine's past from the agent's on-device history
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+
+from agent_paths import data_path
+from history_store import HistoryStore, time_range
+from snapshot_store import RECORD_FIELDS
+
+
+FIELDS = [name for name, _ in RECORD_FIELDS if name not in ("timestamp", "plugged_in")]
+
+
+def describe_range(since):
+    """Human-readable start of the queried range"""
+    if since is None:
+        return "all history"
+    return f"since {datetime.fromtimestamp(since).strftime('%Y-%m-%d %H:%M')}"
+
+
+def main():
+    """Run a history query from the command line"""
+    parser = argparse.ArgumentParser(
+        description='Query the local metric history kept by the laptop monitor client',
+        epilog='Examples: history.py summary cpu_percent --last 1h | history.py battery --today')
+    parser.add_argument('--dir', type=str, default=data_path('history'),
+                        help='History folder used by the client (default: %(default)s)')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    summary = commands.add_parser('summary', help='min/max/mean/p50/p95/p99 of a metric')
+    summary.add_argument('field', choices=FIELDS)
+
+    commands.add_parser('battery', help='Battery drain rate while unplugged')
+
+    export = commands.add_parser('export', help='Print raw records (one JSON object per line)')
+    export.add_argument('--field', action='append', choices=FIELDS,
+                        help='Only include these fields (repeatable)')
+
+    commands.add_parser('info', help='Partitions and size on disk')
+
+    for sub in (summary, commands.choices['battery'], export):
+        window = sub.add_mutually_exclusive_group()
+        window.add_argument('--last', type=str, default=None,
+                            help='Only look at the last duration, e.g. 30m, 1h, 7d')
+        window.add_argument('--today', action='store_true', help='Only look at today')
+
+    args = parser.parse_args()
+    store = HistoryStore(args.dir, readonly=True)
+    if not store.days:
+        print(f"❌ No history in {args.dir} (is the client running with --history?)")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    since, until = time_range(getattr(args, 'last', None), getattr(args, 'today', False))
+
+    if args.command == 'summary':
+        result = store.summary(args.field, since, until)
+        elapsed = (time.perf_counter() - start) * 1000
+        if args.json:
+            print(json.dumps(result))
+        elif result is None:
+            print(f"No {args.field} samples ({describe_range(since)})")
+        else:
+            print(f"📊 {args.field} ({describe_range(since)}, {result['samples']} samples, {elapsed:.1f} ms)")
+            for key in ("min", "mean", "p50", "p95", "p99", "max"):
+                print(f"   {key:>4}: {result[key]}")
+
+    elif args.command == 'battery':
+        result = store.battery_drain(since, until)
+        elapsed = (time.perf_counter() - start) * 1000
+        if args.json:
+            print(json.dumps(result))
+        elif result is None:
+            print(f"🔌 Never on battery ({describe_range(since)})")
+        else:
+            print(f"🔋 Battery drain ({describe_range(since)}, {elapsed:.1f} ms)")
+            print(f"   {result['percent_per_hour']}%/h - {result['percent_used']}% used "
+                  f"over {result['on_battery_hours']} h on battery")
+
+    elif args.command == 'export':
+        fields = ["timestamp"] + (args.field or [name for name, _ in RECORD_FIELDS[1:]])
+        indexes = [store.fields.index(name) for name in fields]
+        for record in store.records(since, until):
+            row = {name: record[i] for name, i in zip(fields, indexes)}
+            row["timestamp"] = datetime.fromtimestamp(record[0]).isoformat()
+            # NaN (missing) isn't valid JSON
+            print(json.dumps({
+                key: None if value != value else round(value, 2) if isinstance(value, float) else value
+                for key, value in row.items()
+            }))
+
+    elif args.command == 'info':
+        info = store.info()
+        if args.json:
+            print(json.dumps(info))
+        else:
+            total = sum(p["bytes"] for p in info["partitions"])
+            print(f"📁 {info['directory']} - {len(info['partitions'])} day(s), {total / 1024:.1f} KB")
+            for partition in info["partitions"]:
+                print(f"   {partition['day']}: {partition['records']} records")
+
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Local metric history
+Day-partitioned SnapshotStore files with retention and time-range queries
+"""
+import bisect
+import math
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from snapshot_store import SnapshotStore, snapshot_to_record, RECORD_FIELDS
+
+
+class HistoryStore:
+    """Bounded on-device history: one append-only SnapshotStore file per local day"""
+
+    SUFFIX = ".lmts"
+
+    def __init__(self, directory, retention_days=30, readonly=False):
+        """
+        Initialize history store
+
+        Args:
+            directory: Folder holding the daily partition files
+            retention_days: Days of history kept; older partitions are deleted (default: 30)
+            readonly: Only query (e.g., from the CLI while the agent is writing)
+        """
+        self.directory = directory
+        self.retention_days = retention_days
+        self.readonly = readonly
+        self.fields = tuple(name for name, _ in RECORD_FIELDS)
+        if not readonly:
+            os.makedirs(directory, exist_ok=True)
+        # Sorted partition days - the index used to find files for a time range
+        self.days = sorted(
+            day
+            for day in map(self._day, os.listdir(directory) if os.path.isdir(directory) else ())
+            if day is not None
+        )
+        self.stores = {}  # day -> open SnapshotStore
+        self._lock = threading.Lock()
+        if not readonly:
+            self.enforce_retention()
+
+    @classmethod
+    def _day(cls, name):
+        """Day of a partition file name, or None for any other file (e.g., renamed copies)"""
+        if not name.endswith(cls.SUFFIX):
+            return None
+        try:
+            return date.fromisoformat(name[:-len(cls.SUFFIX)])
+        except ValueError:
+            return None
+
+    def _path(self, day):
+        return os.path.join(self.directory, f"{day.isoformat()}{self.SUFFIX}")
+
+    def _store(self, day, create=False):
+        """Open partition for `day` (caller holds the lock)"""
+        store = self.stores.get(day)
+        if store is None:
+            if not create and day not in self.days:
+                return None
+            store = SnapshotStore(self._path(day), readonly=self.readonly)
+            self.stores[day] = store
+            if day not in self.days:
+                bisect.insort(self.days, day)
+        return store
+
+    def enforce_retention(self, today=None):
+        """Delete partitions older than retention_days"""
+        cutoff = (today or date.today()) - timedelta(days=self.retention_days)
+        with self._lock:
+            while self.days and self.days[0] < cutoff:
+                day = self.days.pop(0)
+                store = self.stores.pop(day, None)
+                if store:
+                    store.close()
+                try:
+                    os.remove(self._path(day))
+                except OSError:
+                    pass
+
+    def append(self, data):
+        """Record a get_all_data() snapshot"""
+        record = snapshot_to_record(data)
+        day = datetime.fromtimestamp(record[0]).date()
+        with self._lock:
+            new_day = day not in self.days
+            self._store(day, create=True).append_record(record)
+        if new_day:
+            # Day rolled over - drop expired partitions and close yesterday's file
+            self.enforce_retention(day)
+            with self._lock:
+                for old in [d for d in self.stores if d < day]:
+                    self.stores.pop(old).close()
+
+    def records(self, since=None, until=None):
+        """
+        Records with since <= timestamp < until (Unix times, None = unbounded)
+
+        Returns:
+            List of record tuples in RECORD_FIELDS order, oldest first
+        """
+        first = datetime.fromtimestamp(since).date() if since is not None else None
+        last = datetime.fromtimestamp(until).date() if until is not None else None
+        with self._lock:
+            start = bisect.bisect_left(self.days, first) if first else 0
+            end = bisect.bisect_right(self.days, last) if last else len(self.days)
+            stores = [self._store(day) for day in self.days[start:end]]
+            result = []
+            for store in stores:
+                result.extend(store.scan(since, until))
+        return result
+
+    def column(self, field, since=None, until=None):
+        """(timestamp, value) pairs of one field, skipping missing values"""
+        index = self.fields.index(field)
+        return [
+            (record[0], record[index])
+            for record in self.records(since, until)
+            if not math.isnan(record[index])
+        ]
+
+    def summary(self, field, since=None, until=None):
+        """
+        Summarize one field over a time range
+
+        Returns:
+            {"samples", "min", "max", "mean", "p50", "p95", "p99"} or None if no data
+        """
+        values = sorted(value for _, value in self.column(field, since, until))
+        if not values:
+            return None
+
+        def percentile(pct):
+            return round(values[min(math.ceil(pct / 100 * len(values)) - 1, len(values) - 1)], 2)
+
+        return {
+            "samples": len(values),
+            "min": round(values[0], 2),
+            "max": round(values[-1], 2),
+            "mean": round(math.fsum(values) / len(values), 2),
+            "p50": percentile(50),
+            "p95": percentile(95),
+            "p99": percentile(99),
+        }
+
+    def battery_drain(self, since=None, until=None, max_gap=600):
+        """
+        Battery drain while unplugged
+
+        Args:
+            since: Range start (Unix time)
+            until: Range end (Unix time)
+            max_gap: Seconds between samples beyond which they're not compared
+                     (sleep, agent not running) (default: 600)
+
+        Returns:
+            {"percent_per_hour", "percent_used", "on_battery_hours"} or None if never on battery
+        """
+        percent = self.fields.index("battery_percent")
+        plugged = self.fields.index("plugged_in")
+        used = 0.0
+        seconds = 0.0
+        previous = None
+        for record in self.records(since, until):
+            on_battery = record[plugged] == 0 and not math.isnan(record[percent])
+            if on_battery and previous is not None and record[0] - previous[0] <= max_gap:
+                # Charge going up on battery is sensor noise, not negative drain
+                used += max(0.0, previous[percent] - record[percent])
+                seconds += record[0] - previous[0]
+            previous = record if on_battery else None
+
+        if seconds <= 0:
+            return None
+        hours = seconds / 3600
+        return {
+            "percent_per_hour": round(used / hours, 2),
+            "percent_used": round(used, 2),
+            "on_battery_hours": round(hours, 2),
+        }
+
+    def info(self):
+        """Partitions, record counts and size on disk"""
+        with self._lock:
+            partitions = []
+            for day in self.days:
+                path = self._path(day)
+                store = self._store(day)
+                partitions.append({
+                    "day": day.isoformat(),
+                    "records": len(store),
+                    "bytes": os.path.getsize(path),
+                })
+        return {
+            "directory": self.directory,
+            "retention_days": self.retention_days,
+            "partitions": partitions,
+        }
+
+    def close(self):
+        """Close all open partition files"""
+        with self._lock:
+            for store in self.stores.values():
+                store.close()
+            self.stores.clear()
+
+
+def parse_duration(text):
+    """Parse '90s', '15m', '1h', '7d' into seconds"""
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    text = text.strip().lower()
+    if text and text[-1] in units:
+        return float(text[:-1]) * units[text[-1]]
+    return float(text)
+
+
+def time_range(last=None, today=False, now=None):
+    """Turn --last / --today options into (since, until) Unix times"""
+    now = now or time.time()
+    if today:
+        midnight = datetime.combine(datetime.fromtimestamp(now).date(), datetime.min.time())
+        return midnight.timestamp(), None
+    if last:
+        return now - parse_duration(last), None
+    return None, None
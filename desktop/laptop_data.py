@@ -1,17 +1,110 @@
-import psutil
 import platform
 import time
 import threading
 from datetime import datetime
 import json
+from cpu_sampler import CPUSampler
+from collector_scheduler import CollectorScheduler
+from wmi_session import WMISession
+from metric_buffer import MetricSampler
+from counter_rates import CounterRates
+from disk_monitor import DiskMonitor
+from process_table import ProcessTable
+from procfs_backend import default_backend
 
 class LaptopMonitor:
     """Background application to retrieve and monitor laptop data"""
+
+    # Refresh period (seconds) and cost budget (seconds) per collector
+    # period 0 = every snapshot, None = collected once at startup
+    # required = the snapshot cannot be sent without a first value
+    COLLECTOR_SCHEDULE = {
+        "system_info": {"period": None, "required": True},
+        "cpu_info": {"period": 0, "required": True},
+        "memory_info": {"period": 0, "required": True},
+        "disk_info": {"period": 0, "budget": 0.5, "default": []},
+        "disk_io": {"period": 0},
+        "battery_info": {"period": 10, "budget": 0.5},
+        "power_info": {"period": 30, "budget": 1.0},
+        "network_info": {"period": 0, "required": True},
+        "temperature_info": {"period": 15, "budget": 0.5},
+        "interval_stats": {"period": 0},
+        "top_processes": {"period": 5, "budget": 0.25},
+    }
+
+    # Collectors left out of the first (cheap_only) snapshot so the agent can report
+    # right after startup; they run on the next snapshot
+    STARTUP_DEFERRED = (
+        "system_info", "disk_info", "disk_io", "battery_info", "power_info",
+        "temperature_info", "interval_stats", "top_processes",
+    )
+
+    # Seconds to cache static WMI battery capacity data
+    WMI_STATIC_TTL = 3600
     
-    def __init__(self, update_interval=5):
+    def __init__(self, update_interval=5, cpu_window=None, refresh_periods=None,
+                 parallel=False, max_workers=4, collector_timeout=2.0, wmi_provider=None,
+                 sample_interval=1.0, network_per_nic=False, disk_monitor=None,
+                 history_dir=None, history_days=30, backend=None):
+        """
+        Initialize monitor
+
+        Args:
+            update_interval: Seconds between updates in monitor_loop (default: 5)
+            cpu_window: Seconds CPU usage is averaged over (default: update_interval)
+            refresh_periods: Per-collector refresh period overrides, e.g. {'disk_info': 120}
+            parallel: Run collectors concurrently on a worker pool (default: False)
+            max_workers: Worker pool size in parallel mode (default: 4)
+            collector_timeout: Per-collector deadline in parallel mode (default: 2.0)
+            wmi_provider: Callable(namespace) returning a WMI connection (default: real WMI)
+            sample_interval: Seconds between high-frequency CPU/memory/network samples (default: 1.0)
+            network_per_nic: Include a per-interface breakdown in network_info (default: False)
+            disk_monitor: DiskMonitor to use (default: network filesystems excluded,
+                          2 s timeout per mount, capacity cached for 60 s)
+            history_dir: Folder for the local metric history (None = disabled)
+            history_days: Days of local history kept (default: 30)
+            backend: psutil-compatible system metrics source (default: /proc fast path
+                     on Linux, psutil elsewhere)
+        """
+        self.owns_backend = backend is None
+        self.backend = backend or default_backend()
         self.update_interval = update_interval
         self.running = False
         self.monitor_thread = None
+        # CPU usage is averaged over this window (defaults to the update interval)
+        self.cpu_window = cpu_window or update_interval
+        self.cpu_sampler = CPUSampler(backend=self.backend)
+        # Cheap metrics sampled between reports, summarized in interval_stats
+        self.metric_sampler = MetricSampler(self.cpu_sampler, sample_interval=sample_interval,
+                                            backend=self.backend)
+        self._stats_since = None
+        self.network_per_nic = network_per_nic
+        self.network_rates = CounterRates()
+        self.disk_monitor = disk_monitor or DiskMonitor(backend=self.backend)
+        self.process_table = ProcessTable()
+        # WMI connections are opened once and reused (Windows only)
+        self.wmi = WMISession(provider=wmi_provider)
+        self.wmi_power = WMISession(namespace="root\\wmi", provider=wmi_provider)
+        self.history = None
+        if history_dir:
+            # Imported on demand - most runs never touch the history files
+            from history_store import HistoryStore
+            self.history = HistoryStore(history_dir, retention_days=history_days)
+        self.scheduler = self._create_scheduler(
+            refresh_periods or {},
+            max_workers if parallel else None,
+            collector_timeout,
+        )
+
+    def _create_scheduler(self, refresh_periods, max_workers, collector_timeout):
+        """Register every collector with its refresh period and budget"""
+        scheduler = CollectorScheduler(max_workers=max_workers, default_timeout=collector_timeout)
+        for name, options in self.COLLECTOR_SCHEDULE.items():
+            options = dict(options)
+            if name in refresh_periods:
+                options["period"] = refresh_periods[name]
+            scheduler.register(name, getattr(self, f"get_{name}"), **options)
+        return scheduler
         
     def get_system_info(self):
         """Get static system information"""
@@ -26,18 +119,21 @@ class LaptopMonitor:
     
     def get_cpu_info(self):
         """Get CPU information and usage"""
+        # Aggregate and per-core usage come from the same pair of samples
+        usage, per_cpu_usage = self.cpu_sampler.usage(self.cpu_window)
+        freq = self.backend.cpu_freq()
         return {
-            "physical_cores": psutil.cpu_count(logical=False),
-            "total_cores": psutil.cpu_count(logical=True),
-            "cpu_usage_percent": psutil.cpu_percent(interval=1),
-            "cpu_freq_current": psutil.cpu_freq().current if psutil.cpu_freq() else None,
-            "cpu_freq_max": psutil.cpu_freq().max if psutil.cpu_freq() else None,
-            "per_cpu_usage": psutil.cpu_percent(interval=1, percpu=True),
+            "physical_cores": self.backend.cpu_count(logical=False),
+            "total_cores": self.backend.cpu_count(logical=True),
+            "cpu_usage_percent": usage,
+            "cpu_freq_current": freq.current if freq else None,
+            "cpu_freq_max": freq.max if freq else None,
+            "per_cpu_usage": per_cpu_usage,
         }
     
     def get_memory_info(self):
         """Get memory (RAM) information"""
-        memory = psutil.virtual_memory()
+        memory = self.backend.virtual_memory()
         return {
             "total_gb": round(memory.total / (1024**3), 2),
             "available_gb": round(memory.available / (1024**3), 2),
@@ -46,50 +142,32 @@ class LaptopMonitor:
         }
     
     def get_disk_info(self):
-        """Get disk information"""
-        partitions = psutil.disk_partitions()
-        disk_info = []
-        
-        for partition in partitions:
-            try:
-                usage = psutil.disk_usage(partition.mountpoint)
-                disk_info.append({
-                    "device": partition.device,
-                    "mountpoint": partition.mountpoint,
-                    "fstype": partition.fstype,
-                    "total_gb": round(usage.total / (1024**3), 2),
-                    "used_gb": round(usage.used / (1024**3), 2),
-                    "free_gb": round(usage.free / (1024**3), 2),
-                    "percent": usage.percent,
-                })
-            except PermissionError:
-                continue
-        
-        return disk_info
+        """Get disk information (capacity is cached, slow mounts are skipped)"""
+        return self.disk_monitor.get_disk_info()
+    
+    def get_disk_io(self):
+        """Get disk I/O throughput (bytes/s and IOPS per disk)"""
+        return self.disk_monitor.get_disk_io()
     
     def get_battery_info(self):
         """Get battery information"""
-        battery = psutil.sensors_battery()
+        battery = self.backend.sensors_battery()
         if battery:
             battery_info = {
                 "percent": battery.percent,
                 "plugged_in": battery.power_plugged,
-                "time_left_seconds": battery.secsleft if battery.secsleft != psutil.POWER_TIME_UNLIMITED else None,
+                "time_left_seconds": battery.secsleft if battery.secsleft != self.backend.POWER_TIME_UNLIMITED else None,
             }
             
             # Get power/charging information if plugged in
             if battery.power_plugged:
                 try:
                     # Try to get power consumption/input (Windows-specific)
-                    import wmi
-                    w = wmi.WMI()
-                    battery_status = w.Win32_Battery()
-                    if battery_status:
-                        for bat in battery_status:
-                            # EstimatedChargeRemaining is percentage
-                            # BatteryStatus: 1=discharging, 2=AC, 3=fully charged, 4=low, 5=critical
-                            battery_info["battery_status"] = bat.BatteryStatus
-                            battery_info["estimated_run_time"] = bat.EstimatedRunTime if bat.EstimatedRunTime != 71582788 else None
+                    for bat in self.wmi.query("Win32_Battery", ("BatteryStatus", "EstimatedRunTime")):
+                        # EstimatedChargeRemaining is percentage
+                        # BatteryStatus: 1=discharging, 2=AC, 3=fully charged, 4=low, 5=critical
+                        battery_info["battery_status"] = bat["BatteryStatus"]
+                        battery_info["estimated_run_time"] = bat["EstimatedRunTime"] if bat["EstimatedRunTime"] != 71582788 else None
                 except ImportError:
                     # If WMI not available, try alternative method
                     pass
@@ -100,51 +178,74 @@ class LaptopMonitor:
         return None
     
     def get_network_info(self):
-        """Get network information"""
-        net_io = psutil.net_io_counters()
-        return {
+        """Get network information (cumulative totals and per-second rates)"""
+        net_io = self.backend.net_io_counters()
+        network_info = {
             "bytes_sent": net_io.bytes_sent,
             "bytes_received": net_io.bytes_recv,
             "packets_sent": net_io.packets_sent,
             "packets_received": net_io.packets_recv,
         }
+        network_info.update(self._network_rates("total", net_io))
+        
+        if self.network_per_nic:
+            per_nic = {}
+            counters = self.backend.net_io_counters(pernic=True)
+            for nic, nic_io in counters.items():
+                per_nic[nic] = {
+                    "bytes_sent": nic_io.bytes_sent,
+                    "bytes_received": nic_io.bytes_recv,
+                    "packets_sent": nic_io.packets_sent,
+                    "packets_received": nic_io.packets_recv,
+                }
+                per_nic[nic].update(self._network_rates(f"nic:{nic}", nic_io))
+            # Forget interfaces that went away
+            self.network_rates.forget(
+                key for key in list(self.network_rates.previous)
+                if key.startswith("nic:") and key[4:] not in counters
+            )
+            network_info["per_nic"] = per_nic
+        
+        return network_info
+    
+    def _network_rates(self, key, net_io):
+        """Per-second rates since the previous sample (None on the first one)"""
+        rates = self.network_rates.update(key, (
+            net_io.bytes_sent, net_io.bytes_recv, net_io.packets_sent, net_io.packets_recv,
+        ))
+        names = ("bytes_sent_per_sec", "bytes_received_per_sec",
+                 "packets_sent_per_sec", "packets_received_per_sec")
+        return dict(zip(names, rates or (None,) * len(names)))
     
     def get_power_info(self):
         """Get power consumption/charging information"""
         power_info = {}
         try:
             # Try to get power information using WMI (Windows)
-            import wmi
-            w = wmi.WMI(namespace="root\\wmi")
+            # Capacity values barely change, so they are cached for WMI_STATIC_TTL
             
             # Get battery full charged capacity
-            battery_full_charged = w.BatteryFullChargedCapacity()
-            if battery_full_charged:
-                for item in battery_full_charged:
-                    power_info["full_charge_capacity_mwh"] = item.FullChargedCapacity
+            for item in self.wmi_power.query("BatteryFullChargedCapacity", ("FullChargedCapacity",), ttl=self.WMI_STATIC_TTL):
+                power_info["full_charge_capacity_mwh"] = item["FullChargedCapacity"]
             
             # Get battery static data (design capacity)
-            battery_static = w.BatteryStaticData()
-            if battery_static:
-                for item in battery_static:
-                    power_info["design_capacity_mwh"] = item.DesignedCapacity
-                    if hasattr(item, 'DefaultAlert1'):
-                        power_info["default_alert"] = item.DefaultAlert1
+            for item in self.wmi_power.query("BatteryStaticData", ("DesignedCapacity", "DefaultAlert1"), ttl=self.WMI_STATIC_TTL):
+                power_info["design_capacity_mwh"] = item["DesignedCapacity"]
+                if item["DefaultAlert1"] is not None:
+                    power_info["default_alert"] = item["DefaultAlert1"]
             
-            # Get battery status (current discharge/charge rate)
-            battery_status = w.BatteryStatus()
-            if battery_status:
-                for status in battery_status:
-                    # Discharge/Charge rate in mW
-                    if hasattr(status, 'DischargeRate') and status.DischargeRate:
-                        rate = status.DischargeRate
-                        power_info["current_rate_mw"] = rate
-                        power_info["current_rate_w"] = round(rate / 1000, 2)
-                    if hasattr(status, 'Voltage') and status.Voltage:
-                        power_info["voltage_mv"] = status.Voltage
-                        power_info["voltage_v"] = round(status.Voltage / 1000, 2)
-                    if hasattr(status, 'RemainingCapacity'):
-                        power_info["remaining_capacity_mwh"] = status.RemainingCapacity
+            # Get battery status (current discharge/charge rate) - re-queried every time
+            for status in self.wmi_power.query("BatteryStatus", ("DischargeRate", "Voltage", "RemainingCapacity")):
+                # Discharge/Charge rate in mW
+                if status["DischargeRate"]:
+                    rate = status["DischargeRate"]
+                    power_info["current_rate_mw"] = rate
+                    power_info["current_rate_w"] = round(rate / 1000, 2)
+                if status["Voltage"]:
+                    power_info["voltage_mv"] = status["Voltage"]
+                    power_info["voltage_v"] = round(status["Voltage"] / 1000, 2)
+                if status["RemainingCapacity"] is not None:
+                    power_info["remaining_capacity_mwh"] = status["RemainingCapacity"]
                         
         except ImportError:
             power_info["error"] = "WMI not available (install: pip install wmi)"
@@ -156,7 +257,7 @@ class LaptopMonitor:
     def get_temperature_info(self):
         """Get temperature information (if available)"""
         try:
-            temps = psutil.sensors_temperatures()
+            temps = self.backend.sensors_temperatures()
             if temps:
                 temp_info = {}
                 for name, entries in temps.items():
@@ -169,19 +270,35 @@ class LaptopMonitor:
             return None
         return None
     
-    def get_all_data(self):
-        """Collect all laptop data"""
-        data = {
-            "timestamp": datetime.now().isoformat(),
-            "system_info": self.get_system_info(),
-            "cpu_info": self.get_cpu_info(),
-            "memory_info": self.get_memory_info(),
-            "disk_info": self.get_disk_info(),
-            "battery_info": self.get_battery_info(),
-            "power_info": self.get_power_info(),
-            "network_info": self.get_network_info(),
-            "temperature_info": self.get_temperature_info(),
-        }
+    def get_top_processes(self):
+        """Get the top processes by CPU, memory and I/O"""
+        return self.process_table.get_top_processes()
+    
+    def get_interval_stats(self):
+        """Get min/max/mean/p95 of high-frequency samples since the previous call"""
+        if not self.metric_sampler.running:
+            self.metric_sampler.start()
+        now = time.monotonic()
+        stats = self.metric_sampler.buffer.summarize(since=self._stats_since)
+        self._stats_since = now
+        return stats
+    
+    def get_all_data(self, cheap_only=False):
+        """
+        Collect all laptop data (slow collectors are served from cache)
+
+        Args:
+            cheap_only: Skip the STARTUP_DEFERRED collectors (their cached value or
+                        default is reported) - used for the first report after startup
+        """
+        values, ages, stale = self.scheduler.collect(skip=self.STARTUP_DEFERRED if cheap_only else ())
+        data = {"timestamp": datetime.now().isoformat()}
+        data.update(values)
+        # Seconds since each section was collected
+        data["collector_age"] = ages
+        if stale:
+            # Collectors that missed their deadline (previous value reported)
+            data["stale_collectors"] = stale
         return data
     
     def monitor_loop(self):
@@ -193,6 +310,7 @@ class LaptopMonitor:
         while self.running:
             try:
                 data = self.get_all_data()
+                self.record_history(data)
                 self.display_data(data)
                 time.sleep(self.update_interval)
             except KeyboardInterrupt:
@@ -214,6 +332,9 @@ class LaptopMonitor:
         print(f"   Cores: {cpu['physical_cores']} physical, {cpu['total_cores']} logical")
         if cpu['cpu_freq_current']:
             print(f"   Frequency: {cpu['cpu_freq_current']:.2f} MHz")
+        if data.get('top_processes') and data['top_processes']['by_cpu']:
+            top = data['top_processes']['by_cpu'][0]
+            print(f"   Top process: {top['name']} (PID {top['pid']}) {top['cpu_percent']}%")
         
         # Memory Info
         mem = data['memory_info']
@@ -305,6 +426,8 @@ class LaptopMonitor:
         print(f"\n🌐 Network:")
         print(f"   Sent: {net['bytes_sent'] / (1024**2):.2f} MB")
         print(f"   Received: {net['bytes_received'] / (1024**2):.2f} MB")
+        if net.get('bytes_sent_per_sec') is not None:
+            print(f"   Rate: ↑ {net['bytes_sent_per_sec'] / 1024:.1f} KB/s  ↓ {net['bytes_received_per_sec'] / 1024:.1f} KB/s")
         
     def start(self):
         """Start the background monitoring"""
@@ -319,12 +442,49 @@ class LaptopMonitor:
         self.running = False
         if self.monitor_thread:
             self.monitor_thread.join()
+        self.metric_sampler.stop()
+        self.cpu_sampler.stop()
+        self.scheduler.shutdown()
+        self.disk_monitor.shutdown()
+        if self.owns_backend and hasattr(self.backend, "close"):
+            self.backend.close()
+        if self.history is not None:
+            self.history.close()
+    
+    def record_history(self, data):
+        """Append a snapshot to the local history (if enabled)"""
+        if self.history is None:
+            return
+        try:
+            self.history.append(data)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Could not record history: {e}")
     
-    def save_to_file(self, filename="laptop_data.json"):
-        """Save current data to a JSON file"""
+    def save_to_file(self, filename="laptop_data.json", format="json"):
+        """
+        Save current data to a file
+
+        Args:
+            filename: Target file
+            format: 'json' (indented snapshot, overwritten), 'msgpack' (compact
+                    snapshot, overwritten) or 'timeseries' (fixed-schema record
+                    appended to a SnapshotStore file)
+        """
         data = self.get_all_data()
-        with open(filename, 'w') as f:
-            json.dump(data, f, indent=2)
+        if format == "timeseries":
+            from snapshot_store import SnapshotStore
+            store = SnapshotStore(filename)
+            try:
+                store.append(data)
+            finally:
+                store.close()
+        elif format == "msgpack":
+            import msgpack
+            with open(filename, 'wb') as f:
+                f.write(msgpack.packb(data))
+        else:
+            with open(filename, 'w') as f:
+                json.dump(data, f, indent=2)
         print(f"✅ Data saved to {filename}")
 
 
@@ -0,0 +1,417 @@
+"""
+Fleet load generator
+Drives many virtual agents - each running the real SimpleClient send path - against a server from one process
+"""
+import argparse
+import asyncio
+import contextlib
+import copy
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+from bench_support import FakeWMI, install_fake_backend, percentile
+from client import SimpleClient
+from laptop_data import LaptopMonitor
+from transport import CircuitOpenError, Transport
+
+
+class LoadStats:
+    """Latencies, outcomes and volume per endpoint"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.latencies = {}  # endpoint -> [seconds]
+        self.errors = {}  # endpoint -> {kind: count}
+        self.snapshots = 0
+        self.lag = []  # Seconds reports started late (the generator itself falling behind)
+        self._lock = threading.Lock()  # Devices report from worker threads
+
+    def record(self, endpoint, seconds, error=None):
+        """Record one request (error: None on success, else a short kind like 'http_500')"""
+        with self._lock:
+            self.latencies.setdefault(endpoint, []).append(seconds)
+            if error:
+                errors = self.errors.setdefault(endpoint, {})
+                errors[error] = errors.get(error, 0) + 1
+
+    def add_snapshots(self, count):
+        """Count snapshots the server stored"""
+        with self._lock:
+            self.snapshots += count
+
+    def record_lag(self, seconds):
+        """Record how late a report started"""
+        with self._lock:
+            self.lag.append(seconds)
+
+    def summary(self, since=None):
+        """Per-endpoint request counts, error rates and latency percentiles (in ms)"""
+        elapsed = time.monotonic() - self.started
+        with self._lock:
+            latencies_by_endpoint = {endpoint: list(latencies) for endpoint, latencies in self.latencies.items()}
+            lag = list(self.lag)
+        endpoints = {}
+        for endpoint, latencies in latencies_by_endpoint.items():
+            errors = sum(self.errors.get(endpoint, {}).values())
+            endpoints[endpoint] = {
+                "requests": len(latencies),
+                "errors": errors,
+                "error_rate": round(errors / len(latencies), 4),
+                "per_second": round(len(latencies) / elapsed, 2),
+                "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+                "p90_ms": round(percentile(latencies, 90) * 1000, 2),
+                "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+                "max_ms": round(max(latencies) * 1000, 2),
+                "error_kinds": dict(self.errors.get(endpoint, {})),
+            }
+        return {
+            "elapsed_seconds": round(elapsed, 1),
+            "snapshots_stored": self.snapshots,
+            "snapshots_per_second": round(self.snapshots / elapsed, 2),
+            "generator_lag_p99_ms": round(percentile(lag, 99) * 1000, 2) if lag else None,
+            "endpoints": endpoints,
+        }
+
+
+def classify(error):
+    """Short error kind for an exception"""
+    if isinstance(error, requests.exceptions.Timeout):
+        return "timeout"
+    if isinstance(error, requests.exceptions.ConnectionError):
+        return "connect"
+    return type(error).__name__
+
+
+class MeasuredTransport(Transport):
+    """Transport that also records every request (retries included) in LoadStats"""
+
+    # Error statuses that are part of the protocol, not failures
+    EXPECTED_STATUSES = {"send_data": (409,)}  # Server lost the delta base, asks for a keyframe
+
+    def __init__(self, load_stats, **kwargs):
+        """
+        Initialize transport
+
+        Args:
+            load_stats: Shared LoadStats
+            **kwargs: Passed to Transport
+        """
+        super().__init__(**kwargs)
+        self.load_stats = load_stats
+
+    def request(self, method, url, endpoint, read_timeout=None, idempotent=None, **kwargs):
+        """Transport.request, timed as the agent sees it"""
+        start = time.perf_counter()
+        try:
+            response = super().request(method, url, endpoint, read_timeout=read_timeout,
+                                       idempotent=idempotent, **kwargs)
+        except CircuitOpenError:
+            raise  # Nothing was sent
+        except requests.exceptions.RequestException as e:
+            self.load_stats.record(endpoint, time.perf_counter() - start, classify(e))
+            raise
+        status = response.status_code
+        ok = status < 400 or status in self.EXPECTED_STATUSES.get(endpoint, ())
+        self.load_stats.record(endpoint, time.perf_counter() - start, None if ok else f"http_{status}")
+        return response
+
+
+class VirtualDevice(SimpleClient):
+    """One simulated agent: SimpleClient's encode, send, spool and command path fed synthetic snapshots"""
+
+    def __init__(self, index, run_id, template, server_url, stats, interval=10, compact=False,
+                 commands=True, timeout=10):
+        """
+        Initialize device
+
+        Args:
+            index: Device number (also seeds its metric random walk)
+            run_id: Prefix that keeps device IDs of different runs apart
+            template: get_all_data() snapshot the device's payloads are based on
+            server_url: Server base URL
+            stats: Shared LoadStats
+            interval: Seconds between reports (default: 10)
+            compact: Send delta-encoded, gzip-compressed payloads when the server supports it
+            commands: Poll (and acknowledge) commands after every report
+            timeout: Seconds per request
+        """
+        # In-memory spool - queued reports don't outlive the run
+        super().__init__(server_url, device_id=f"loadgen-{run_id}-{index:05d}", update_interval=interval,
+                         spool_path=":memory:", compact=compact)
+        self.transport = self.command_transport = MeasuredTransport(
+            stats, connect_timeout=timeout, read_timeout=timeout, stats=self.stats)
+        self.hostname = f"loadgen-{index:05d}"
+        self.template = template
+        self.load_stats = stats
+        self.commands = commands
+        self.random = random.Random(index)
+        self.offline_until = 0.0
+        # Per-device state of the simulated metrics
+        self.cpu = self.random.uniform(5, 40)
+        self.memory = self.random.uniform(30, 70)
+        self.battery = self.random.uniform(40, 100)
+        self.net_sent = self.random.randrange(10**9)
+        self.net_received = self.random.randrange(10**9)
+
+    def collect(self):
+        """Next snapshot: the template with this device's drifting metrics"""
+        rnd = self.random
+        self.cpu = min(100.0, max(0.0, self.cpu + rnd.gauss(0, 5)))
+        self.memory = min(99.0, max(5.0, self.memory + rnd.gauss(0, 0.5)))
+        self.battery = self.battery - rnd.uniform(0, 0.2) if self.battery > 5 else 100.0
+        sent, received = rnd.randrange(10**6), rnd.randrange(4 * 10**6)
+        self.net_sent += sent
+        self.net_received += received
+
+        data = dict(self.template)
+        data["timestamp"] = datetime.now().isoformat()
+        data["cpu_info"] = dict(data["cpu_info"], cpu_usage_percent=round(self.cpu, 1))
+        data["memory_info"] = dict(data["memory_info"], percent=round(self.memory, 1))
+        if data.get("battery_info"):
+            data["battery_info"] = dict(data["battery_info"], percent=round(self.battery, 1), plugged_in=False)
+        interval = self.update_interval
+        data["network_info"] = dict(
+            data["network_info"],
+            bytes_sent=self.net_sent, bytes_received=self.net_received,
+            bytes_sent_per_sec=round(sent / interval, 1), bytes_received_per_sec=round(received / interval, 1),
+        )
+        return data
+
+    def build_payload(self, data):
+        """SimpleClient payload under the device's own hostname"""
+        payload = super().build_payload(data)
+        payload["hostname"] = self.hostname
+        return payload
+
+    def flush_spool(self):
+        """Upload queued snapshots, counting the ones the server stored"""
+        sent = super().flush_spool()
+        self.load_stats.add_snapshots(sent)
+        return sent
+
+    def go_offline(self, seconds):
+        """Simulate a network outage: reports are queued until it ends"""
+        self.offline_until = time.monotonic() + seconds
+
+    def tick(self, scheduled):
+        """One report cycle (runs in a worker thread)"""
+        self.load_stats.record_lag(max(0.0, time.monotonic() - scheduled))
+        payload = self.build_payload(self.collect())
+        if time.monotonic() < self.offline_until:
+            # Keep-alive connections don't survive the outage
+            self.transport.session.close()
+            self.queue_payload(payload)
+            return
+        # A stored report also uploads whatever the spool holds
+        if self.post_payload(payload) is not None:
+            self.load_stats.add_snapshots(1)
+        if self.commands:
+            for command in self.fetch_commands():
+                self.acknowledge_command(command.get('id'))
+
+    async def run_async(self, executor, jitter, start_delay, deadline):
+        """Report every interval (+/- jitter) seconds until `deadline` (monotonic time)"""
+        loop = asyncio.get_running_loop()
+        next_run = time.monotonic() + start_delay
+        while next_run < deadline:
+            await asyncio.sleep(max(0.0, next_run - time.monotonic()))
+            await loop.run_in_executor(executor, self.tick, next_run)
+            next_run += self.update_interval * (1 + self.random.uniform(-jitter, jitter))
+        self.transport.session.close()
+
+
+class LoadGenerator:
+    """Runs the virtual fleet, injects offline/reconnect storms and reports progress"""
+
+    def __init__(self, server_url, devices=100, interval=10, jitter=0.1, duration=60,
+                 ramp_up=None, compact=False, commands=True, timeout=10, workers=64, storm_every=None,
+                 storm_fraction=0.5, storm_duration=30, report_every=10):
+        """
+        Initialize load generator
+
+        Args:
+            server_url: Server base URL
+            devices: Number of virtual devices
+            interval: Seconds between reports per device (default: 10)
+            jitter: Random +/- fraction applied to every interval (default: 0.1)
+            duration: Seconds to run (default: 60)
+            ramp_up: Seconds over which devices start (default: interval; 0 = all at once)
+            compact: Send delta-encoded, gzip-compressed payloads
+            commands: Poll and acknowledge commands after every report
+            timeout: Seconds per request (default: 10)
+            workers: Threads the devices' requests run on (default: 64)
+            storm_every: Seconds between offline/reconnect storms (None = no storms)
+            storm_fraction: Share of devices that go offline in a storm (default: 0.5)
+            storm_duration: Seconds a storm lasts; the devices then reconnect together (default: 30)
+            report_every: Seconds between progress lines (default: 10)
+        """
+        self.server_url = server_url.rstrip('/')
+        self.device_count = devices
+        self.interval = interval
+        self.jitter = jitter
+        self.duration = duration
+        self.ramp_up = interval if ramp_up is None else ramp_up
+        self.compact = compact
+        self.commands = commands
+        self.timeout = timeout
+        self.workers = workers
+        self.storm_every = storm_every
+        self.storm_fraction = storm_fraction
+        self.storm_duration = storm_duration
+        self.report_every = report_every
+        self.stats = LoadStats()
+        # Progress goes here; the agents' own log lines are discarded while running
+        self.out = sys.stdout
+
+    def build_template(self):
+        """A realistic get_all_data() snapshot (from the deterministic fake backend)"""
+        monitor = LaptopMonitor(update_interval=1, wmi_provider=FakeWMI, backend=install_fake_backend())
+        try:
+            monitor.get_all_data()
+            # Second snapshot has network and disk rates
+            return copy.deepcopy(monitor.get_all_data())
+        finally:
+            monitor.stop()
+
+    async def storms(self, devices, deadline):
+        """Take a random share of the fleet offline every storm_every seconds"""
+        while time.monotonic() + self.storm_every < deadline:
+            await asyncio.sleep(self.storm_every)
+            victims = random.sample(devices, int(len(devices) * self.storm_fraction))
+            print(f"🌩️  Storm: {len(victims)} device(s) offline for {self.storm_duration}s", file=self.out)
+            for device in victims:
+                device.go_offline(self.storm_duration)
+
+    async def progress(self):
+        """Print a progress line every report_every seconds"""
+        while True:
+            await asyncio.sleep(self.report_every)
+            summary = self.stats.summary()
+            send = summary["endpoints"].get("send_data")
+            if send:
+                print(f"⏱️  {summary['elapsed_seconds']:>6.0f}s  {summary['snapshots_per_second']:>8.1f} snapshots/s  "
+                      f"send_data p50 {send['p50_ms']:.1f} ms, p99 {send['p99_ms']:.1f} ms, "
+                      f"errors {send['error_rate'] * 100:.1f}%", file=self.out)
+
+    async def run_async(self):
+        """Run the fleet for `duration` seconds and return the summary"""
+        template = self.build_template()
+        run_id = f"{int(time.time()):x}"
+        self.stats = LoadStats()
+        devices = [
+            VirtualDevice(i, run_id, template, self.server_url, self.stats, interval=self.interval,
+                          compact=self.compact, commands=self.commands, timeout=self.timeout)
+            for i in range(self.device_count)
+        ]
+        deadline = time.monotonic() + self.duration
+
+        helpers = [asyncio.create_task(self.progress())]
+        if self.storm_every:
+            helpers.append(asyncio.create_task(self.storms(devices, deadline)))
+        # Each report runs SimpleClient's blocking send path on a worker thread
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="loadgen") as executor:
+            try:
+                await asyncio.gather(*(
+                    device.run_async(executor, self.jitter, self.ramp_up * i / max(1, len(devices)), deadline)
+                    for i, device in enumerate(devices)
+                ))
+            finally:
+                for task in helpers:
+                    task.cancel()
+                await asyncio.gather(*helpers, return_exceptions=True)
+        return self.stats.summary()
+
+    def run(self):
+        """Run the fleet (blocking)"""
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            return asyncio.run(self.run_async())
+
+
+def print_summary(summary):
+    """Print the final report"""
+    print("=" * 78)
+    print(f"📊 {summary['snapshots_stored']} snapshots stored in {summary['elapsed_seconds']}s "
+          f"({summary['snapshots_per_second']}/s)")
+    print("=" * 78)
+    print(f"{'Endpoint':<22}{'requests':>9}{'req/s':>8}{'err %':>7}{'p50 ms':>8}{'p90 ms':>8}"
+          f"{'p99 ms':>8}{'max ms':>8}")
+    for endpoint, stats in summary["endpoints"].items():
+        print(f"{endpoint:<22}{stats['requests']:>9}{stats['per_second']:>8.1f}{stats['error_rate'] * 100:>7.1f}"
+              f"{stats['p50_ms']:>8.1f}{stats['p90_ms']:>8.1f}{stats['p99_ms']:>8.1f}{stats['max_ms']:>8.1f}")
+        if stats["error_kinds"]:
+            kinds = ", ".join(f"{kind} x{count}" for kind, count in sorted(stats["error_kinds"].items()))
+            print(f"{'':<22}errors: {kinds}")
+    if summary["generator_lag_p99_ms"] is not None and summary["generator_lag_p99_ms"] > 100:
+        print(f"\n⚠️  Load generator fell behind (p99 lag {summary['generator_lag_p99_ms']} ms) - "
+              f"latencies include its own delay; use fewer devices per process")
+
+
+def main():
+    """Run the load generator from the command line"""
+    parser = argparse.ArgumentParser(
+        description='Simulate a fleet of laptop monitor agents against a Next.js server',
+        epilog='Devices are registered as loadgen-<run>-<n>; point it at a test database.')
+    parser.add_argument('--server', type=str, default='http://localhost:3000',
+                        help='Next.js server URL (default: http://localhost:3000)')
+    parser.add_argument('--devices', type=int, default=100, help='Virtual devices (default: 100)')
+    parser.add_argument('--interval', type=float, default=10,
+                        help='Seconds between reports per device (default: 10)')
+    parser.add_argument('--jitter', type=float, default=0.1,
+                        help='Random +/- fraction applied to each interval (default: 0.1)')
+    parser.add_argument('--duration', type=float, default=60, help='Seconds to run (default: 60)')
+    parser.add_argument('--ramp-up', type=float, default=None,
+                        help='Seconds over which devices start (default: one interval; 0 = all at once)')
+    parser.add_argument('--compact', action='store_true',
+                        help='Send delta-encoded, gzip-compressed payloads like client.py --compact')
+    parser.add_argument('--no-commands', action='store_true', help='Don\'t poll for commands')
+    parser.add_argument('--timeout', type=float, default=10, help='Seconds per request (default: 10)')
+    parser.add_argument('--workers', type=int, default=64,
+                        help='Threads the devices\' requests run on (default: 64)')
+    parser.add_argument('--storm-every', type=float, default=None,
+                        help='Seconds between offline/reconnect storms (default: no storms)')
+    parser.add_argument('--storm-fraction', type=float, default=0.5,
+                        help='Share of devices taken offline by a storm (default: 0.5)')
+    parser.add_argument('--storm-duration', type=float, default=30,
+                        help='Seconds a storm lasts before the devices reconnect together (default: 30)')
+    parser.add_argument('--report-every', type=float, default=10,
+                        help='Seconds between progress lines (default: 10)')
+    parser.add_argument('--output', type=str, default=None, help='Write the summary as JSON to this file')
+    args = parser.parse_args()
+
+    generator = LoadGenerator(
+        args.server, devices=args.devices, interval=args.interval, jitter=args.jitter,
+        duration=args.duration, ramp_up=args.ramp_up, compact=args.compact,
+        commands=not args.no_commands, timeout=args.timeout, workers=args.workers,
+        storm_every=args.storm_every,
+        storm_fraction=args.storm_fraction, storm_duration=args.storm_duration,
+        report_every=args.report_every,
+    )
+    print(f"🚀 {args.devices} virtual device(s) → {args.server}, every {args.interval}s "
+          f"for {args.duration}s")
+    try:
+        summary = generator.run()
+    except KeyboardInterrupt:
+        print("\n👋 Stopped by user")
+        summary = generator.stats.summary()
+
+    print_summary(summary)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"✅ Summary saved to {args.output}")
+
+    # Non-zero exit when the server failed requests, for CI
+    errors = sum(stats["errors"] for stats in summary["endpoints"].values())
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
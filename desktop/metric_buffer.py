@@ -0,0 +1,191 @@
+"""
+High-frequency metric sampling
+Fixed-size array-backed ring buffer with min/max/mean/p95 summaries
+"""
+import bisect
+import heapq
+import math
+import threading
+import time
+from array import array
+
+import psutil
+
+from counter_rates import CounterRates
+
+try:
+    # Optional: summaries run over zero-copy views of the columns
+    import numpy
+except ImportError:
+    numpy = None
+
+# Stored for metrics that have no value yet (e.g., rates before a second counter sample)
+MISSING = float('nan')
+
+
+class MetricRingBuffer:
+    """Fixed-capacity ring buffer storing one float column per metric"""
+
+    def __init__(self, fields, capacity=1024):
+        """
+        Initialize buffer
+
+        Args:
+            fields: Metric names, in the order values are appended
+            capacity: Number of samples kept before the oldest are overwritten
+        """
+        self.fields = tuple(fields)
+        self.capacity = capacity
+        # Preallocated columns - appending a sample never allocates
+        self.times = array('d', [0.0]) * capacity
+        self.columns = [array('d', [0.0]) * capacity for _ in self.fields]
+        self.head = 0  # Next write position
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def append(self, timestamp, values):
+        """Add one sample (values in the same order as fields)"""
+        with self._lock:
+            self.times[self.head] = timestamp
+            for column, value in zip(self.columns, values):
+                column[self.head] = value
+            self.head = (self.head + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+
+    def _ordered(self, column):
+        """Column contents from oldest to newest (caller holds the lock)"""
+        if self.count < self.capacity:
+            return column[:self.count]
+        return column[self.head:] + column[:self.head]
+
+    def summarize(self, since=None):
+        """
+        Summarize samples taken at or after `since` (monotonic seconds)
+
+        Returns:
+            {field: {"min", "max", "mean", "p95"} or None if never measured} plus
+            "samples", or None if empty
+        """
+        with self._lock:
+            if numpy is not None:
+                return self._summarize_vectorized(since)
+            times = self._ordered(self.times)
+            start = bisect.bisect_left(times, since) if since is not None else 0
+            columns = [self._ordered(column)[start:] for column in self.columns]
+
+        samples = len(times) - start
+        if samples <= 0:
+            return None
+
+        summary = {"samples": samples}
+        for field, values in zip(self.fields, columns):
+            measured = [value for value in values if value == value]  # Drop NaN
+            if not measured:
+                summary[field] = None
+                continue
+            # Nearest-rank p95 is the k-th largest value; no full sort needed
+            k = len(measured) - min(math.ceil(0.95 * len(measured)), len(measured)) + 1
+            summary[field] = _metric_summary(
+                min(measured), max(measured), math.fsum(measured) / len(measured),
+                heapq.nlargest(k, measured)[-1],
+            )
+        return summary
+
+    def _summarize_vectorized(self, since):
+        """summarize() with numpy, directly on the (unordered) columns (caller holds the lock)"""
+        times = numpy.frombuffer(self.times, dtype=numpy.float64)[:self.count]
+        selected = times >= since if since is not None else numpy.ones(self.count, dtype=bool)
+        samples = int(numpy.count_nonzero(selected))
+        if samples <= 0:
+            return None
+
+        summary = {"samples": samples}
+        for field, column in zip(self.fields, self.columns):
+            values = numpy.frombuffer(column, dtype=numpy.float64)[:self.count][selected]
+            values = values[~numpy.isnan(values)]
+            if not values.size:
+                summary[field] = None
+                continue
+            summary[field] = _metric_summary(
+                values.min(), values.max(), values.mean(),
+                numpy.percentile(values, 95, method="inverted_cdf"),
+            )
+        return summary
+
+
+def _metric_summary(minimum, maximum, mean, p95):
+    """Rounded summary of one metric"""
+    return {
+        "min": round(float(minimum), 2),
+        "max": round(float(maximum), 2),
+        "mean": round(float(mean), 2),
+        "p95": round(float(p95), 2),
+    }
+
+
+class MetricSampler:
+    """Samples cheap metrics (CPU, memory, network) at high frequency into a ring buffer"""
+
+    FIELDS = ("cpu_percent", "memory_percent", "net_sent_bps", "net_recv_bps")
+
+    def __init__(self, cpu_sampler, sample_interval=1.0, history_seconds=900, backend=None):
+        """
+        Initialize sampler
+
+        Args:
+            cpu_sampler: CPUSampler used for CPU usage between samples
+            sample_interval: Seconds between samples (default: 1.0)
+            history_seconds: Seconds of samples kept in the buffer (default: 900)
+            backend: psutil-compatible source of memory and network counters (default: psutil)
+        """
+        self.backend = backend or psutil
+        self.cpu_sampler = cpu_sampler
+        self.sample_interval = sample_interval
+        self.buffer = MetricRingBuffer(self.FIELDS, capacity=int(history_seconds / sample_interval) + 1)
+        self.running = False
+        self.sampler_thread = None
+        self._stop_event = threading.Event()
+        self.net_rates = CounterRates()
+        # Callables(FIELDS, values, now) invoked with every sample (e.g., AlertEngine.evaluate_row)
+        self.listeners = []
+
+    def sample(self):
+        """Take one sample of every metric"""
+        now = time.monotonic()
+        cpu_percent, _ = self.cpu_sampler.usage(self.sample_interval)
+        memory_percent = self.backend.virtual_memory().percent
+
+        net = self.backend.net_io_counters()
+        # No rate until there is a previous counter sample (stored as NaN, left out of summaries)
+        sent_bps, recv_bps = self.net_rates.update("net", (net.bytes_sent, net.bytes_recv), now) or (MISSING, MISSING)
+
+        values = (cpu_percent, memory_percent, sent_bps, recv_bps)
+        self.buffer.append(now, values)
+        for listener in self.listeners:
+            listener(self.FIELDS, values, now)
+
+    def sampler_loop(self):
+        """Background sampling loop"""
+        while not self._stop_event.wait(self.sample_interval):
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"Error in metric sampler: {e}")
+
+    def start(self):
+        """Start background sampling"""
+        if not self.running:
+            self.running = True
+            self._stop_event.clear()
+            self.sample()
+            self.sampler_thread = threading.Thread(target=self.sampler_loop)
+            self.sampler_thread.daemon = True
+            self.sampler_thread.start()
+
+    def stop(self):
+        """Stop background sampling"""
+        self.running = False
+        self._stop_event.set()
+        if self.sampler_thread:
+            self.sampler_thread.join()
+            self.sampler_thread = None
@@ -0,0 +1,87 @@
+"""
+Compact telemetry payload encoding
+Sends a full keyframe periodically and only changed fields in between
+"""
+import copy
+
+
+def diff_snapshots(old, new, path=()):
+    """
+    Compare two nested dicts
+
+    Returns:
+        (changed, removed) - nested dict of new/changed values and a list of
+        key paths that no longer exist. Lists are compared and sent as a whole.
+    """
+    changed = {}
+    removed = []
+    for key, value in new.items():
+        if key not in old:
+            changed[key] = value
+            continue
+        previous = old[key]
+        if isinstance(value, dict) and isinstance(previous, dict):
+            sub_changed, sub_removed = diff_snapshots(previous, value, path + (key,))
+            if sub_changed:
+                changed[key] = sub_changed
+            removed.extend(sub_removed)
+        elif value != previous:
+            changed[key] = value
+    for key in old:
+        if key not in new:
+            removed.append(list(path + (key,)))
+    return changed, removed
+
+
+class DeltaEncoder:
+    """Encodes snapshots as keyframes or deltas against the last acknowledged snapshot"""
+
+    def __init__(self, keyframe_every=30):
+        """
+        Initialize encoder
+
+        Args:
+            keyframe_every: Send a full keyframe after this many deltas (default: 30)
+        """
+        self.keyframe_every = keyframe_every
+        self.seq = 0
+        self.base = None  # Last snapshot the server acknowledged
+        self.base_seq = None
+        self.deltas_since_keyframe = 0
+        self._pending = None
+
+    def encode(self, data):
+        """
+        Encode one snapshot
+
+        Returns:
+            Fields to merge into the request payload in place of 'data'
+        """
+        self.seq += 1
+        self._pending = (self.seq, data)
+
+        if self.base is None or self.deltas_since_keyframe >= self.keyframe_every:
+            return {"encoding": "keyframe", "seq": self.seq, "data": data}
+
+        changed, removed = diff_snapshots(self.base, data)
+        return {
+            "encoding": "delta",
+            "seq": self.seq,
+            "baseSeq": self.base_seq,
+            "delta": {"changed": changed, "removed": removed},
+        }
+
+    def commit(self, encoded):
+        """Mark the last encoded snapshot as received by the server"""
+        seq, data = self._pending
+        self.base = copy.deepcopy(data)
+        self.base_seq = seq
+        if encoded["encoding"] == "keyframe":
+            self.deltas_since_keyframe = 0
+        else:
+            self.deltas_since_keyframe += 1
+
+    def reset(self):
+        """Force the next snapshot to be a keyframe (e.g., after the server lost its state)"""
+        self.base = None
+        self.base_seq = None
@@ -0,0 +1,81 @@
+"""
+Top-N process collector
+Keeps a persistent process table so per-process CPU comes from deltas between ticks
+"""
+import heapq
+
+import psutil
+
+from counter_rates import CounterRates
+
+
+class ProcessTable:
+    """Persistent process table that reports the heaviest processes"""
+
+    # Read for every process in one pass (psutil reads them under oneshot())
+    ATTRS = ("pid", "create_time", "cpu_percent", "memory_info")
+
+    def __init__(self, top_n=5):
+        """
+        Initialize process table
+
+        Args:
+            top_n: Number of processes reported per ranking (default: 5)
+        """
+        self.top_n = top_n
+        # (pid, create_time) -> name; a reused PID is a new key
+        self.names = {}
+        self.io_rates = CounterRates()
+        # Per-process I/O counters don't exist on macOS
+        self.attrs = list(self.ATTRS) + ([] if getattr(psutil, "MACOS", False) else ["io_counters"])
+
+    def _name(self, key, proc):
+        """Name of a process, read only the first time its (pid, create_time) is seen"""
+        name = self.names.get(key)
+        if name is None:
+            name = proc.name()
+            self.names[key] = name
+        return name
+
+    def get_top_processes(self):
+        """Get the top-N processes by CPU, memory (RSS) and I/O"""
+        samples = []
+        seen = set()
+        # process_iter() keeps each psutil.Process between calls, so cpu_percent is
+        # the delta since the previous tick (0.0 on a process's first tick)
+        for proc in psutil.process_iter(attrs=self.attrs, ad_value=None):
+            info = proc.info
+            if info["cpu_percent"] is None or info["memory_info"] is None:
+                continue  # Access denied
+            key = (info["pid"], info["create_time"])
+            seen.add(key)
+            try:
+                name = self._name(key, proc)
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                continue
+
+            io_bps = None
+            io = info.get("io_counters")
+            if io is not None:
+                rates = self.io_rates.update(key, (io.read_bytes + io.write_bytes,))
+                io_bps = rates[0] if rates else None
+            samples.append({
+                "pid": info["pid"],
+                "name": name,
+                "cpu_percent": round(info["cpu_percent"], 1),
+                "rss_mb": round(info["memory_info"].rss / (1024**2), 1),
+                "io_bytes_per_sec": io_bps,
+            })
+
+        exited = self.names.keys() - seen
+        for key in exited:
+            del self.names[key]
+        self.io_rates.forget(exited)
+
+        with_io = [s for s in samples if s["io_bytes_per_sec"]]
+        return {
+            "process_count": len(samples),
+            "by_cpu": heapq.nlargest(self.top_n, samples, key=lambda s: s["cpu_percent"]),
+            "by_memory": heapq.nlargest(self.top_n, samples, key=lambda s: s["rss_mb"]),
+            "by_io": heapq.nlargest(self.top_n, with_io, key=lambda s: s["io_bytes_per_sec"]),
+        }
@@ -0,0 +1,321 @@
+"""
+Linux /proc fast path
+Keeps /proc and /sys files open and re-reads them in place instead of going through psutil
+"""
+import os
+import threading
+import time
+from collections import namedtuple
+
+import psutil
+
+
+# Same field names as the psutil results they replace
+CPUTimes = namedtuple("CPUTimes", "user nice system idle iowait irq softirq steal guest guest_nice")
+VirtualMemory = namedtuple("VirtualMemory", "total available percent used free")
+NetIO = namedtuple("NetIO", "bytes_sent bytes_recv packets_sent packets_recv errin errout dropin dropout")
+DiskIO = namedtuple("DiskIO", "read_count write_count read_bytes write_bytes read_time write_time "
+                              "read_merged_count write_merged_count busy_time")
+Battery = namedtuple("Battery", "percent secsleft power_plugged")
+CPUFreq = namedtuple("CPUFreq", "current min max")
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+SECTOR_SIZE = 512  # /proc/diskstats always counts 512-byte sectors
+POWER_SUPPLY_PATH = "/sys/class/power_supply"
+CPUFREQ_PATH = "/sys/devices/system/cpu/cpufreq"
+
+
+class ProcFile:
+    """A /proc or /sys file kept open and re-read from the start into a reused buffer"""
+
+    def __init__(self, path, size=4096):
+        """
+        Open a file
+
+        Args:
+            path: File to keep open
+            size: Initial buffer size in bytes (grows if the file is bigger)
+
+        Raises:
+            OSError: If the file can't be opened
+        """
+        self.path = path
+        self.file = open(path, "rb", buffering=0)
+        self.buffer = bytearray(size)
+        self._lock = threading.Lock()
+
+    def read(self):
+        """Current contents of the file"""
+        with self._lock:
+            self.file.seek(0)
+            size = 0
+            while True:
+                with memoryview(self.buffer) as view:
+                    count = self.file.readinto(view[size:])
+                if not count:
+                    break
+                size += count
+                if size == len(self.buffer):
+                    # File outgrew the buffer (e.g., new disks or interfaces)
+                    self.buffer.extend(bytes(len(self.buffer)))
+            return bytes(self.buffer[:size])
+
+    def read_int(self):
+        """Contents of a single-number sysfs attribute"""
+        return int(self.read())
+
+    def close(self):
+        """Close the file"""
+        self.file.close()
+
+
+def _open_first(*paths):
+    """Open the first of several alternative files that exists (None if none do)"""
+    for path in paths:
+        try:
+            return ProcFile(path, size=64)
+        except OSError:
+            continue
+    return None
+
+
+class ProcfsBackend:
+    """
+    psutil-compatible subset read straight from /proc and /sys
+
+    Implements the calls made on every sample (cpu_times, virtual_memory,
+    net_io_counters, disk_io_counters, sensors_battery, cpu_freq, cpu_count) with
+    persistent file handles and produces the same values as psutil; every other
+    attribute is looked up on psutil itself.
+    """
+
+    # Seconds between looks for a battery that wasn't there (docked, swapped)
+    BATTERY_RESCAN = 60
+
+    def __init__(self):
+        """
+        Open the /proc files
+
+        Raises:
+            OSError: If /proc isn't available (not Linux, or a restricted sandbox)
+        """
+        self.stat = ProcFile("/proc/stat", size=16384)
+        self.meminfo = ProcFile("/proc/meminfo", size=8192)
+        self.net_dev = ProcFile("/proc/net/dev")
+        try:
+            self.diskstats = ProcFile("/proc/diskstats", size=8192)
+        except OSError:
+            self.diskstats = None
+        self.battery = None  # (capacity, energy_now, power_now, energy_full, time_to_empty, status, ac_online)
+        self.battery_scanned_at = None
+        self.freq_files = self._open_cpufreq()
+        self.cpu_counts = {}
+        self._battery_lock = threading.Lock()
+
+    def __getattr__(self, name):
+        # Everything not read on the fast path (disk_partitions, sensors_temperatures,
+        # Process, constants, ...) comes from psutil
+        return getattr(psutil, name)
+
+    def cpu_times(self, percpu=False):
+        """CPU times in seconds (per core with percpu=True), like psutil.cpu_times()"""
+        times = []
+        for line in self.stat.read().splitlines():
+            if not line.startswith(b"cpu"):
+                break  # cpu lines come first
+            is_total = line[3:4] == b" "  # "cpu  ..." vs "cpu0 ..."
+            if is_total == percpu:
+                continue
+            values = [int(value) / CLOCK_TICKS for value in line.split()[1:11]]
+            values.extend([0.0] * (10 - len(values)))  # Old kernels lack steal/guest
+            times.append(CPUTimes(*values))
+        return times if percpu else times[0]
+
+    def virtual_memory(self):
+        """System memory, like psutil.virtual_memory() (total/available/percent/used/free)"""
+        fields = {}
+        for line in self.meminfo.read().splitlines():
+            name, _, rest = line.partition(b":")
+            if name in (b"MemTotal", b"MemFree", b"MemAvailable"):
+                fields[name] = int(rest.split()[0]) * 1024
+        if not fields.get(b"MemAvailable"):
+            # Kernel too old to estimate it (< 3.14) - psutil knows the fallback formula
+            return psutil.virtual_memory()
+        total, free = fields[b"MemTotal"], fields[b"MemFree"]
+        available = fields[b"MemAvailable"]
+        if available > total:
+            # Seen in some LXC containers
+            available = free
+        used = total - available
+        percent = round(used / total * 100, 1) if total else 0.0
+        return VirtualMemory(total, available, percent, used, free)
+
+    def _net_dev(self):
+        """NetIO per interface from /proc/net/dev"""
+        counters = {}
+        for line in self.net_dev.read().splitlines()[2:]:
+            name, _, rest = line.rpartition(b":")
+            fields = rest.split()
+            counters[name.strip().decode()] = NetIO(
+                int(fields[8]), int(fields[0]), int(fields[9]), int(fields[1]),
+                int(fields[2]), int(fields[10]), int(fields[3]), int(fields[11]),
+            )
+        return counters
+
+    def net_io_counters(self, pernic=False):
+        """Network counters (summed over every interface unless pernic=True)"""
+        counters = self._net_dev()
+        if pernic:
+            return counters
+        return NetIO(*(sum(column) for column in zip(*counters.values()))) if counters else None
+
+    def disk_io_counters(self, perdisk=False):
+        """Disk counters per block device, like psutil.disk_io_counters(perdisk=True)"""
+        if self.diskstats is None or not perdisk:
+            return psutil.disk_io_counters(perdisk=perdisk)
+        counters = {}
+        for line in self.diskstats.read().splitlines():
+            fields = line.split()
+            if len(fields) < 14:
+                continue  # Pre-2.6.25 partition lines - let psutil deal with those kernels
+            (reads, reads_merged, read_sectors, read_time, writes, writes_merged,
+             write_sectors, write_time, _, busy_time) = map(int, fields[3:13])
+            counters[fields[2].decode()] = DiskIO(
+                reads, writes, read_sectors * SECTOR_SIZE, write_sectors * SECTOR_SIZE,
+                read_time, write_time, reads_merged, writes_merged, busy_time,
+            )
+        return counters
+
+    def _open_battery(self):
+        """Open the attribute files of the first battery and the AC adapter"""
+        try:
+            supplies = os.listdir(POWER_SUPPLY_PATH)
+        except OSError:
+            return None
+        batteries = [name for name in supplies if name.startswith("BAT") or "battery" in name.lower()]
+        if not batteries:
+            return None
+        root = os.path.join(POWER_SUPPLY_PATH, min(batteries))
+        return (
+            _open_first(f"{root}/capacity"),
+            _open_first(f"{root}/energy_now", f"{root}/charge_now"),
+            _open_first(f"{root}/power_now", f"{root}/current_now"),
+            _open_first(f"{root}/energy_full", f"{root}/charge_full"),
+            _open_first(f"{root}/time_to_empty_now"),
+            _open_first(f"{root}/status"),
+            _open_first(f"{POWER_SUPPLY_PATH}/AC0/online", f"{POWER_SUPPLY_PATH}/AC/online"),
+        )
+
+    def _close_battery(self):
+        for handle in self.battery or ():
+            if handle is not None:
+                handle.close()
+        self.battery = None
+
+    def sensors_battery(self):
+        """Battery charge and AC state, like psutil.sensors_battery() (None without a battery)"""
+        with self._battery_lock:
+            now = time.monotonic()
+            if self.battery is None:
+                if self.battery_scanned_at is not None and now - self.battery_scanned_at < self.BATTERY_RESCAN:
+                    return None
+                self.battery_scanned_at = now
+                self.battery = self._open_battery()
+                if self.battery is None:
+                    return None
+            try:
+                return self._read_battery()
+            except (OSError, ValueError):
+                # Battery removed - look again on the next call
+                self._close_battery()
+                self.battery_scanned_at = None
+                return None
+
+    def _read_battery(self):
+        capacity, energy_now, power_now, energy_full, time_to_empty, status, ac_online = self.battery
+        energy = energy_now.read_int() if energy_now else None
+        power = power_now.read_int() if power_now else None
+        full = energy_full.read_int() if energy_full else None
+        minutes_left = time_to_empty.read_int() if time_to_empty else None
+
+        if energy is not None and full is not None:
+            percent = 100.0 * energy / full if full else 0.0
+        elif capacity is not None:
+            percent = capacity.read_int()
+        else:
+            return None
+
+        plugged = None
+        if ac_online is not None:
+            plugged = ac_online.read_int() == 1
+        elif status is not None:
+            state = status.read().strip().lower()
+            if state == b"discharging":
+                plugged = False
+            elif state in (b"charging", b"full"):
+                plugged = True
+
+        if plugged:
+            secsleft = psutil.POWER_TIME_UNLIMITED
+        elif energy is not None and power:
+            secsleft = int(energy / abs(power) * 3600)
+        elif minutes_left is not None and minutes_left >= 0:
+            secsleft = minutes_left * 60
+        else:
+            secsleft = psutil.POWER_TIME_UNKNOWN
+        return Battery(percent, secsleft, plugged)
+
+    def _open_cpufreq(self):
+        """(cur, min, max) frequency files per cpufreq policy ([] if there is no cpufreq driver)"""
+        try:
+            policies = [name for name in os.listdir(CPUFREQ_PATH) if name.startswith("policy")]
+        except OSError:
+            return []
+        files = []
+        for policy in sorted(policies, key=lambda name: int(name[len("policy"):])):
+            root = os.path.join(CPUFREQ_PATH, policy)
+            handles = (_open_first(f"{root}/scaling_cur_freq", f"{root}/cpuinfo_cur_freq"),
+                       _open_first(f"{root}/scaling_min_freq"),
+                       _open_first(f"{root}/scaling_max_freq"))
+            if None in handles:
+                return []
+            files.append(handles)
+        return files
+
+    def cpu_freq(self, percpu=False):
+        """Average CPU frequency in MHz over all policies, like psutil.cpu_freq()"""
+        if percpu or not self.freq_files:
+            # No cpufreq driver (VMs) - psutil falls back to /proc/cpuinfo
+            return psutil.cpu_freq(percpu=percpu)
+        frequencies = [
+            [handle.read_int() / 1000 for handle in handles]
+            for handles in self.freq_files
+        ]
+        return CPUFreq(*(sum(column) / len(frequencies) for column in zip(*frequencies)))
+
+    def cpu_count(self, logical=True):
+        """Number of logical or physical CPUs (counted once - psutil walks sysfs every call)"""
+        if logical not in self.cpu_counts:
+            self.cpu_counts[logical] = psutil.cpu_count(logical=logical)
+        return self.cpu_counts[logical]
+
+    def close(self):
+        """Close every open file"""
+        for handle in (self.stat, self.meminfo, self.net_dev, self.diskstats):
+            if handle is not None:
+                handle.close()
+        for handles in self.freq_files:
+            for handle in handles:
+                handle.close()
+        with self._battery_lock:
+            self._close_battery()
+
+
+def default_backend():
+    """ProcfsBackend on Linux, psutil everywhere else (or if /proc can't be read)"""
+    if not psutil.LINUX:
+        return psutil
+    try:
+        return ProcfsBackend()
+    except OSError:
+        return psutil
@@ -0,0 +1,209 @@
+"""
+Fixed-schema snapshot store
+Append-only file of typed binary records that can be memory-mapped and scanned
+"""
+import math
+import mmap
+import os
+import struct
+from array import array
+from datetime import datetime
+
+
+# (field, struct format) - every record has exactly these values, little-endian
+RECORD_FIELDS = (
+    ("timestamp", "d"),  # Unix time of the snapshot
+    ("cpu_percent", "f"),
+    ("cpu_freq_mhz", "f"),
+    ("memory_percent", "f"),
+    ("memory_used_gb", "f"),
+    ("disk_percent", "f"),  # Fullest partition
+    ("battery_percent", "f"),
+    ("plugged_in", "b"),  # 1 = AC, 0 = battery, -1 = unknown / no battery
+    ("power_rate_w", "f"),
+    ("remaining_capacity_mwh", "f"),
+    ("net_sent_bps", "f"),
+    ("net_recv_bps", "f"),
+    ("temperature_c", "f"),  # Hottest sensor
+)
+
+MAGIC = b"LMTS"
+VERSION = 1
+HEADER = struct.Struct("<4sHHH")  # magic, version, record size, schema length
+
+
+def _number(value):
+    """Missing values are stored as NaN"""
+    return float(value) if value is not None else math.nan
+
+
+def snapshot_to_record(data):
+    """Flatten a get_all_data() snapshot into a tuple matching RECORD_FIELDS"""
+    cpu = data.get("cpu_info") or {}
+    memory = data.get("memory_info") or {}
+    battery = data.get("battery_info") or {}
+    power = data.get("power_info") or {}
+    network = data.get("network_info") or {}
+    disks = data.get("disk_info") or []
+    temperatures = [
+        sensor["current"]
+        for sensors in (data.get("temperature_info") or {}).values()
+        for sensor in sensors
+        if sensor.get("current") is not None
+    ]
+    plugged_in = battery.get("plugged_in")
+
+    return (
+        datetime.fromisoformat(data["timestamp"]).timestamp(),
+        _number(cpu.get("cpu_usage_percent")),
+        _number(cpu.get("cpu_freq_current")),
+        _number(memory.get("percent")),
+        _number(memory.get("used_gb")),
+        _number(max((disk["percent"] for disk in disks), default=None)),
+        _number(battery.get("percent")),
+        -1 if plugged_in is None else int(plugged_in),
+        _number(power.get("current_rate_w")),
+        _number(power.get("remaining_capacity_mwh")),
+        _number(network.get("bytes_sent_per_sec")),
+        _number(network.get("bytes_received_per_sec")),
+        _number(max(temperatures, default=None)),
+    )
+
+
+class SnapshotStore:
+    """Append-only time-series file of fixed-size snapshot records"""
+
+    def __init__(self, path, fields=RECORD_FIELDS, readonly=False):
+        """
+        Open (or create) a store
+
+        Args:
+            path: File to append records to
+            fields: (name, struct format) pairs describing a record
+            readonly: Only read (safe while another process appends)
+        """
+        self.path = path
+        self.fields = tuple(name for name, _ in fields)
+        self.record = struct.Struct("<" + "".join(fmt for _, fmt in fields))
+        self.schema = ",".join(f"{name}:{fmt}" for name, fmt in fields).encode("ascii")
+        self.header_size = HEADER.size + len(self.schema)
+
+        self.readonly = readonly
+        if readonly:
+            self.file = open(path, "rb")
+            self._check_header()
+            return
+
+        self.file = open(path, "a+b")
+        self.file.seek(0, os.SEEK_END)
+        size = self.file.tell()
+        if size == 0:
+            self.file.write(HEADER.pack(MAGIC, VERSION, self.record.size, len(self.schema)) + self.schema)
+            self.file.flush()
+        else:
+            self._check_header()
+            # Drop a record torn by a crash mid-write
+            torn = (size - self.header_size) % self.record.size
+            if torn:
+                self.file.truncate(size - torn)
+        self.last_timestamp = self._read_last_timestamp()
+
+    def _check_header(self):
+        """Refuse files written with a different record layout"""
+        self.file.seek(0)
+        header = self.file.read(self.header_size)
+        if len(header) < HEADER.size:
+            raise ValueError(f"{self.path} is not a snapshot store")
+        magic, version, record_size, schema_length = HEADER.unpack_from(header)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.path} is not a version {VERSION} snapshot store")
+        if record_size != self.record.size or header[HEADER.size:HEADER.size + schema_length] != self.schema:
+            raise ValueError(f"{self.path} was written with a different record schema")
+        self.file.seek(0, os.SEEK_END)
+
+    def _read_last_timestamp(self):
+        """Timestamp of the newest record, or None if the store is empty"""
+        count = len(self)
+        if count == 0:
+            return None
+        self.file.seek(self.header_size + (count - 1) * self.record.size)
+        timestamp = struct.unpack("<d", self.file.read(8))[0]
+        self.file.seek(0, os.SEEK_END)
+        return timestamp
+
+    def __len__(self):
+        return max(0, (os.fstat(self.file.fileno()).st_size - self.header_size) // self.record.size)
+
+    def append(self, data):
+        """Append a get_all_data() snapshot"""
+        self.append_record(snapshot_to_record(data))
+
+    def append_record(self, values):
+        """Append one record (values in RECORD_FIELDS order)"""
+        timestamp = values[0]
+        if self.last_timestamp is not None and timestamp < self.last_timestamp:
+            # Clock stepped back - scan() binary-searches, so timestamps must never decrease
+            timestamp = self.last_timestamp
+            values = (timestamp,) + tuple(values[1:])
+        # One write per record; "a" mode keeps concurrent appends whole
+        self.file.write(self.record.pack(*values))
+        self.file.flush()
+        self.last_timestamp = timestamp
+
+    def _bounds(self, view, count, since, until):
+        """Binary-search the first and past-the-end record in [since, until)"""
+        size = self.record.size
+        base = self.header_size
+
+        def first_at_or_after(ts):
+            low, high = 0, count
+            while low < high:
+                mid = (low + high) // 2
+                if struct.unpack_from("<d", view, base + mid * size)[0] < ts:
+                    low = mid + 1
+                else:
+                    high = mid
+            return low
+
+        start = first_at_or_after(since) if since is not None else 0
+        end = first_at_or_after(until) if until is not None else count
+        return start, max(start, end)
+
+    def scan(self, since=None, until=None):
+        """
+        Read records with since <= timestamp < until
+
+        Args:
+            since: Unix time of the oldest record (None = from the start)
+            until: Unix time the range ends before (None = to the end)
+
+        Returns:
+            List of record tuples in RECORD_FIELDS order
+        """
+        count = len(self)
+        if count == 0:
+            return []
+        with mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            start, end = self._bounds(view, count, since, until)
+            offset = self.header_size + start * self.record.size
+            return list(self.record.iter_unpack(view[offset:offset + (end - start) * self.record.size]))
+
+    def column(self, field, since=None, until=None):
+        """
+        Read one field for a time range, skipping missing (NaN) values
+
+        Returns:
+            (timestamps, values) as array('d')
+        """
+        index = self.fields.index(field)
+        timestamps, values = array('d'), array('d')
+        for record in self.scan(since, until):
+            value = record[index]
+            if value == value:  # Not NaN
+                timestamps.append(record[0])
+                values.append(value)
+        return timestamps, values
+
+    def close(self):
+        """Close the file"""
+        self.file.close()
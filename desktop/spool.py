@@ -0,0 +1,80 @@
+"""
+Offline telemetry spool
+Durable SQLite queue for snapshots that could not be sent to the server
+"""
+import json
+import sqlite3
+import threading
+import time
+
+
+class TelemetrySpool:
+    """SQLite journal of unsent payloads with size and age caps"""
+
+    def __init__(self, path="telemetry_spool.db", max_items=10000, max_age_seconds=7 * 24 * 3600):
+        """
+        Initialize spool
+
+        Args:
+            path: SQLite file that holds queued payloads
+            max_items: Oldest payloads are dropped beyond this count (default: 10000)
+            max_age_seconds: Payloads older than this are dropped (default: 7 days)
+        """
+        self.path = path
+        self.max_items = max_items
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS spool ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " created_at REAL NOT NULL,"
+            " payload TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    def push(self, payload):
+        """Queue a payload and enforce the caps"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO spool (created_at, payload) VALUES (?, ?)",
+                (time.time(), json.dumps(payload)),
+            )
+            self._prune()
+            self._conn.commit()
+
+    def peek(self, limit=100):
+        """Get up to `limit` oldest payloads as (id, payload) pairs"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, payload FROM spool ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+        return [(row_id, json.loads(payload)) for row_id, payload in rows]
+
+    def remove(self, ids):
+        """Delete payloads that were delivered"""
+        if not ids:
+            return
+        with self._lock:
+            self._conn.executemany("DELETE FROM spool WHERE id = ?", [(i,) for i in ids])
+            self._conn.commit()
+
+    def _prune(self):
+        """Drop payloads beyond the age and size caps (caller holds the lock)"""
+        self._conn.execute(
+            "DELETE FROM spool WHERE created_at < ?", (time.time() - self.max_age_seconds,)
+        )
+        self._conn.execute(
+            "DELETE FROM spool WHERE id <= (SELECT id FROM spool ORDER BY id DESC LIMIT 1 OFFSET ?)",
+            (self.max_items,),
+        )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+
+    def close(self):
+        """Close the SQLite connection"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,54 @@
+"""
+Startup cache
+Keeps the device identity and static system info on disk so the agent can report right after start
+"""
+import json
+import os
+import platform
+
+
+class StartupCache:
+    """Small JSON file of values that are slow to compute and never change between runs"""
+
+    def __init__(self, path):
+        """
+        Load the cache (a missing, unreadable or foreign file counts as empty)
+
+        Args:
+            path: JSON file the values are kept in
+        """
+        self.path = path
+        self.values = {}
+        self.dirty = False
+        try:
+            with open(path, 'r') as f:
+                values = json.load(f)
+        except (OSError, ValueError):
+            return
+        # A cache copied along with the agent to another machine must not be reused
+        if isinstance(values, dict) and values.get("hostname") == platform.node():
+            self.values = values
+
+    def get(self, key, default=None):
+        """Cached value of `key`"""
+        return self.values.get(key, default)
+
+    def set(self, key, value):
+        """Update a value (written by the next save())"""
+        if self.values.get(key) != value:
+            self.values[key] = value
+            self.dirty = True
+
+    def save(self):
+        """Write the cache if anything changed (atomically, a crash leaves the old file)"""
+        if not self.dirty:
+            return
+        self.values["hostname"] = platform.node()
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump(self.values, f, indent=2)
+            os.replace(temp_path, self.path)
+            self.dirty = False
+        except OSError as e:
+            print(f"⚠️  Could not write startup cache {self.path}: {e}")
@@ -0,0 +1,197 @@
+"""
+Resilient HTTP transport
+Pooled keep-alive connections, split timeouts, jittered retries and a circuit breaker
+"""
+import json
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of sending a request while the server is known to be down"""
+
+
+class CircuitBreaker:
+    """Stops network attempts after repeated failures and probes the server with one request"""
+
+    def __init__(self, failure_threshold=3, reset_timeout=15, max_reset_timeout=300):
+        """
+        Initialize circuit breaker
+
+        Args:
+            failure_threshold: Consecutive failed requests that open the circuit (default: 3)
+            reset_timeout: Seconds the circuit stays open the first time (default: 15)
+            max_reset_timeout: Longest open period after repeated failed probes (default: 300)
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.failures = 0
+        self.opens = 0  # Consecutive times the circuit opened without a success in between
+        self.open_until = None  # Monotonic time the next probe is allowed
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        """'closed', 'open' or 'half_open' (a probe request is in flight)"""
+        with self._lock:
+            if self.open_until is None:
+                return "closed"
+            return "half_open" if self.probing else "open"
+
+    def retry_in(self):
+        """Seconds until the next probe request is allowed"""
+        with self._lock:
+            if self.open_until is None:
+                return 0
+            return max(0.0, self.open_until - time.monotonic())
+
+    def allow(self):
+        """Check if a request may be sent now"""
+        with self._lock:
+            if self.open_until is None:
+                return True
+            if self.probing or time.monotonic() < self.open_until:
+                return False
+            # Cool-down is over - let a single probe through
+            self.probing = True
+            return True
+
+    def record_success(self):
+        """Server answered - close the circuit"""
+        with self._lock:
+            if self.open_until is not None:
+                print("✅ Server reachable again")
+            self.failures = 0
+            self.opens = 0
+            self.open_until = None
+            self.probing = False
+
+    def record_failure(self):
+        """Request failed - open the circuit once failures pile up (or the probe failed)"""
+        with self._lock:
+            self.failures += 1
+            if self.open_until is None and self.failures < self.failure_threshold:
+                return
+            self.opens += 1
+            timeout = min(self.max_reset_timeout, self.reset_timeout * 2 ** (self.opens - 1))
+            # Jitter so agents that lost the same server don't all probe it at once
+            timeout = random.uniform(timeout / 2, timeout)
+            self.open_until = time.monotonic() + timeout
+            self.probing = False
+            print(f"⏸️  Server unreachable, pausing requests for {timeout:.0f}s")
+
+
+class Transport:
+    """HTTP session with keep-alive pooling, retries and a shared circuit breaker"""
+
+    # Gateway errors that mean the request never reached a healthy server
+    RETRY_STATUSES = (502, 503, 504)
+    IDEMPOTENT_METHODS = ("GET", "HEAD", "PUT", "DELETE", "OPTIONS")
+
+    def __init__(self, connect_timeout=3.05, read_timeout=10, retries=2, backoff_base=0.5,
+                 backoff_max=5, pool_maxsize=4, breaker=None, stats=None):
+        """
+        Initialize transport
+
+        Args:
+            connect_timeout: Seconds to wait for a TCP connection (default: 3.05)
+            read_timeout: Seconds to wait for the response (default: 10)
+            retries: Extra attempts per request after a failure (default: 2)
+            backoff_base: Base delay of the exponential backoff between attempts (default: 0.5)
+            backoff_max: Longest delay between attempts (default: 5)
+            pool_maxsize: Keep-alive connections kept open to the server (default: 4)
+            breaker: CircuitBreaker to use (share one between transports to the same server)
+            stats: AgentStats recording round-trips and retries (optional)
+        """
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.stats = stats
+
+        self.session = requests.Session()
+        # Retries are handled here (with jitter), not by urllib3
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Connection"] = "keep-alive"
+
+    def backoff(self, attempt):
+        """Delay before retry number `attempt` (full jitter)"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+    def _record(self, endpoint, start, kwargs, response=None):
+        """Report one attempt to AgentStats"""
+        if self.stats is None:
+            return
+        sent = len(kwargs.get('data') or b'')
+        if 'json' in kwargs:
+            sent = len(json.dumps(kwargs['json']).encode('utf-8'))
+        if response is None:
+            self.stats.record_request(endpoint, time.perf_counter() - start, sent=sent, ok=False)
+        else:
+            self.stats.record_request(endpoint, time.perf_counter() - start, sent=sent,
+                                      received=len(response.content), ok=response.status_code < 400)
+
+    def request(self, method, url, endpoint, read_timeout=None, idempotent=None, **kwargs):
+        """
+        Send a request, retrying connection failures with jittered exponential backoff
+
+        Args:
+            method: HTTP method
+            url: Request URL
+            endpoint: Name the request is recorded under in AgentStats (e.g., 'send_data')
+            read_timeout: Override the read timeout for this request
+            idempotent: Whether timeouts and gateway errors may be retried
+                        (default: by method; connection failures are always retried)
+            **kwargs: Passed to requests (data, json, headers, params)
+
+        Returns:
+            requests.Response
+
+        Raises:
+            CircuitOpenError: If the server is known to be down
+            requests.exceptions.RequestException: If every attempt failed
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Server marked down, next attempt in {self.breaker.retry_in():.0f}s")
+        if idempotent is None:
+            idempotent = method.upper() in self.IDEMPOTENT_METHODS
+        # A probe after an outage gets one attempt - failing fast re-opens the circuit
+        retries = 0 if self.breaker.state == "half_open" else self.retries
+        timeout = (self.connect_timeout, read_timeout or self.read_timeout)
+
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except requests.exceptions.RequestException as e:
+                self._record(endpoint, start, kwargs)
+                # Refused/failed connections never reached the server; a read timeout may have
+                retryable = isinstance(e, requests.exceptions.ConnectionError) or (
+                    idempotent and isinstance(e, requests.exceptions.Timeout))
+                if not retryable or attempt >= retries:
+                    self.breaker.record_failure()
+                    raise
+            else:
+                self._record(endpoint, start, kwargs, response)
+                if response.status_code not in self.RETRY_STATUSES:
+                    self.breaker.record_success()
+                    return response
+                if not idempotent or attempt >= retries:
+                    self.breaker.record_failure()
+                    return response
+
+            attempt += 1
+            if self.stats is not None:
+                self.stats.record_retry()
+            time.sleep(self.backoff(attempt))
@@ -0,0 +1,107 @@
+"""
+Persistent WMI session layer (Windows)
+Opens WMI connections once and caches slow-changing query results
+"""
+import threading
+import time
+
+
+def default_provider(namespace=None):
+    """Open a real WMI connection (requires the wmi package on Windows)"""
+    import wmi
+    try:
+        # COM must be initialized in every thread that talks to WMI
+        import pythoncom
+        pythoncom.CoInitialize()
+    except ImportError:
+        pass
+    if namespace:
+        return wmi.WMI(namespace=namespace)
+    return wmi.WMI()
+
+
+class WMISession:
+    """Long-lived WMI connection with automatic reconnect and a TTL query cache"""
+
+    def __init__(self, namespace=None, provider=None):
+        """
+        Initialize session
+
+        Args:
+            namespace: WMI namespace (e.g., 'root\\\\wmi'), None for the default
+            provider: Callable(namespace) returning a WMI connection
+                      (default: real wmi.WMI; pass a fake for testing)
+        """
+        self.namespace = namespace
+        self.provider = provider or default_provider
+        self.unavailable = None  # ImportError message once WMI is known to be missing
+        self._local = threading.local()
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+
+    def connection(self):
+        """Get the connection for this thread, opening it on first use"""
+        if self.unavailable:
+            raise ImportError(self.unavailable)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            try:
+                conn = self.provider(self.namespace)
+            except ImportError as e:
+                # Don't retry the import on every snapshot
+                self.unavailable = str(e)
+                raise
+            self._local.conn = conn
+        return conn
+
+    def reset(self):
+        """Drop the connection for this thread so the next query reconnects"""
+        self._local.conn = None
+
+    def query(self, class_name, fields, ttl=0):
+        """
+        Query a WMI class (e.g., 'BatteryStatus')
+
+        Args:
+            class_name: WMI class to query
+            fields: Property names to read from each instance
+            ttl: Seconds a cached result stays valid (0 = always re-query)
+
+        Returns:
+            List of dicts (one per instance) with the requested properties
+        """
+        if ttl:
+            with self._cache_lock:
+                cached = self._cache.get(class_name)
+            if cached and time.monotonic() - cached[0] < ttl:
+                return cached[1]
+
+        try:
+            result = self._fetch(class_name, fields)
+        except ImportError:
+            raise
+        except Exception:
+            # Connection broke (e.g., after sleep/resume) - reconnect once and retry
+            self.reset()
+            result = self._fetch(class_name, fields)
+
+        if ttl:
+            with self._cache_lock:
+                self._cache[class_name] = (time.monotonic(), result)
+        return result
+
+    def _fetch(self, class_name, fields):
+        """Run the query and copy properties out of the COM objects"""
+        instances = getattr(self.connection(), class_name)()
+        return [
+            {field: getattr(instance, field, None) for field in fields}
+            for instance in instances or []
+        ]
+
+    def invalidate(self, class_name=None):
+        """Drop cached results for one class or for all classes"""
+        with self._cache_lock:
+            if class_name:
+                self._cache.pop(class_name, None)
+            else:
+                self._cache.clear()
@@ -0,0 +1,2 @@
+ALTER TABLE `device_data` ADD `network_send_rate` integer;--> statement-breakpoint
+ALTER TABLE `device_data` ADD `network_receive_rate` integer;
\ No newline at end of file
@@ -0,0 +1 @@
+ALTER TABLE `device_data` ADD `top_processes` text;
\ No newline at end of file
@@ -0,0 +1 @@
+ALTER TABLE `device_data` ADD `agent_stats` text;
\ No newline at end of file
@@ -0,0 +1,64 @@
+CREATE TABLE `device_data_rollup_1m` (
+	`id` integer PRIMARY KEY AUTOINCREMENT NOT NULL,
+	`device_id` text NOT NULL,
+	`bucket` integer NOT NULL,
+	`samples` integer NOT NULL,
+	`cpu_min` integer NOT NULL,
+	`cpu_max` integer NOT NULL,
+	`cpu_sum` integer NOT NULL,
+	`memory_min` integer NOT NULL,
+	`memory_max` integer NOT NULL,
+	`memory_sum` integer NOT NULL,
+	`battery_samples` integer DEFAULT 0 NOT NULL,
+	`battery_min` integer,
+	`battery_max` integer,
+	`battery_sum` integer DEFAULT 0 NOT NULL,
+	`network_samples` integer DEFAULT 0 NOT NULL,
+	`network_send_min` integer,
+	`network_send_max` integer,
+	`network_send_sum` integer DEFAULT 0 NOT NULL,
+	`network_receive_min` integer,
+	`network_receive_max` integer,
+	`network_receive_sum` integer DEFAULT 0 NOT NULL,
+	FOREIGN KEY (`device_id`) REFERENCES `devices`(`id`) ON UPDATE no action ON DELETE cascade
+);
+--> statement-breakpoint
+CREATE UNIQUE INDEX `device_data_rollup_1m_device_bucket_idx` ON `device_data_rollup_1m` (`device_id`,`bucket`);--> statement-breakpoint
+CREATE INDEX `device_data_rollup_1m_bucket_idx` ON `device_data_rollup_1m` (`bucket`);--> statement-breakpoint
+CREATE TABLE `device_data_rollup_1h` (
+	`id` integer PRIMARY KEY AUTOINCREMENT NOT NULL,
+	`device_id` text NOT NULL,
+	`bucket` integer NOT NULL,
+	`samples` integer NOT NULL,
+	`cpu_min` integer NOT NULL,
+	`cpu_max` integer NOT NULL,
+	`cpu_sum` integer NOT NULL,
+	`memory_min` integer NOT NULL,
+	`memory_max` integer NOT NULL,
+	`memory_sum` integer NOT NULL,
+	`battery_samples` integer DEFAULT 0 NOT NULL,
+	`battery_min` integer,
+	`battery_max` integer,
+	`battery_sum` integer DEFAULT 0 NOT NULL,
+	`network_samples` integer DEFAULT 0 NOT NULL,
+	`network_send_min` integer,
+	`network_send_max` integer,
+	`network_send_sum` integer DEFAULT 0 NOT NULL,
+	`network_receive_min` integer,
+	`network_receive_max` integer,
+	`network_receive_sum` integer DEFAULT 0 NOT NULL,
+	FOREIGN KEY (`device_id`) REFERENCES `devices`(`id`) ON UPDATE no action ON DELETE cascade
+);
+--> statement-breakpoint
+CREATE UNIQUE INDEX `device_data_rollup_1h_device_bucket_idx` ON `device_data_rollup_1h` (`device_id`,`bucket`);--> statement-breakpoint
+CREATE INDEX `device_data_rollup_1h_bucket_idx` ON `device_data_rollup_1h` (`bucket`);--> statement-breakpoint
+-- Drop rows a device uploaded twice (retried bulk uploads) so the backfill doesn't count them twice;
+-- before event-triggered reports, one device never reported twice in the same second
+DELETE FROM `device_data` WHERE `id` NOT IN (SELECT min(`id`) FROM `device_data` GROUP BY `device_id`, `timestamp`);--> statement-breakpoint
+-- Backfill from the telemetry already stored
+INSERT INTO `device_data_rollup_1m` (`device_id`, `bucket`, `samples`, `cpu_min`, `cpu_max`, `cpu_sum`, `memory_min`, `memory_max`, `memory_sum`, `battery_samples`, `battery_min`, `battery_max`, `battery_sum`, `network_samples`, `network_send_min`, `network_send_max`, `network_send_sum`, `network_receive_min`, `network_receive_max`, `network_receive_sum`)
+SELECT `device_id`, (`timestamp` / 60) * 60, count(*), min(`cpu_usage`), max(`cpu_usage`), sum(`cpu_usage`), min(`memory_percent`), max(`memory_percent`), sum(`memory_percent`), count(`battery_percent`), min(`battery_percent`), max(`battery_percent`), coalesce(sum(`battery_percent`), 0), count(`network_send_rate`), min(`network_send_rate`), max(`network_send_rate`), coalesce(sum(`network_send_rate`), 0), min(`network_receive_rate`), max(`network_receive_rate`), coalesce(sum(`network_receive_rate`), 0)
+FROM `device_data` GROUP BY `device_id`, (`timestamp` / 60);--> statement-breakpoint
+INSERT INTO `device_data_rollup_1h` (`device_id`, `bucket`, `samples`, `cpu_min`, `cpu_max`, `cpu_sum`, `memory_min`, `memory_max`, `memory_sum`, `battery_samples`, `battery_min`, `battery_max`, `battery_sum`, `network_samples`, `network_send_min`, `network_send_max`, `network_send_sum`, `network_receive_min`, `network_receive_max`, `network_receive_sum`)
+SELECT `device_id`, (`timestamp` / 3600) * 3600, count(*), min(`cpu_usage`), max(`cpu_usage`), sum(`cpu_usage`), min(`memory_percent`), max(`memory_percent`), sum(`memory_percent`), count(`battery_percent`), min(`battery_percent`), max(`battery_percent`), coalesce(sum(`battery_percent`), 0), count(`network_send_rate`), min(`network_send_rate`), max(`network_send_rate`), coalesce(sum(`network_send_rate`), 0), min(`network_receive_rate`), max(`network_receive_rate`), coalesce(sum(`network_receive_rate`), 0)
+FROM `device_data` GROUP BY `device_id`, (`timestamp` / 3600);
@@ -0,0 +1,2 @@
+ALTER TABLE `device_data` ADD `report_id` text;--> statement-breakpoint
+CREATE UNIQUE INDEX `device_data_device_report_idx` ON `device_data` (`device_id`,`report_id`);
\ No newline at end of file
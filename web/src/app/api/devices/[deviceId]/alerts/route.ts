@@ -0,0 +1,47 @@
+import { type NextRequest, NextResponse } from "next/server";
+import { ZodError } from "zod";
+import { AlertEventsRequestSchema } from "@/lib/validations/alert";
+import { getDevice } from "@/server/db/queries/device";
+import { applyAlertEvents } from "@/server/ingest/device-data";
+
+/**
+ * POST /api/devices/{deviceId}/alerts
+ * Receives alerts raised and resolved by the device's own rule engine,
+ * sent as they happen instead of with the next report
+ */
+export async function POST(
+  req: NextRequest,
+  context: { params: Promise<{ deviceId: string }> },
+) {
+  try {
+    const { deviceId } = await context.params;
+    const { events } = AlertEventsRequestSchema.parse(await req.json());
+
+    const device = await getDevice(deviceId);
+    if (device.length === 0) {
+      return NextResponse.json({ error: "Device not found" }, { status: 404 });
+    }
+
+    console.log(`🔔 ${events.length} alert event(s) from: ${deviceId}`);
+    const { created, resolved } = await applyAlertEvents(deviceId, events);
+
+    return NextResponse.json({
+      success: true,
+      created,
+      resolved,
+    });
+  } catch (error) {
+    if (error instanceof ZodError || error instanceof SyntaxError) {
+      return NextResponse.json(
+        { error: "Invalid alert events", details: error.message },
+        { status: 400 },
+      );
+    }
+
+    console.error("Error recording alert events:", error);
+    return NextResponse.json(
+      { error: "Failed to record alert events" },
+      { status: 500 },
+    );
+  }
+}
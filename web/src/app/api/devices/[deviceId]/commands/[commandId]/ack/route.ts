@@ -1,5 +1,7 @@
 import { type NextRequest, NextResponse } from "next/server";
+import { ZodError } from "zod";
 import { CommandAcknowledgementSchema } from "@/lib/validations/command";
+import { markCommandExecuted } from "@/server/db/queries/device";
 
 export async function POST(
   req: NextRequest,
@@ -16,19 +18,34 @@ export async function POST(
       timestamp: body.timestamp,
     });
 
-    // TODO: Mark command as executed in your database
-    // Example with Drizzle:
-    // await db
-    //   .update(deviceCommands)
-    //   .set({
-    //     executed: true,
-    //     executedAt: new Date(body.timestamp),
-    //     status: body.status,
-    //   })
-    //   .where(eq(deviceCommands.id, commandId));
+    const id = parseInt(commandId);
+    if (Number.isNaN(id)) {
+      return NextResponse.json(
+        { error: "Invalid command ID" },
+        { status: 400 },
+      );
+    }
+
+    // Mark command as done so it is no longer returned as pending
+    const updated = await markCommandExecuted(
+      deviceId,
+      id,
+      body.status === "failed" ? (body.error ?? "Command failed") : undefined,
+    );
+    if (updated.length === 0) {
+      // Unknown command, or one that belongs to another device
+      return NextResponse.json({ error: "Command not found" }, { status: 404 });
+    }
 
     return NextResponse.json({ success: true });
   } catch (error) {
+    if (error instanceof ZodError || error instanceof SyntaxError) {
+      return NextResponse.json(
+        { error: "Validation error", details: error.message },
+        { status: 400 },
+      );
+    }
+
     console.error("Error acknowledging command:", error);
     return NextResponse.json(
       { error: "Failed to acknowledge command" },
@@ -1,9 +1,16 @@
 import { type NextRequest, NextResponse } from "next/server";
-import { getPendingCommands } from "@/server/db/queries/device";
+import { claimPendingCommands } from "@/server/db/queries/device";
+import { waitForDeviceCommand } from "@/server/command-notifier";
+
+// Longest a client may hold a long-poll request open (seconds)
+const MAX_WAIT_SECONDS = 55;
 
 /**
  * GET endpoint - Retrieve pending commands for a device
  * Used by desktop client to check for commands
+ * Returned commands are marked acknowledged, so each is delivered once
+ * Query params: wait (seconds) - hold the request open until a command
+ * arrives or the wait expires (long-poll), default 0
  */
 export async function GET(
   req: NextRequest,
@@ -11,6 +18,11 @@ export async function GET(
 ) {
   try {
     const { deviceId } = await context.params;
+    const { searchParams } = new URL(req.url);
+    const waitParam = parseInt(searchParams.get("wait") ?? "0");
+    const wait = Number.isNaN(waitParam)
+      ? 0
+      : Math.min(Math.max(waitParam, 0), MAX_WAIT_SECONDS);
 
     if (!deviceId) {
       return NextResponse.json(
@@ -19,8 +31,21 @@ export async function GET(
       );
     }
 
-    // Get pending commands for this device
-    const commands = await getPendingCommands(deviceId);
+    // Claim pending commands for this device
+    let commands = await claimPendingCommands(deviceId);
+
+    // Long-poll: nothing pending, so wait for a new command instead of
+    // making the client ask again every tick
+    if (commands.length === 0 && wait > 0) {
+      const notified = await waitForDeviceCommand(
+        deviceId,
+        wait * 1000,
+        req.signal,
+      );
+      if (notified) {
+        commands = await claimPendingCommands(deviceId);
+      }
+    }
 
     // Transform to simple format for desktop client
     const formattedCommands = commands.map((cmd) => ({
@@ -33,6 +58,7 @@ export async function GET(
     return NextResponse.json({
       success: true,
       deviceId,
+      longPoll: wait > 0,
       count: formattedCommands.length,
       commands: formattedCommands,
     });
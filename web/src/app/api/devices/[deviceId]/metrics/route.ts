@@ -0,0 +1,76 @@
+import { type NextRequest, NextResponse } from "next/server";
+import { getDevice } from "@/server/db/queries/device";
+import { getDeviceMetricSeries } from "@/server/db/queries/device-rollup";
+
+const MAX_POINTS_LIMIT = 5000;
+
+/**
+ * GET /api/devices/{deviceId}/metrics
+ * CPU, memory, battery and network series (min/max/avg per point)
+ * Query params: hours (default: 24) or from/to (ISO timestamps),
+ * points (default: 500) - the server reads raw rows, 1-minute or 1-hour
+ * rollups, whichever is the finest tier that fits in that many points
+ */
+export async function GET(
+  req: NextRequest,
+  context: { params: Promise<{ deviceId: string }> },
+) {
+  try {
+    const { deviceId } = await context.params;
+    const { searchParams } = new URL(req.url);
+
+    const hours = parseFloat(searchParams.get("hours") ?? "24");
+    const to = searchParams.get("to");
+    const from = searchParams.get("from");
+    const endTime = to ? new Date(to) : new Date();
+    const startTime = from
+      ? new Date(from)
+      : new Date(endTime.getTime() - hours * 60 * 60 * 1000);
+    const maxPoints = parseInt(searchParams.get("points") ?? "500");
+
+    if (
+      isNaN(startTime.getTime()) ||
+      isNaN(endTime.getTime()) ||
+      startTime >= endTime
+    ) {
+      return NextResponse.json(
+        { error: "Invalid time range" },
+        { status: 400 },
+      );
+    }
+    if (isNaN(maxPoints) || maxPoints < 1 || maxPoints > MAX_POINTS_LIMIT) {
+      return NextResponse.json(
+        { error: `points must be between 1 and ${MAX_POINTS_LIMIT}` },
+        { status: 400 },
+      );
+    }
+
+    const device = await getDevice(deviceId);
+    if (device.length === 0) {
+      return NextResponse.json({ error: "Device not found" }, { status: 404 });
+    }
+
+    const series = await getDeviceMetricSeries(
+      deviceId,
+      startTime,
+      endTime,
+      maxPoints,
+    );
+
+    return NextResponse.json({
+      success: true,
+      deviceId,
+      from: startTime.toISOString(),
+      to: endTime.toISOString(),
+      tier: series.tier,
+      count: series.points.length,
+      points: series.points,
+    });
+  } catch (error) {
+    console.error("Error retrieving device metrics:", error);
+    return NextResponse.json(
+      { error: "Failed to retrieve metrics" },
+      { status: 500 },
+    );
+  }
+}
@@ -0,0 +1,123 @@
+import { type NextRequest, NextResponse } from "next/server";
+import { ZodError } from "zod";
+import {
+  DeviceDataBulkRequestSchema,
+  DeviceDataRequestSchema,
+  type DeviceDataRequest,
+} from "@/lib/validations/device-data-request";
+import {
+  storeDeviceData,
+  monitorAndCreateAlerts,
+} from "@/server/ingest/device-data";
+import {
+  readTelemetryBody,
+  TELEMETRY_RESPONSE_HEADERS,
+} from "@/server/ingest/telemetry-codec";
+import { IngestOverloadedError } from "@/server/ingest/ingest-buffer";
+import { MsgpackError } from "@/lib/msgpack";
+
+/**
+ * Bulk device data handler
+ * Receives snapshots a client queued while it was offline
+ * Stores the valid ones in timestamp order, reports invalid ones by index
+ * (clients drop those instead of re-sending them) and only alerts on the
+ * newest snapshot per device
+ */
+export async function POST(req: NextRequest) {
+  try {
+    const { snapshots } = DeviceDataBulkRequestSchema.parse(
+      await readTelemetryBody(req),
+    );
+
+    const valid: DeviceDataRequest[] = [];
+    const rejected: Array<{ index: number; error: string }> = [];
+    snapshots.forEach((snapshot, index) => {
+      const result = DeviceDataRequestSchema.safeParse(snapshot);
+      if (result.success) {
+        valid.push(result.data);
+      } else {
+        rejected.push({ index, error: result.error.message });
+      }
+    });
+
+    const ordered = valid.sort(
+      (a, b) =>
+        new Date(a.timestamp).getTime() - new Date(b.timestamp).getTime(),
+    );
+
+    console.log(
+      `📦 Bulk data received: ${snapshots.length} snapshot(s), ${rejected.length} rejected`,
+    );
+
+    // Queued together so they are written in one transaction (in order)
+    await Promise.all(ordered.map((snapshot) => storeDeviceData(snapshot)));
+
+    const latestByDevice = new Map<string, DeviceDataRequest>();
+    for (const snapshot of ordered) {
+      latestByDevice.set(snapshot.deviceId, snapshot);
+    }
+
+    console.log("  ✅ Data saved to database");
+
+    // Older snapshots describe conditions that have already passed
+    for (const latest of latestByDevice.values()) {
+      if (!latest.edgeAlerts) {
+        await monitorAndCreateAlerts(latest.deviceId, latest.data);
+      }
+    }
+
+    return NextResponse.json(
+      {
+        success: true,
+        receivedAt: new Date().toISOString(),
+        stored: ordered.length,
+        rejected,
+        message: `${ordered.length} snapshot(s) stored successfully`,
+      },
+      { headers: TELEMETRY_RESPONSE_HEADERS },
+    );
+  } catch (error) {
+    if (error instanceof IngestOverloadedError) {
+      // Clients keep the snapshot and retry after a backoff
+      return NextResponse.json(
+        { error: "Server busy", details: error.message },
+        {
+          status: 503,
+          headers: { ...TELEMETRY_RESPONSE_HEADERS, "Retry-After": "5" },
+        },
+      );
+    }
+
+    if (error instanceof MsgpackError) {
+      return NextResponse.json(
+        { error: "Invalid MessagePack body", details: error.message },
+        { status: 400, headers: TELEMETRY_RESPONSE_HEADERS },
+      );
+    }
+
+    // Only the envelope is invalid here; single snapshots are reported above
+    if (error instanceof ZodError || error instanceof SyntaxError) {
+      return NextResponse.json(
+        { error: "Validation error", details: error.message },
+        { status: 400, headers: TELEMETRY_RESPONSE_HEADERS },
+      );
+    }
+
+    console.error("❌ Error processing bulk device data:", error);
+
+    if (error instanceof Error) {
+      return NextResponse.json(
+        {
+          error: "Failed to process data",
+          details: error.message,
+        },
+        { status: 500 },
+      );
+    }
+
+    return NextResponse.json(
+      { error: "Failed to process data" },
+      { status: 500 },
+    );
+  }
+}
@@ -0,0 +1,23 @@
+import { NextResponse } from "next/server";
+import { auth } from "@/lib/auth";
+import { getIngestStats } from "@/server/ingest/ingest-buffer";
+
+/**
+ * Ingest pipeline metrics for this server process
+ * Queue depth, flush lag percentiles and batched write counters
+ */
+export const GET = async (req: Request) => {
+  try {
+    const session = await auth.api.getSession({ headers: req.headers });
+    if (!session?.user?.id) {
+      return NextResponse.json({ error: "Unauthorized" }, { status: 401 });
+    }
+    return NextResponse.json({ success: true, ingest: getIngestStats() });
+  } catch (error) {
+    console.error("Error retrieving ingest stats:", error);
+    return NextResponse.json(
+      { error: "Failed to retrieve ingest stats" },
+      { status: 500 },
+    );
+  }
+};
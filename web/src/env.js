@@ -13,6 +13,11 @@ export const env = createEnv({
       .default("development"),
     BETTER_AUTH_SECRET: z.string().min(32),
     BETTER_AUTH_URL: z.string().url(),
+    // Telemetry retention (days): raw rows, their full snapshots, rollups
+    DEVICE_DATA_RETENTION_DAYS: z.coerce.number().positive().default(30),
+    DEVICE_SNAPSHOT_RETENTION_DAYS: z.coerce.number().positive().default(7),
+    ROLLUP_1M_RETENTION_DAYS: z.coerce.number().positive().default(90),
+    ROLLUP_1H_RETENTION_DAYS: z.coerce.number().positive().default(730),
     },
 
   /**
@@ -34,6 +39,10 @@ export const env = createEnv({
     NODE_ENV: process.env.NODE_ENV,
     BETTER_AUTH_SECRET: process.env.BETTER_AUTH_SECRET,
     BETTER_AUTH_URL: process.env.BETTER_AUTH_URL,
+    DEVICE_DATA_RETENTION_DAYS: process.env.DEVICE_DATA_RETENTION_DAYS,
+    DEVICE_SNAPSHOT_RETENTION_DAYS: process.env.DEVICE_SNAPSHOT_RETENTION_DAYS,
+    ROLLUP_1M_RETENTION_DAYS: process.env.ROLLUP_1M_RETENTION_DAYS,
+    ROLLUP_1H_RETENTION_DAYS: process.env.ROLLUP_1H_RETENTION_DAYS,
     NEXT_PUBLIC_BETTER_AUTH_URL: process.env.NEXT_PUBLIC_BETTER_AUTH_URL,
     // NEXT_PUBLIC_CLIENTVAR: process.env.NEXT_PUBLIC_CLIENTVAR,
   },
@@ -0,0 +1,178 @@
+/**
+ * Minimal MessagePack decoder for telemetry uploads
+ * Supports everything the desktop client's msgpack.packb() emits
+ * (nil, bool, int, float, str, bin, array, map); extension types are rejected
+ */
+export class MsgpackError extends Error {
+  constructor(message: string) {
+    super(message);
+    this.name = "MsgpackError";
+  }
+}
+
+// Nested arrays/maps deeper than this are rejected
+const MAX_DEPTH = 64;
+
+class Reader {
+  private offset = 0;
+  private readonly view: DataView;
+  private readonly decoder = new TextDecoder();
+
+  constructor(private readonly bytes: Uint8Array) {
+    this.view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+  }
+
+  get done(): boolean {
+    return this.offset >= this.bytes.byteLength;
+  }
+
+  private take(length: number): number {
+    const start = this.offset;
+    if (start + length > this.bytes.byteLength) {
+      throw new MsgpackError("Unexpected end of MessagePack data");
+    }
+    this.offset += length;
+    return start;
+  }
+
+  private uint(size: 1 | 2 | 4 | 8): number {
+    const at = this.take(size);
+    switch (size) {
+      case 1:
+        return this.view.getUint8(at);
+      case 2:
+        return this.view.getUint16(at);
+      case 4:
+        return this.view.getUint32(at);
+      case 8:
+        return Number(this.view.getBigUint64(at));
+    }
+  }
+
+  private int(size: 1 | 2 | 4 | 8): number {
+    const at = this.take(size);
+    switch (size) {
+      case 1:
+        return this.view.getInt8(at);
+      case 2:
+        return this.view.getInt16(at);
+      case 4:
+        return this.view.getInt32(at);
+      case 8:
+        return Number(this.view.getBigInt64(at));
+    }
+  }
+
+  private str(length: number): string {
+    const at = this.take(length);
+    return this.decoder.decode(this.bytes.subarray(at, at + length));
+  }
+
+  private bin(length: number): Uint8Array {
+    const at = this.take(length);
+    return this.bytes.slice(at, at + length);
+  }
+
+  private array(length: number, depth: number): unknown[] {
+    const result: unknown[] = [];
+    for (let i = 0; i < length; i++) {
+      result.push(this.value(depth + 1));
+    }
+    return result;
+  }
+
+  private map(length: number, depth: number): Record<string, unknown> {
+    const result: Record<string, unknown> = {};
+    for (let i = 0; i < length; i++) {
+      const key = this.value(depth + 1);
+      if (typeof key !== "string" && typeof key !== "number") {
+        throw new MsgpackError("Unsupported MessagePack map key");
+      }
+      Object.defineProperty(result, String(key), {
+        value: this.value(depth + 1),
+        enumerable: true,
+        writable: true,
+        configurable: true,
+      });
+    }
+    return result;
+  }
+
+  value(depth = 0): unknown {
+    if (depth > MAX_DEPTH) {
+      throw new MsgpackError("MessagePack data nested too deeply");
+    }
+    const type = this.uint(1);
+
+    if (type <= 0x7f) return type; // positive fixint
+    if (type >= 0xe0) return type - 0x100; // negative fixint
+    if (type >= 0x80 && type <= 0x8f) return this.map(type & 0x0f, depth);
+    if (type >= 0x90 && type <= 0x9f) return this.array(type & 0x0f, depth);
+    if (type >= 0xa0 && type <= 0xbf) return this.str(type & 0x1f);
+
+    switch (type) {
+      case 0xc0:
+        return null;
+      case 0xc2:
+        return false;
+      case 0xc3:
+        return true;
+      case 0xc4:
+        return this.bin(this.uint(1));
+      case 0xc5:
+        return this.bin(this.uint(2));
+      case 0xc6:
+        return this.bin(this.uint(4));
+      case 0xca:
+        return this.view.getFloat32(this.take(4));
+      case 0xcb:
+        return this.view.getFloat64(this.take(8));
+      case 0xcc:
+        return this.uint(1);
+      case 0xcd:
+        return this.uint(2);
+      case 0xce:
+        return this.uint(4);
+      case 0xcf:
+        return this.uint(8);
+      case 0xd0:
+        return this.int(1);
+      case 0xd1:
+        return this.int(2);
+      case 0xd2:
+        return this.int(4);
+      case 0xd3:
+        return this.int(8);
+      case 0xd9:
+        return this.str(this.uint(1));
+      case 0xda:
+        return this.str(this.uint(2));
+      case 0xdb:
+        return this.str(this.uint(4));
+      case 0xdc:
+        return this.array(this.uint(2), depth);
+      case 0xdd:
+        return this.array(this.uint(4), depth);
+      case 0xde:
+        return this.map(this.uint(2), depth);
+      case 0xdf:
+        return this.map(this.uint(4), depth);
+      default:
+        throw new MsgpackError(
+          `Unsupported MessagePack type 0x${type.toString(16)}`,
+        );
+    }
+  }
+}
+
+/**
+ * Decode a single MessagePack value
+ */
+export function decodeMsgpack(bytes: Uint8Array): unknown {
+  const reader = new Reader(bytes);
+  const value = reader.value();
+  if (!reader.done) {
+    throw new MsgpackError("Trailing bytes after MessagePack value");
+  }
+  return value;
+}
@@ -0,0 +1,25 @@
+import { z } from "zod";
+
+const EndpointStatsSchema = z.object({
+  requests: z.number(),
+  errors: z.number(),
+  last_ms: z.number(),
+  avg_ms: z.number(),
+});
+
+/**
+ * The client's own footprint: process usage, collection time and HTTP cost
+ */
+export const AgentStatsSchema = z.object({
+  uptime_seconds: z.number(),
+  cpu_percent: z.number().nullable(),
+  cpu_seconds: z.number(),
+  rss_mb: z.number(),
+  threads: z.number(),
+  collect_ms: z.number().nullable(),
+  collector_ms: z.record(z.number()),
+  http: z.record(EndpointStatsSchema),
+  bytes_sent: z.number(),
+  bytes_received: z.number(),
+  retries: z.number(),
+});
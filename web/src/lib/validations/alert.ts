@@ -0,0 +1,65 @@
+import { z } from "zod";
+
+const SeveritySchema = z.enum(["info", "warning", "critical"]);
+
+/**
+ * Declarative alert rule evaluated by the desktop agent on every local sample
+ * (pushed to the device with a set_alert_rules command)
+ */
+export const AlertRuleSchema = z
+  .object({
+    name: z.string().min(1),
+    alert_type: z.string().min(1).optional(),
+    type: z.enum(["threshold", "rate", "sustained"]).default("threshold"),
+    metric: z.string().min(1),
+    op: z.enum([">", ">=", "<", "<="]),
+    threshold: z.number(),
+    // Seconds the condition must hold before the alert fires
+    duration: z.number().nonnegative().default(0),
+    // Seconds a rate of change is measured over
+    window: z.number().positive().default(60),
+    // Value the metric must get back past before the alert resolves
+    clear: z.number().nullish(),
+    on_battery: z.boolean().default(false),
+    severity: SeveritySchema.default("warning"),
+  })
+  .strict()
+  .refine((rule) => rule.type !== "sustained" || rule.duration > 0, {
+    message: "Sustained rules need a duration",
+    path: ["duration"],
+  });
+
+export const AlertRulesPayloadSchema = z.object({
+  rules: z
+    .array(AlertRuleSchema)
+    .max(100, "Too many alert rules")
+    .refine(
+      (rules) => new Set(rules.map((rule) => rule.name)).size === rules.length,
+      { message: "Rule names must be unique" },
+    ),
+});
+
+/**
+ * An alert raised or resolved on the device
+ */
+export const AlertEventSchema = z.object({
+  rule: z.string(),
+  type: z.string().min(1),
+  severity: SeveritySchema,
+  state: z.enum(["firing", "resolved"]),
+  metric: z.string(),
+  value: z.number().nullable(),
+  threshold: z.number(),
+  message: z.string(),
+  timestamp: z.string(),
+});
+
+export const AlertEventsRequestSchema = z.object({
+  events: z
+    .array(AlertEventSchema)
+    .min(1, "At least one event is required")
+    .max(100, "Too many events in one request"),
+});
+
+export type AlertRule = z.infer<typeof AlertRuleSchema>;
+export type AlertEvent = z.infer<typeof AlertEventSchema>;
@@ -1,9 +1,19 @@
 import { z } from "zod";
+import { AlertRulesPayloadSchema } from "./alert";
 
 export const DeviceCommandSchema = z.object({
   id: z.string(),
-  type: z.enum(["shutdown", "restart", "stop", "update_interval"]),
-  value: z.number().optional(),
+  type: z.enum([
+    "shutdown",
+    "restart",
+    "stop",
+    "update_interval",
+    "set_alert_rules",
+  ]),
+  // update_interval: seconds between reports
+  value: z.number().positive().optional(),
+  // set_alert_rules: { rules: [...] }
+  payload: AlertRulesPayloadSchema.optional(),
   created_at: z.string().optional(),
 });
 
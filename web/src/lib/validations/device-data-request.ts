@@ -5,5 +5,23 @@ export const DeviceDataRequestSchema = z.object({
   deviceId: z.string().min(1, "Device ID is required"),
   timestamp: z.string(),
   hostname: z.string(),
+  // Generated once per report, so a re-sent report is stored only once
+  reportId: z.string().min(1).max(64).optional(),
   data: LaptopDataSchema,
+  // Alert rules run on the device, which reports alerts on its own
+  edgeAlerts: z.boolean().optional(),
+});
+
+export type DeviceDataRequest = z.infer<typeof DeviceDataRequestSchema>;
+
+/**
+ * Snapshots queued by a client while it was offline, uploaded in one request
+ * (each snapshot is validated on its own, so one bad snapshot doesn't sink
+ * the batch)
+ */
+export const DeviceDataBulkRequestSchema = z.object({
+  snapshots: z
+    .array(z.unknown())
+    .min(1, "At least one snapshot is required")
+    .max(500, "Too many snapshots in one request"),
 });
@@ -9,3 +9,11 @@ export const DiskInfoSchema = z.object({
   free_gb: z.number(),
   percent: z.number(),
 });
+
+// Rates are null on the client's first sample
+export const DiskIOSchema = z.object({
+  read_bytes_per_sec: z.number().nullable(),
+  write_bytes_per_sec: z.number().nullable(),
+  read_iops: z.number().nullable(),
+  write_iops: z.number().nullable(),
+});
@@ -0,0 +1,21 @@
+import { z } from "zod";
+
+const MetricSummarySchema = z.object({
+  min: z.number(),
+  max: z.number(),
+  mean: z.number(),
+  p95: z.number(),
+});
+
+/**
+ * Summary of high-frequency samples taken by the client between reports
+ * (a metric is null until it has been measured, e.g. network rates right
+ * after startup)
+ */
+export const IntervalStatsSchema = z.object({
+  samples: z.number(),
+  cpu_percent: MetricSummarySchema,
+  memory_percent: MetricSummarySchema,
+  net_sent_bps: MetricSummarySchema.nullable(),
+  net_recv_bps: MetricSummarySchema.nullable(),
+});
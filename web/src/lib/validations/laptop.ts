@@ -2,11 +2,14 @@ import { z } from "zod";
 import { SystemInfoSchema } from "./system";
 import { CPUInfoSchema } from "./cpu";
 import { MemoryInfoSchema } from "./memory";
-import { DiskInfoSchema } from "./disk";
+import { DiskInfoSchema, DiskIOSchema } from "./disk";
 import { BatteryInfoSchema } from "./battery";
 import { PowerInfoSchema } from "./power";
 import { NetworkInfoSchema } from "./network";
 import { TemperatureInfoSchema } from "./temperature";
+import { IntervalStatsSchema } from "./interval-stats";
+import { TopProcessesSchema } from "./process";
+import { AgentStatsSchema } from "./agent-stats";
 
 export const LaptopDataSchema = z.object({
   timestamp: z.string(),
@@ -14,10 +17,14 @@ export const LaptopDataSchema = z.object({
   cpu_info: CPUInfoSchema,
   memory_info: MemoryInfoSchema,
   disk_info: z.array(DiskInfoSchema),
+  disk_io: z.record(DiskIOSchema).nullish(),
   battery_info: BatteryInfoSchema.nullable(),
   power_info: PowerInfoSchema.nullable(),
   network_info: NetworkInfoSchema,
   temperature_info: TemperatureInfoSchema.nullable(),
+  interval_stats: IntervalStatsSchema.nullish(),
+  top_processes: TopProcessesSchema.nullish(),
+  agent_stats: AgentStatsSchema.nullish(),
 });
 
 export type LaptopData = z.infer<typeof LaptopDataSchema>;
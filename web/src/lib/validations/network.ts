@@ -1,8 +1,20 @@
 import { z } from "zod";
 
-export const NetworkInfoSchema = z.object({
+// Per-second rates are null on the client's first sample
+const NetworkRatesSchema = z.object({
+  bytes_sent_per_sec: z.number().nullish(),
+  bytes_received_per_sec: z.number().nullish(),
+  packets_sent_per_sec: z.number().nullish(),
+  packets_received_per_sec: z.number().nullish(),
+});
+
+export const NetworkInterfaceInfoSchema = NetworkRatesSchema.extend({
   bytes_sent: z.number(),
   bytes_received: z.number(),
   packets_sent: z.number(),
   packets_received: z.number(),
 });
+
+export const NetworkInfoSchema = NetworkInterfaceInfoSchema.extend({
+  per_nic: z.record(NetworkInterfaceInfoSchema).optional(),
+});
@@ -0,0 +1,16 @@
+import { z } from "zod";
+
+export const ProcessEntrySchema = z.object({
+  pid: z.number(),
+  name: z.string(),
+  cpu_percent: z.number(),
+  rss_mb: z.number(),
+  io_bytes_per_sec: z.number().nullable(),
+});
+
+export const TopProcessesSchema = z.object({
+  process_count: z.number(),
+  by_cpu: z.array(ProcessEntrySchema),
+  by_memory: z.array(ProcessEntrySchema),
+  by_io: z.array(ProcessEntrySchema),
+});
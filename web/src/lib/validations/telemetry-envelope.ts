@@ -0,0 +1,38 @@
+import { z } from "zod";
+
+/**
+ * Compact wire format sent by clients in --compact mode
+ * A keyframe carries the full data, a delta only the fields that changed
+ * since the snapshot with sequence number baseSeq
+ */
+export const TelemetryDeltaSchema = z.object({
+  changed: z.record(z.unknown()),
+  removed: z.array(z.array(z.string())),
+});
+
+export const TelemetryEnvelopeSchema = z.discriminatedUnion("encoding", [
+  z.object({
+    encoding: z.literal("keyframe"),
+    deviceId: z.string().min(1, "Device ID is required"),
+    timestamp: z.string(),
+    hostname: z.string(),
+    seq: z.number().int(),
+    reportId: z.string().min(1).max(64).optional(),
+    edgeAlerts: z.boolean().optional(),
+    data: z.record(z.unknown()),
+  }),
+  z.object({
+    encoding: z.literal("delta"),
+    deviceId: z.string().min(1, "Device ID is required"),
+    timestamp: z.string(),
+    hostname: z.string(),
+    seq: z.number().int(),
+    reportId: z.string().min(1).max(64).optional(),
+    baseSeq: z.number().int(),
+    edgeAlerts: z.boolean().optional(),
+    delta: TelemetryDeltaSchema,
+  }),
+]);
+
+export type TelemetryEnvelope = z.infer<typeof TelemetryEnvelopeSchema>;
+export type TelemetryDelta = z.infer<typeof TelemetryDeltaSchema>;
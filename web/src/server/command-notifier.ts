@@ -0,0 +1,51 @@
+import { EventEmitter } from "node:events";
+
+/**
+ * In-process notifications for new device commands
+ * Lets long-polling clients wake up as soon as a command is created
+ * (notifications only reach requests handled by the same server process)
+ */
+const globalForCommands = globalThis as unknown as {
+  commandEvents: EventEmitter | undefined;
+};
+
+const commandEvents = (globalForCommands.commandEvents ??=
+  new EventEmitter().setMaxListeners(0));
+
+/**
+ * Wake up any request waiting for commands for this device
+ */
+export function notifyDeviceCommand(deviceId: string) {
+  commandEvents.emit(deviceId);
+}
+
+/**
+ * Wait until a command is created for the device, the timeout expires,
+ * or the request is aborted
+ * Resolves to true if a command notification arrived
+ */
+export function waitForDeviceCommand(
+  deviceId: string,
+  timeoutMs: number,
+  signal?: AbortSignal,
+): Promise<boolean> {
+  return new Promise((resolve) => {
+    if (signal?.aborted) {
+      resolve(false);
+      return;
+    }
+
+    const finish = (notified: boolean) => {
+      clearTimeout(timer);
+      commandEvents.off(deviceId, onCommand);
+      signal?.removeEventListener("abort", onAbort);
+      resolve(notified);
+    };
+    const onCommand = () => finish(true);
+    const onAbort = () => finish(false);
+
+    const timer = setTimeout(() => finish(false), timeoutMs);
+    commandEvents.on(deviceId, onCommand);
+    signal?.addEventListener("abort", onAbort);
+  });
+}
@@ -0,0 +1,464 @@
+import { db } from "..";
+import {
+  deviceData,
+  deviceDataRollup1m,
+  deviceDataRollup1h,
+} from "../schemas/device";
+import {
+  and,
+  eq,
+  gte,
+  lt,
+  lte,
+  inArray,
+  isNotNull,
+  sql,
+  type SQL,
+} from "drizzle-orm";
+import { type BatchItem } from "drizzle-orm/batch";
+import { type SQLiteColumn, type SQLiteTable } from "drizzle-orm/sqlite-core";
+import { env } from "@/env";
+import { type DeviceDataInput } from "./device";
+
+// Both tiers are built from rollupColumns(), so they share this shape
+type RollupTable = typeof deviceDataRollup1m;
+
+export type MetricTier = "raw" | "1m" | "1h";
+
+const DAY_SECONDS = 24 * 60 * 60;
+
+/**
+ * Storage tiers from finest to coarsest
+ * (raw rows are assumed to arrive about every 10 seconds)
+ */
+const TIERS: Array<{
+  name: MetricTier;
+  seconds: number;
+  retentionDays: number;
+  table: RollupTable | null;
+}> = [
+  {
+    name: "raw",
+    seconds: 10,
+    retentionDays: env.DEVICE_DATA_RETENTION_DAYS,
+    table: null,
+  },
+  {
+    name: "1m",
+    seconds: 60,
+    retentionDays: env.ROLLUP_1M_RETENTION_DAYS,
+    table: deviceDataRollup1m,
+  },
+  {
+    name: "1h",
+    seconds: 3600,
+    retentionDays: env.ROLLUP_1H_RETENTION_DAYS,
+    table: deviceDataRollup1h as unknown as RollupTable,
+  },
+];
+
+// Incoming rows per rollup upsert (7 bound parameters each)
+const ROLLUP_CHUNK_ROWS = 100;
+// Rows deleted or compacted per statement, so retention never holds the
+// writer lock long enough to stall ingest
+const RETENTION_CHUNK_ROWS = 2000;
+
+// SQLite's two-argument min()/max() return NULL if either side is NULL
+function mergeMin(column: SQLiteColumn) {
+  const incoming = sql.raw(`excluded.${column.name}`);
+  return sql`coalesce(min(${column}, ${incoming}), ${column}, ${incoming})`;
+}
+
+function mergeMax(column: SQLiteColumn) {
+  const incoming = sql.raw(`excluded.${column.name}`);
+  return sql`coalesce(max(${column}, ${incoming}), ${column}, ${incoming})`;
+}
+
+function mergeSum(column: SQLiteColumn) {
+  return sql`${column} + ${sql.raw(`excluded.${column.name}`)}`;
+}
+
+/**
+ * Each rollup column with its aggregate over the `incoming` rows and how it
+ * merges into an existing bucket
+ */
+function rollupAggregates(
+  table: RollupTable,
+): Array<[SQLiteColumn, SQL, (column: SQLiteColumn) => SQL]> {
+  return [
+    [table.samples, sql`count(*)`, mergeSum],
+    [table.cpuMin, sql`min(cpu)`, mergeMin],
+    [table.cpuMax, sql`max(cpu)`, mergeMax],
+    [table.cpuSum, sql`sum(cpu)`, mergeSum],
+    [table.memoryMin, sql`min(memory)`, mergeMin],
+    [table.memoryMax, sql`max(memory)`, mergeMax],
+    [table.memorySum, sql`sum(memory)`, mergeSum],
+    [table.batterySamples, sql`count(battery)`, mergeSum],
+    [table.batteryMin, sql`min(battery)`, mergeMin],
+    [table.batteryMax, sql`max(battery)`, mergeMax],
+    [table.batterySum, sql`coalesce(sum(battery), 0)`, mergeSum],
+    [table.networkSamples, sql`count(send_rate)`, mergeSum],
+    [table.networkSendMin, sql`min(send_rate)`, mergeMin],
+    [table.networkSendMax, sql`max(send_rate)`, mergeMax],
+    [table.networkSendSum, sql`coalesce(sum(send_rate), 0)`, mergeSum],
+    [table.networkReceiveMin, sql`min(receive_rate)`, mergeMin],
+    [table.networkReceiveMax, sql`max(receive_rate)`, mergeMax],
+    [table.networkReceiveSum, sql`coalesce(sum(receive_rate), 0)`, mergeSum],
+  ];
+}
+
+/**
+ * Upsert of the per-device buckets of `seconds` aggregated from `rows`,
+ * leaving out reports already stored in device_data
+ */
+function rollupUpsert(
+  table: RollupTable,
+  seconds: number,
+  rows: DeviceDataInput[],
+) {
+  const incoming = sql.join(
+    rows.map((row) => {
+      // Network rates only count when a report had both
+      const network =
+        row.networkSendRate != null && row.networkReceiveRate != null;
+      const values = [
+        sql`${row.deviceId}`,
+        sql`${row.reportId}`,
+        // Whole seconds like device_data.timestamp, inlined as an integer so
+        // the bucket division below is integer division
+        sql.raw(String(Math.floor(row.timestamp.getTime() / 1000))),
+        sql`${row.cpuUsage}`,
+        sql`${row.memoryPercent}`,
+        sql`${row.batteryPercent ?? null}`,
+        sql`${network ? row.networkSendRate : null}`,
+        sql`${network ? row.networkReceiveRate : null}`,
+      ];
+      return sql`(${sql.join(values, sql`, `)})`;
+    }),
+    sql`, `,
+  );
+  const aggregates = rollupAggregates(table);
+  const list = (items: SQL[]) => sql.join(items, sql`, `);
+  const target = list([
+    sql.identifier(table.deviceId.name),
+    sql.identifier(table.bucket.name),
+  ]);
+  const columns = list(
+    aggregates.map(([column]) => sql.identifier(column.name)),
+  );
+  const values = list(aggregates.map(([, aggregate]) => aggregate));
+  const merges = list(
+    aggregates.map(
+      ([column, , merge]) =>
+        sql`${sql.identifier(column.name)} = ${merge(column)}`,
+    ),
+  );
+  const bucketSeconds = sql.raw(String(seconds));
+
+  return db.run(sql`
+    with incoming (
+      device_id, report_id, ts, cpu, memory, battery, send_rate, receive_rate
+    ) as (values ${incoming})
+    insert into ${table} (${target}, ${columns})
+    select device_id, (ts / ${bucketSeconds}) * ${bucketSeconds}, ${values}
+    from incoming
+    where not exists (
+      select 1 from ${deviceData}
+      where ${deviceData.deviceId} = incoming.device_id
+        and ${deviceData.reportId} = incoming.report_id
+    )
+    group by device_id, ts / ${bucketSeconds}
+    on conflict (${target}) do update set ${merges}
+  `);
+}
+
+/**
+ * Statements that fold telemetry rows into every rollup tier
+ * (run in the same transaction as the raw inserts and before them: rows
+ * already in device_data, e.g. from a retried upload, are skipped, so
+ * rollups never lag behind or double count)
+ */
+export function rollupStatements(rows: DeviceDataInput[]) {
+  const statements: BatchItem<"sqlite">[] = [];
+  for (const tier of TIERS) {
+    const table = tier.table;
+    if (!table) continue;
+
+    for (let i = 0; i < rows.length; i += ROLLUP_CHUNK_ROWS) {
+      statements.push(
+        rollupUpsert(table, tier.seconds, rows.slice(i, i + ROLLUP_CHUNK_ROWS)),
+      );
+    }
+  }
+  return statements;
+}
+
+/**
+ * Pick the storage tier for a time range: the finest one that still holds
+ * data for the start of the range and returns at most `maxPoints` points
+ * per device (falls back to the coarsest tier)
+ */
+export function chooseMetricTier(
+  startTime: Date,
+  endTime: Date,
+  maxPoints = 500,
+  now = new Date(),
+): MetricTier {
+  const rangeSeconds = (endTime.getTime() - startTime.getTime()) / 1000;
+  const ageSeconds = (now.getTime() - startTime.getTime()) / 1000;
+  for (const tier of TIERS) {
+    if (
+      ageSeconds <= tier.retentionDays * DAY_SECONDS &&
+      rangeSeconds / tier.seconds <= maxPoints
+    ) {
+      return tier.name;
+    }
+  }
+  return TIERS[TIERS.length - 1]!.name;
+}
+
+type MinMaxAvg = {
+  min: number | null;
+  max: number | null;
+  avg: number | null;
+};
+
+export type MetricPoint = {
+  timestamp: Date;
+  samples: number;
+  cpu: MinMaxAvg;
+  memory: MinMaxAvg;
+  battery: MinMaxAvg;
+  networkSendRate: MinMaxAvg;
+  networkReceiveRate: MinMaxAvg;
+};
+
+function single(value: number | null): MinMaxAvg {
+  return { min: value, max: value, avg: value };
+}
+
+function average(sum: number, count: number) {
+  return count > 0 ? Math.round((sum / count) * 10) / 10 : null;
+}
+
+/**
+ * CPU, memory, battery and network series for a device over a time range,
+ * read from the tier chosen by chooseMetricTier
+ */
+export async function getDeviceMetricSeries(
+  deviceId: string,
+  startTime: Date,
+  endTime: Date,
+  maxPoints = 500,
+): Promise<{ tier: MetricTier; points: MetricPoint[] }> {
+  const tier = chooseMetricTier(startTime, endTime, maxPoints);
+  const table = TIERS.find((candidate) => candidate.name === tier)!.table;
+
+  if (!table) {
+    // Raw rows - only the scalar columns, never the JSON blobs
+    const rows = await db
+      .select({
+        timestamp: deviceData.timestamp,
+        cpuUsage: deviceData.cpuUsage,
+        memoryPercent: deviceData.memoryPercent,
+        batteryPercent: deviceData.batteryPercent,
+        networkSendRate: deviceData.networkSendRate,
+        networkReceiveRate: deviceData.networkReceiveRate,
+      })
+      .from(deviceData)
+      .where(
+        and(
+          eq(deviceData.deviceId, deviceId),
+          gte(deviceData.timestamp, startTime),
+          lte(deviceData.timestamp, endTime),
+        ),
+      )
+      .orderBy(deviceData.timestamp);
+
+    return {
+      tier,
+      points: rows.map((row) => ({
+        timestamp: row.timestamp,
+        samples: 1,
+        cpu: single(row.cpuUsage),
+        memory: single(row.memoryPercent),
+        battery: single(row.batteryPercent),
+        networkSendRate: single(row.networkSendRate),
+        networkReceiveRate: single(row.networkReceiveRate),
+      })),
+    };
+  }
+
+  const rows = await db
+    .select()
+    .from(table)
+    .where(
+      and(
+        eq(table.deviceId, deviceId),
+        gte(table.bucket, startTime),
+        lte(table.bucket, endTime),
+      ),
+    )
+    .orderBy(table.bucket);
+
+  return {
+    tier,
+    points: rows.map((row) => ({
+      timestamp: row.bucket,
+      samples: row.samples,
+      cpu: {
+        min: row.cpuMin,
+        max: row.cpuMax,
+        avg: average(row.cpuSum, row.samples),
+      },
+      memory: {
+        min: row.memoryMin,
+        max: row.memoryMax,
+        avg: average(row.memorySum, row.samples),
+      },
+      battery: {
+        min: row.batteryMin,
+        max: row.batteryMax,
+        avg: average(row.batterySum, row.batterySamples),
+      },
+      networkSendRate: {
+        min: row.networkSendMin,
+        max: row.networkSendMax,
+        avg: average(row.networkSendSum, row.networkSamples),
+      },
+      networkReceiveRate: {
+        min: row.networkReceiveMin,
+        max: row.networkReceiveMax,
+        avg: average(row.networkReceiveSum, row.networkSamples),
+      },
+    })),
+  };
+}
+
+/**
+ * Aggregate statistics for a device since `startTime`, from the finest
+ * rollup tier still covering it (whole buckets, so the window may start
+ * up to one bucket earlier)
+ */
+export async function getDeviceRollupStats(deviceId: string, startTime: Date) {
+  const ageSeconds = (Date.now() - startTime.getTime()) / 1000;
+  const tier =
+    TIERS.find(
+      (candidate) =>
+        candidate.table && ageSeconds <= candidate.retentionDays * DAY_SECONDS,
+    ) ?? TIERS[TIERS.length - 1]!;
+  const table = tier.table!;
+  const bucketMs = tier.seconds * 1000;
+
+  const stats = await db
+    .select({
+      avgCpuUsage: sql<number>`SUM(${table.cpuSum}) * 1.0 / NULLIF(SUM(${table.samples}), 0)`,
+      maxCpuUsage: sql<number>`MAX(${table.cpuMax})`,
+      avgMemoryPercent: sql<number>`SUM(${table.memorySum}) * 1.0 / NULLIF(SUM(${table.samples}), 0)`,
+      maxMemoryPercent: sql<number>`MAX(${table.memoryMax})`,
+      avgBatteryPercent: sql<number>`SUM(${table.batterySum}) * 1.0 / NULLIF(SUM(${table.batterySamples}), 0)`,
+      minBatteryPercent: sql<number>`MIN(${table.batteryMin})`,
+      dataPoints: sql<number>`COALESCE(SUM(${table.samples}), 0)`,
+    })
+    .from(table)
+    .where(
+      and(
+        eq(table.deviceId, deviceId),
+        gte(
+          table.bucket,
+          new Date(Math.floor(startTime.getTime() / bucketMs) * bucketMs),
+        ),
+      ),
+    );
+
+  return stats[0];
+}
+
+/**
+ * Apply `apply` to chunks of row IDs from `selectIds` until none are left
+ * Returns the number of rows affected
+ */
+async function inChunks(
+  selectIds: () => Promise<Array<{ id: number }>>,
+  apply: (ids: number[]) => Promise<unknown>,
+) {
+  let total = 0;
+  for (;;) {
+    const ids = (await selectIds()).map((row) => row.id);
+    if (ids.length === 0) {
+      return total;
+    }
+    await apply(ids);
+    total += ids.length;
+  }
+}
+
+async function deleteOlderThan(
+  table: SQLiteTable,
+  id: SQLiteColumn,
+  column: SQLiteColumn,
+  cutoff: Date,
+) {
+  return inChunks(
+    () =>
+      db
+        .select({ id: sql<number>`${id}` })
+        .from(table)
+        .where(lt(column, cutoff))
+        .limit(RETENTION_CHUNK_ROWS),
+    (ids) => db.delete(table).where(inArray(id, ids)),
+  );
+}
+
+/**
+ * Apply the retention policy:
+ * - compact raw rows older than DEVICE_SNAPSHOT_RETENTION_DAYS (drop the full
+ *   snapshot and process list, keep the metric columns)
+ * - delete raw rows older than DEVICE_DATA_RETENTION_DAYS
+ * - delete rollups older than ROLLUP_1M/1H_RETENTION_DAYS
+ * Freed pages are reused by new rows, so the database file stops growing
+ */
+export async function applyDeviceDataRetention(now = new Date()) {
+  const daysAgo = (days: number) =>
+    new Date(now.getTime() - days * DAY_SECONDS * 1000);
+
+  const compactBefore = daysAgo(env.DEVICE_SNAPSHOT_RETENTION_DAYS);
+  const snapshotCondition = and(
+    lt(deviceData.timestamp, compactBefore),
+    isNotNull(deviceData.fullDataSnapshot),
+  );
+  const compacted = await inChunks(
+    () =>
+      db
+        .select({ id: deviceData.id })
+        .from(deviceData)
+        .where(snapshotCondition)
+        .limit(RETENTION_CHUNK_ROWS),
+    (ids) =>
+      db
+        .update(deviceData)
+        .set({ fullDataSnapshot: null, topProcesses: null })
+        .where(inArray(deviceData.id, ids)),
+  );
+
+  const rawDeleted = await deleteOlderThan(
+    deviceData,
+    deviceData.id,
+    deviceData.timestamp,
+    daysAgo(env.DEVICE_DATA_RETENTION_DAYS),
+  );
+
+  const rollupsDeleted: Record<string, number> = {};
+  for (const tier of TIERS) {
+    if (tier.table) {
+      rollupsDeleted[tier.name] = await deleteOlderThan(
+        tier.table,
+        tier.table.id,
+        tier.table.bucket,
+        daysAgo(tier.retentionDays),
+      );
+    }
+  }
+
+  return { compacted, rawDeleted, rollupsDeleted };
+}
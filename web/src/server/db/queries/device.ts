@@ -5,7 +5,10 @@ import {
   deviceAlerts,
   deviceCommands,
 } from "../schemas/device";
-import { eq, desc, and, gte, lte, sql } from "drizzle-orm";
+import { eq, desc, and, gte, lte, inArray, sql } from "drizzle-orm";
+import { type BatchItem } from "drizzle-orm/batch";
+import { notifyDeviceCommand } from "@/server/command-notifier";
+import { rollupStatements, getDeviceRollupStats } from "./device-rollup";
 
 /**
  * Register or update a device
@@ -54,15 +57,17 @@ export async function upsertDevice(data: {
 }
 
 /**
- * Insert device telemetry data
+ * One telemetry snapshot as stored in device_data
  */
-export async function insertDeviceData(data: {
+export type DeviceDataInput = {
   deviceId: string;
   timestamp: Date;
+  reportId: string;
   cpuUsage: number;
   cpuFreqCurrent?: number;
   cpuCores?: number;
   cpuPerCoreUsage?: number[];
+  topProcesses?: object;
   memoryTotal: number;
   memoryUsed: number;
   memoryAvailable: number;
@@ -81,17 +86,24 @@ export async function insertDeviceData(data: {
   networkBytesReceived?: number;
   networkPacketsSent?: number;
   networkPacketsReceived?: number;
+  networkSendRate?: number;
+  networkReceiveRate?: number;
   temperatureInfo?: object;
+  agentStats?: object;
   fullDataSnapshot: object;
-}) {
-  return await db.insert(deviceData).values({
+};
+
+function deviceDataValues(data: DeviceDataInput) {
+  return {
     deviceId: data.deviceId,
     timestamp: data.timestamp,
     receivedAt: new Date(),
+    reportId: data.reportId,
     cpuUsage: data.cpuUsage,
     cpuFreqCurrent: data.cpuFreqCurrent,
     cpuCores: data.cpuCores,
     cpuPerCoreUsage: data.cpuPerCoreUsage,
+    topProcesses: data.topProcesses,
     memoryTotal: data.memoryTotal,
     memoryUsed: data.memoryUsed,
     memoryAvailable: data.memoryAvailable,
@@ -110,11 +122,132 @@ export async function insertDeviceData(data: {
     networkBytesReceived: data.networkBytesReceived,
     networkPacketsSent: data.networkPacketsSent,
     networkPacketsReceived: data.networkPacketsReceived,
+    networkSendRate: data.networkSendRate,
+    networkReceiveRate: data.networkReceiveRate,
     temperatureInfo: data.temperatureInfo,
+    agentStats: data.agentStats,
     fullDataSnapshot: data.fullDataSnapshot,
+  };
+}
+
+/**
+ * Insert device telemetry data
+ */
+export async function insertDeviceData(data: DeviceDataInput) {
+  return await db
+    .insert(deviceData)
+    .values(deviceDataValues(data))
+    .onConflictDoNothing({
+      target: [deviceData.deviceId, deviceData.reportId],
+    });
+}
+
+// Rows per multi-row INSERT (about 35 bound parameters each)
+const INSERT_CHUNK_ROWS = 100;
+// Device IDs per UPDATE ... WHERE id IN (...)
+const UPDATE_CHUNK_IDS = 500;
+
+function chunk<T>(items: T[], size: number): T[][] {
+  const chunks: T[][] = [];
+  for (let i = 0; i < items.length; i += size) {
+    chunks.push(items.slice(i, i + size));
+  }
+  return chunks;
+}
+
+/**
+ * The first row per device and report ID (device_data keeps one)
+ */
+function uniqueRows(rows: DeviceDataInput[]) {
+  const seen = new Set<string>();
+  return rows.filter((row) => {
+    const key = `${row.deviceId}\u0000${row.reportId}`;
+    if (seen.has(key)) return false;
+    seen.add(key);
+    return true;
   });
 }
 
+/**
+ * Write one ingest batch in a single transaction:
+ * register or update devices whose hostname or system info changed,
+ * bump lastSeen of the others, insert the telemetry rows not stored yet and
+ * fold them into the rollup tables (the caller coalesces devices, so each
+ * appears at most once)
+ * Returns the number of rows skipped because their report was already stored
+ */
+export async function writeIngestBatch(batch: {
+  upserts: Array<{ id: string; hostname: string; systemInfo: object }>;
+  touched: string[];
+  rows: DeviceDataInput[];
+  seenAt: Date;
+}) {
+  const { upserts, touched, rows, seenAt } = batch;
+  const statements: BatchItem<"sqlite">[] = [];
+
+  for (const group of chunk(upserts, INSERT_CHUNK_ROWS)) {
+    statements.push(
+      db
+        .insert(devices)
+        .values(
+          group.map((device) => ({
+            id: device.id,
+            hostname: device.hostname,
+            systemInfo: device.systemInfo,
+            firstSeen: seenAt,
+            lastSeen: seenAt,
+            status: "active",
+          })),
+        )
+        // userId, firstSeen and notes of known devices are left untouched
+        .onConflictDoUpdate({
+          target: devices.id,
+          set: {
+            hostname: sql`excluded.hostname`,
+            systemInfo: sql`excluded.system_info`,
+            lastSeen: sql`excluded.last_seen`,
+            status: "active",
+          },
+        }),
+    );
+  }
+
+  for (const ids of chunk(touched, UPDATE_CHUNK_IDS)) {
+    statements.push(
+      db
+        .update(devices)
+        .set({ lastSeen: seenAt, status: "active" })
+        .where(inArray(devices.id, ids)),
+    );
+  }
+
+  // Rollups go first: they skip rows already in device_data (e.g. from an
+  // upload retried after it was committed), which the inserts then skip too
+  const fresh = uniqueRows(rows);
+  statements.push(...rollupStatements(fresh));
+  const firstInsert = statements.length;
+  for (const group of chunk(fresh, INSERT_CHUNK_ROWS)) {
+    statements.push(
+      db
+        .insert(deviceData)
+        .values(group.map(deviceDataValues))
+        .onConflictDoNothing({
+          target: [deviceData.deviceId, deviceData.reportId],
+        })
+        .returning({ id: deviceData.id }),
+    );
+  }
+
+  const [first, ...rest] = statements;
+  if (!first) return 0;
+  // libsql runs a batch as one transaction (one writer lock, one fsync)
+  const results = await db.batch([first, ...rest]);
+  const inserted = (
+    results.slice(firstInsert) as unknown as Array<Array<{ id: number }>>
+  ).reduce((total, ids) => total + ids.length, 0);
+  return rows.length - inserted;
+}
+
 /**
  * Get device by ID
  */
@@ -179,29 +312,11 @@ export async function getDeviceDataRange(
 
 /**
  * Get device statistics (aggregated data)
+ * Read from the rollup tables, so the cost doesn't grow with report rate
  */
 export async function getDeviceStats(deviceId: string, hours = 24) {
   const startTime = new Date(Date.now() - hours * 60 * 60 * 1000);
-
-  const stats = await db
-    .select({
-      avgCpuUsage: sql<number>`AVG(${deviceData.cpuUsage})`,
-      maxCpuUsage: sql<number>`MAX(${deviceData.cpuUsage})`,
-      avgMemoryPercent: sql<number>`AVG(${deviceData.memoryPercent})`,
-      maxMemoryPercent: sql<number>`MAX(${deviceData.memoryPercent})`,
-      avgBatteryPercent: sql<number>`AVG(${deviceData.batteryPercent})`,
-      minBatteryPercent: sql<number>`MIN(${deviceData.batteryPercent})`,
-      dataPoints: sql<number>`COUNT(*)`,
-    })
-    .from(deviceData)
-    .where(
-      and(
-        eq(deviceData.deviceId, deviceId),
-        gte(deviceData.timestamp, startTime),
-      ),
-    );
-
-  return stats[0];
+  return await getDeviceRollupStats(deviceId, startTime);
 }
 
 /**
@@ -214,6 +329,7 @@ export async function createDeviceAlert(data: {
   message: string;
   value?: number;
   threshold?: number;
+  createdAt?: Date;
 }) {
   return await db.insert(deviceAlerts).values({
     deviceId: data.deviceId,
@@ -222,10 +338,50 @@ export async function createDeviceAlert(data: {
     message: data.message,
     value: data.value,
     threshold: data.threshold,
-    createdAt: new Date(),
+    createdAt: data.createdAt ?? new Date(),
   });
 }
 
+/**
+ * Get the unresolved alerts of a device
+ */
+export async function getOpenDeviceAlerts(deviceId: string) {
+  return await db
+    .select({
+      alertType: deviceAlerts.alertType,
+      severity: deviceAlerts.severity,
+    })
+    .from(deviceAlerts)
+    .where(
+      and(
+        eq(deviceAlerts.deviceId, deviceId),
+        sql`${deviceAlerts.resolvedAt} IS NULL`,
+      ),
+    );
+}
+
+/**
+ * Resolve unresolved alerts of a type and severity
+ */
+export async function resolveDeviceAlerts(data: {
+  deviceId: string;
+  alertType: string;
+  severity: string;
+  resolvedAt?: Date;
+}) {
+  return await db
+    .update(deviceAlerts)
+    .set({ resolvedAt: data.resolvedAt ?? new Date() })
+    .where(
+      and(
+        eq(deviceAlerts.deviceId, data.deviceId),
+        eq(deviceAlerts.alertType, data.alertType),
+        eq(deviceAlerts.severity, data.severity),
+        sql`${deviceAlerts.resolvedAt} IS NULL`,
+      ),
+    );
+}
+
 /**
  * Get active alerts for a device
  */
@@ -255,7 +411,7 @@ export async function createDeviceCommand(data: {
   commandType: string;
   payload?: object;
 }) {
-  return await db
+  const command = await db
     .insert(deviceCommands)
     .values({
       deviceId: data.deviceId,
@@ -265,6 +421,10 @@ export async function createDeviceCommand(data: {
       createdAt: new Date(),
     })
     .returning();
+
+  // Wake up the device if it is long-polling for commands
+  notifyDeviceCommand(data.deviceId);
+  return command;
 }
 
 /**
@@ -283,6 +443,30 @@ export async function getPendingCommands(deviceId: string) {
     .orderBy(deviceCommands.createdAt);
 }
 
+/**
+ * Hand a device its pending commands, marking them acknowledged in the same
+ * statement so a command is delivered once, even while it is still running
+ * (power commands are only reported as executed after their grace period)
+ */
+export async function claimPendingCommands(deviceId: string) {
+  const commands = await db
+    .update(deviceCommands)
+    .set({
+      status: "acknowledged",
+      acknowledgedAt: new Date(),
+    })
+    .where(
+      and(
+        eq(deviceCommands.deviceId, deviceId),
+        eq(deviceCommands.status, "pending"),
+      ),
+    )
+    .returning();
+  return commands.sort(
+    (a, b) => a.createdAt.getTime() - b.createdAt.getTime() || a.id - b.id,
+  );
+}
+
 /**
  * Acknowledge a command
  */
@@ -297,9 +481,14 @@ export async function acknowledgeCommand(commandId: number) {
 }
 
 /**
- * Mark command as executed
+ * Mark a device's command as executed (or failed, with the error)
+ * Returns the updated command IDs (empty if the device has no such command)
  */
-export async function markCommandExecuted(commandId: number, error?: string) {
+export async function markCommandExecuted(
+  deviceId: string,
+  commandId: number,
+  error?: string,
+) {
   return await db
     .update(deviceCommands)
     .set({
@@ -307,7 +496,13 @@ export async function markCommandExecuted(commandId: number, error?: string) {
       executedAt: new Date(),
       error,
     })
-    .where(eq(deviceCommands.id, commandId));
+    .where(
+      and(
+        eq(deviceCommands.id, commandId),
+        eq(deviceCommands.deviceId, deviceId),
+      ),
+    )
+    .returning({ id: deviceCommands.id });
 }
 
 /**
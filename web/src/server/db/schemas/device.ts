@@ -1,5 +1,11 @@
 import { sql } from "drizzle-orm";
-import { integer, sqliteTable, text, index } from "drizzle-orm/sqlite-core";
+import {
+  integer,
+  sqliteTable,
+  text,
+  index,
+  uniqueIndex,
+} from "drizzle-orm/sqlite-core";
 
 /**
  * Device Registry Table
@@ -43,12 +49,15 @@ export const deviceData = sqliteTable(
     receivedAt: integer("received_at", { mode: "timestamp" })
       .notNull()
       .default(sql`(unixepoch())`),
+    // Client-generated ID of the report; a re-sent report is stored once
+    reportId: text("report_id"),
 
     // CPU Data
     cpuUsage: integer("cpu_usage").notNull(), // Overall CPU percentage
     cpuFreqCurrent: integer("cpu_freq_current"), // MHz
     cpuCores: integer("cpu_cores"),
     cpuPerCoreUsage: text("cpu_per_core_usage", { mode: "json" }), // Array of per-core usage
+    topProcesses: text("top_processes", { mode: "json" }), // Top-N processes by CPU, memory and I/O
 
     // Memory Data
     memoryTotal: integer("memory_total").notNull(), // GB
@@ -77,10 +86,15 @@ export const deviceData = sqliteTable(
     networkBytesReceived: integer("network_bytes_received"),
     networkPacketsSent: integer("network_packets_sent"),
     networkPacketsReceived: integer("network_packets_received"),
+    networkSendRate: integer("network_send_rate"), // bytes/s
+    networkReceiveRate: integer("network_receive_rate"), // bytes/s
 
     // Temperature Data
     temperatureInfo: text("temperature_info", { mode: "json" }), // JSON object with temp sensors
 
+    // Agent overhead (client CPU, RSS, collection and HTTP cost)
+    agentStats: text("agent_stats", { mode: "json" }),
+
     // Full data snapshot (for detailed analysis)
     fullDataSnapshot: text("full_data_snapshot", { mode: "json" }), // Complete data payload
   },
@@ -91,6 +105,81 @@ export const deviceData = sqliteTable(
       table.deviceId,
       table.timestamp,
     ),
+    deviceReportIdx: uniqueIndex("device_data_device_report_idx").on(
+      table.deviceId,
+      table.reportId,
+    ),
+  }),
+);
+
+/**
+ * Columns shared by the device_data rollup tiers
+ * One row per device and bucket; sums and sample counts (rather than
+ * averages) so buckets can be merged incrementally as reports arrive
+ */
+function rollupColumns() {
+  return {
+    id: integer("id").primaryKey({ autoIncrement: true }),
+    deviceId: text("device_id")
+      .notNull()
+      .references(() => devices.id, { onDelete: "cascade" }),
+    bucket: integer("bucket", { mode: "timestamp" }).notNull(), // Bucket start
+    samples: integer("samples").notNull(),
+
+    // CPU and memory percentages (always reported)
+    cpuMin: integer("cpu_min").notNull(),
+    cpuMax: integer("cpu_max").notNull(),
+    cpuSum: integer("cpu_sum").notNull(),
+    memoryMin: integer("memory_min").notNull(),
+    memoryMax: integer("memory_max").notNull(),
+    memorySum: integer("memory_sum").notNull(),
+
+    // Battery percentage (only from reports that had one)
+    batterySamples: integer("battery_samples").notNull().default(0),
+    batteryMin: integer("battery_min"),
+    batteryMax: integer("battery_max"),
+    batterySum: integer("battery_sum").notNull().default(0),
+
+    // Network rates in bytes/s (only from reports that had them)
+    networkSamples: integer("network_samples").notNull().default(0),
+    networkSendMin: integer("network_send_min"),
+    networkSendMax: integer("network_send_max"),
+    networkSendSum: integer("network_send_sum").notNull().default(0),
+    networkReceiveMin: integer("network_receive_min"),
+    networkReceiveMax: integer("network_receive_max"),
+    networkReceiveSum: integer("network_receive_sum").notNull().default(0),
+  };
+}
+
+/**
+ * Device Data Rollups (1 minute)
+ * Per-device minute aggregates of device_data, kept longer than raw rows
+ */
+export const deviceDataRollup1m = sqliteTable(
+  "device_data_rollup_1m",
+  rollupColumns(),
+  (table) => ({
+    deviceBucketIdx: uniqueIndex("device_data_rollup_1m_device_bucket_idx").on(
+      table.deviceId,
+      table.bucket,
+    ),
+    bucketIdx: index("device_data_rollup_1m_bucket_idx").on(table.bucket),
+  }),
+);
+
+/**
+ * Device Data Rollups (1 hour)
+ * Per-device hourly aggregates of device_data for long ranges
+ */
+export const deviceDataRollup1h = sqliteTable(
+  "device_data_rollup_1h",
+  rollupColumns(),
+  (table) => ({
+    deviceBucketIdx: uniqueIndex("device_data_rollup_1h_device_bucket_idx").on(
+      table.deviceId,
+      table.bucket,
+    ),
+    bucketIdx: index("device_data_rollup_1h_bucket_idx").on(table.bucket),
   }),
 );
 
@@ -0,0 +1,307 @@
+import { type DeviceDataRequest } from "@/lib/validations/device-data-request";
+import { type LaptopData } from "@/lib/validations/laptop";
+import { type AlertEvent } from "@/lib/validations/alert";
+import {
+  createDeviceAlert,
+  getOpenDeviceAlerts,
+  resolveDeviceAlerts,
+} from "@/server/db/queries/device";
+import { enqueueDeviceData } from "@/server/ingest/ingest-buffer";
+import { scheduleDeviceDataRetention } from "@/server/ingest/retention";
+
+/**
+ * Register/update the device and store one telemetry snapshot
+ * Resolves once the batched write containing it is committed
+ * (concurrent calls share one transaction)
+ */
+export async function storeDeviceData(body: DeviceDataRequest) {
+  const { deviceId, timestamp, hostname, reportId, data } = body;
+  scheduleDeviceDataRetention();
+
+  // 1. Register or update the device (userId is never touched here) and
+  // 2. store telemetry data with all metrics
+  await enqueueDeviceData(
+    { id: deviceId, hostname, systemInfo: data.system_info },
+    {
+      deviceId,
+      timestamp: new Date(timestamp),
+      // Older clients send no report ID; their full-precision timestamp is
+      // just as unique per report
+      reportId: reportId ?? timestamp,
+
+      // CPU metrics
+      cpuUsage: Math.round(data.cpu_info.cpu_usage_percent),
+      cpuFreqCurrent: data.cpu_info.cpu_freq_current
+        ? Math.round(data.cpu_info.cpu_freq_current)
+        : undefined,
+      cpuCores: data.cpu_info.total_cores,
+      cpuPerCoreUsage: data.cpu_info.per_cpu_usage,
+      topProcesses: data.top_processes ?? undefined,
+
+      // Memory metrics
+      memoryTotal: Math.round(data.memory_info.total_gb * 1000), // Store as MB
+      memoryUsed: Math.round(data.memory_info.used_gb * 1000),
+      memoryAvailable: Math.round(data.memory_info.available_gb * 1000),
+      memoryPercent: Math.round(data.memory_info.percent),
+
+      // Battery metrics
+      batteryPercent: data.battery_info?.percent
+        ? Math.round(data.battery_info.percent)
+        : undefined,
+      batteryPluggedIn: data.battery_info?.plugged_in,
+      batteryTimeLeft: data.battery_info?.time_left_seconds ?? undefined,
+      batteryStatus: data.battery_info?.battery_status,
+
+      // Power metrics (voltage, charging rate, capacity)
+      powerVoltage: data.power_info?.voltage_mv,
+      powerCurrentRate: data.power_info?.current_rate_mw,
+      powerRemainingCapacity: data.power_info?.remaining_capacity_mwh,
+      powerFullChargeCapacity: data.power_info?.full_charge_capacity_mwh,
+      powerDesignCapacity: data.power_info?.design_capacity_mwh,
+
+      // Disk metrics
+      diskInfo: data.disk_info,
+
+      // Network metrics
+      networkBytesSent: data.network_info.bytes_sent,
+      networkBytesReceived: data.network_info.bytes_received,
+      networkPacketsSent: data.network_info.packets_sent,
+      networkPacketsReceived: data.network_info.packets_received,
+      networkSendRate:
+        data.network_info.bytes_sent_per_sec != null
+          ? Math.round(data.network_info.bytes_sent_per_sec)
+          : undefined,
+      networkReceiveRate:
+        data.network_info.bytes_received_per_sec != null
+          ? Math.round(data.network_info.bytes_received_per_sec)
+          : undefined,
+
+      // Temperature metrics
+      temperatureInfo: data.temperature_info ?? undefined,
+
+      // Agent overhead
+      agentStats: data.agent_stats ?? undefined,
+
+      // Full data snapshot for detailed analysis
+      fullDataSnapshot: data,
+    },
+  );
+}
+
+/**
+ * Monitor device metrics and create alerts for anomalies
+ */
+export async function monitorAndCreateAlerts(deviceId: string, data: LaptopData) {
+  const alerts: Array<{
+    type: string;
+    severity: "info" | "warning" | "critical";
+    message: string;
+    value?: number;
+    threshold?: number;
+  }> = [];
+
+  // CPU alerts
+  if (data.cpu_info.cpu_usage_percent > 90) {
+    alerts.push({
+      type: "cpu_high",
+      severity: "critical",
+      message: `CPU usage critically high: ${data.cpu_info.cpu_usage_percent}%`,
+      value: data.cpu_info.cpu_usage_percent,
+      threshold: 90,
+    });
+  } else if (data.cpu_info.cpu_usage_percent > 75) {
+    alerts.push({
+      type: "cpu_high",
+      severity: "warning",
+      message: `CPU usage high: ${data.cpu_info.cpu_usage_percent}%`,
+      value: data.cpu_info.cpu_usage_percent,
+      threshold: 75,
+    });
+  }
+
+  // Memory alerts
+  if (data.memory_info.percent > 90) {
+    alerts.push({
+      type: "memory_high",
+      severity: "critical",
+      message: `Memory usage critically high: ${data.memory_info.percent}%`,
+      value: data.memory_info.percent,
+      threshold: 90,
+    });
+  } else if (data.memory_info.percent > 80) {
+    alerts.push({
+      type: "memory_high",
+      severity: "warning",
+      message: `Memory usage high: ${data.memory_info.percent}%`,
+      value: data.memory_info.percent,
+      threshold: 80,
+    });
+  }
+
+  // Battery alerts
+  if (data.battery_info && !data.battery_info.plugged_in) {
+    if (data.battery_info.percent < 10) {
+      alerts.push({
+        type: "battery_critical",
+        severity: "critical",
+        message: `Battery critically low: ${data.battery_info.percent}%`,
+        value: data.battery_info.percent,
+        threshold: 10,
+      });
+    } else if (data.battery_info.percent < 20) {
+      alerts.push({
+        type: "battery_low",
+        severity: "warning",
+        message: `Battery low: ${data.battery_info.percent}%`,
+        value: data.battery_info.percent,
+        threshold: 20,
+      });
+    }
+  }
+
+  // Disk space alerts
+  if (data.disk_info && Array.isArray(data.disk_info)) {
+    for (const disk of data.disk_info) {
+      if (disk.percent > 90) {
+        alerts.push({
+          type: "disk_full",
+          severity: "critical",
+          message: `Disk ${disk.device} almost full: ${disk.percent}%`,
+          value: disk.percent,
+          threshold: 90,
+        });
+      } else if (disk.percent > 80) {
+        alerts.push({
+          type: "disk_full",
+          severity: "warning",
+          message: `Disk ${disk.device} running low: ${disk.percent}%`,
+          value: disk.percent,
+          threshold: 80,
+        });
+      }
+    }
+  }
+
+  // Temperature alerts (if available)
+  if (data.temperature_info) {
+    for (const [sensorName, sensors] of Object.entries(data.temperature_info)) {
+      if (Array.isArray(sensors)) {
+        for (const sensor of sensors) {
+          if (sensor.current > 85) {
+            alerts.push({
+              type: "temperature_high",
+              severity: "critical",
+              message: `${sensorName} temperature critical: ${sensor.current}°C`,
+              value: sensor.current,
+              threshold: 85,
+            });
+          } else if (sensor.current > 75) {
+            alerts.push({
+              type: "temperature_high",
+              severity: "warning",
+              message: `${sensorName} temperature high: ${sensor.current}°C`,
+              value: sensor.current,
+              threshold: 75,
+            });
+          }
+        }
+      }
+    }
+  }
+
+  // Battery health alert (if power info available)
+  if (
+    data.power_info?.full_charge_capacity_mwh &&
+    data.power_info?.design_capacity_mwh
+  ) {
+    const health =
+      (data.power_info.full_charge_capacity_mwh /
+        data.power_info.design_capacity_mwh) *
+      100;
+    if (health < 60) {
+      alerts.push({
+        type: "battery_health",
+        severity: "warning",
+        message: `Battery health degraded: ${health.toFixed(1)}%`,
+        value: Math.round(health),
+        threshold: 60,
+      });
+    }
+  }
+
+  // Create alerts in database
+  for (const alert of alerts) {
+    try {
+      await createDeviceAlert({
+        deviceId,
+        alertType: alert.type,
+        severity: alert.severity,
+        message: alert.message,
+        value: alert.value,
+        threshold: alert.threshold,
+      });
+      console.log(`  ⚠️  Alert created: ${alert.message}`);
+    } catch (error) {
+      console.error("  ❌ Failed to create alert:", error);
+    }
+  }
+}
+
+/**
+ * Record alerts raised and resolved by the device's own rule engine
+ * (firing opens an alert unless one of the same type and severity is open,
+ * resolved closes it)
+ */
+export async function applyAlertEvents(deviceId: string, events: AlertEvent[]) {
+  let created = 0;
+  let resolved = 0;
+
+  // Events are applied in the order they happened on the device
+  const ordered = [...events].sort(
+    (a, b) => new Date(a.timestamp).getTime() - new Date(b.timestamp).getTime(),
+  );
+
+  // Open alerts are loaded once and kept up to date while applying the batch
+  const alertKey = (alertType: string, severity: string) =>
+    `${alertType}\u0000${severity}`;
+  const open = new Set(
+    (await getOpenDeviceAlerts(deviceId)).map((alert) =>
+      alertKey(alert.alertType, alert.severity),
+    ),
+  );
+
+  for (const event of ordered) {
+    const at = new Date(event.timestamp);
+    const key = alertKey(event.type, event.severity);
+    if (event.state === "resolved") {
+      await resolveDeviceAlerts({
+        deviceId,
+        alertType: event.type,
+        severity: event.severity,
+        resolvedAt: at,
+      });
+      open.delete(key);
+      resolved++;
+      continue;
+    }
+
+    if (open.has(key)) {
+      // Re-sent after a failed delivery, or the device restarted mid-alert
+      continue;
+    }
+    await createDeviceAlert({
+      deviceId,
+      alertType: event.type,
+      severity: event.severity,
+      message: event.message,
+      value: event.value != null ? Math.round(event.value) : undefined,
+      threshold: Math.round(event.threshold),
+      createdAt: at,
+    });
+    open.add(key);
+    created++;
+    console.log(`  ⚠️  Edge alert created: ${event.message}`);
+  }
+
+  return { created, resolved };
+}
@@ -0,0 +1,304 @@
+import {
+  type DeviceDataInput,
+  writeIngestBatch,
+} from "@/server/db/queries/device";
+
+// Telemetry waits at most this long to be written together with other devices'
+const FLUSH_INTERVAL_MS = 50;
+// A batch this big is written right away
+const MAX_BATCH_ROWS = 500;
+// Beyond this backlog new snapshots are refused (clients spool and retry)
+const MAX_QUEUE_ROWS = 20_000;
+// Flushes kept for the lag percentiles
+const LAG_SAMPLES = 256;
+
+type IngestDevice = { id: string; hostname: string; systemInfo: object };
+
+type PendingSnapshot = {
+  device: IngestDevice;
+  row: DeviceDataInput;
+  enqueuedAt: number;
+  resolve: () => void;
+  reject: (error: unknown) => void;
+};
+
+/**
+ * Thrown when the write queue is full; the request should be retried later
+ */
+export class IngestOverloadedError extends Error {
+  constructor(depth: number) {
+    super(`Ingest queue full (${depth} snapshots waiting)`);
+    this.name = "IngestOverloadedError";
+  }
+}
+
+/**
+ * Write-behind buffer for device telemetry
+ * Requests queue their snapshot and wait for the next flush, which writes
+ * every queued snapshot in one transaction: one upsert per device (skipped
+ * when hostname and system info are unchanged) and multi-row inserts
+ */
+class IngestBuffer {
+  private queue: PendingSnapshot[] = [];
+  private timer: ReturnType<typeof setTimeout> | null = null;
+  private flushing: Promise<void> | null = null;
+  // Hostname + system info last committed per device
+  private knownDevices = new Map<string, string>();
+  private lags: number[] = [];
+  private totals = {
+    rows: 0,
+    batches: 0,
+    deviceUpserts: 0,
+    deviceTouches: 0,
+    failedRows: 0,
+    // Re-sent reports that were already stored
+    duplicateRows: 0,
+  };
+  private lastFlush: {
+    at: string;
+    rows: number;
+    devices: number;
+    durationMs: number;
+    lagMs: number;
+  } | null = null;
+
+  /**
+   * Queue a snapshot; resolves once it is committed
+   */
+  enqueue(device: IngestDevice, row: DeviceDataInput): Promise<void> {
+    if (this.queue.length >= MAX_QUEUE_ROWS) {
+      return Promise.reject(new IngestOverloadedError(this.queue.length));
+    }
+    return new Promise((resolve, reject) => {
+      this.queue.push({
+        device,
+        row,
+        enqueuedAt: Date.now(),
+        resolve,
+        reject,
+      });
+      this.schedule();
+    });
+  }
+
+  private schedule() {
+    if (this.flushing) {
+      // The running flush schedules the next one when it finishes
+      return;
+    }
+    if (this.queue.length >= MAX_BATCH_ROWS) {
+      if (this.timer) clearTimeout(this.timer);
+      this.timer = setTimeout(() => void this.flush(), 0);
+    } else {
+      this.timer ??= setTimeout(() => void this.flush(), FLUSH_INTERVAL_MS);
+    }
+  }
+
+  /**
+   * Write up to one batch of queued snapshots now
+   */
+  async flush(): Promise<void> {
+    if (this.timer) {
+      clearTimeout(this.timer);
+      this.timer = null;
+    }
+    if (this.flushing) {
+      return this.flushing;
+    }
+    const batch = this.queue.splice(0, MAX_BATCH_ROWS);
+    if (batch.length === 0) {
+      return;
+    }
+
+    this.flushing = this.write(batch).finally(() => {
+      this.flushing = null;
+      if (this.queue.length > 0) {
+        this.schedule();
+      }
+    });
+    return this.flushing;
+  }
+
+  /**
+   * Write until the queue is empty
+   */
+  async drain() {
+    while (this.queue.length > 0 || this.flushing) {
+      await this.flush();
+    }
+  }
+
+  private async write(batch: PendingSnapshot[]) {
+    const started = Date.now();
+
+    // Coalesce to one device write each, from its newest snapshot
+    const latest = new Map<string, IngestDevice>();
+    for (const pending of batch) {
+      latest.set(pending.device.id, pending.device);
+    }
+    const upserts: IngestDevice[] = [];
+    const touched: string[] = [];
+    const signatures = new Map<string, string>();
+    for (const device of latest.values()) {
+      const signature = JSON.stringify([device.hostname, device.systemInfo]);
+      if (this.knownDevices.get(device.id) === signature) {
+        touched.push(device.id);
+      } else {
+        upserts.push(device);
+        signatures.set(device.id, signature);
+      }
+    }
+
+    let duplicates: number;
+    try {
+      duplicates = await writeIngestBatch({
+        upserts,
+        touched,
+        rows: batch.map((pending) => pending.row),
+        seenAt: new Date(),
+      });
+    } catch (error) {
+      console.error(
+        `❌ Ingest batch of ${batch.length} snapshot(s) failed, retrying one by one:`,
+        error,
+      );
+      await this.writeEach(batch);
+      return;
+    }
+
+    for (const [id, signature] of signatures) {
+      this.knownDevices.set(id, signature);
+    }
+    this.recordFlush(batch, latest.size, started, duplicates);
+    this.totals.deviceUpserts += upserts.length;
+    this.totals.deviceTouches += touched.length;
+    for (const pending of batch) {
+      pending.resolve();
+    }
+  }
+
+  /**
+   * Fallback after a failed batch: one transaction per snapshot, so a single
+   * bad snapshot (or a device deleted meanwhile) only fails its own request
+   */
+  private async writeEach(batch: PendingSnapshot[]) {
+    for (const pending of batch) {
+      const started = Date.now();
+      const { device } = pending;
+      this.knownDevices.delete(device.id);
+      let duplicates: number;
+      try {
+        duplicates = await writeIngestBatch({
+          upserts: [device],
+          touched: [],
+          rows: [pending.row],
+          seenAt: new Date(),
+        });
+      } catch (error) {
+        this.totals.failedRows++;
+        pending.reject(error);
+        continue;
+      }
+      this.knownDevices.set(
+        device.id,
+        JSON.stringify([device.hostname, device.systemInfo]),
+      );
+      this.recordFlush([pending], 1, started, duplicates);
+      this.totals.deviceUpserts++;
+      pending.resolve();
+    }
+  }
+
+  private recordFlush(
+    batch: PendingSnapshot[],
+    devices: number,
+    started: number,
+    duplicates: number,
+  ) {
+    const now = Date.now();
+    if (duplicates > 0) {
+      // Already stored: the device re-sent a report it didn't get an answer for
+      console.log(`🔁 Skipped ${duplicates} re-sent snapshot(s)`);
+      this.totals.duplicateRows += duplicates;
+    }
+    // Lag: how long the oldest snapshot of the batch waited to be committed
+    const lagMs = now - batch[0]!.enqueuedAt;
+    this.lags.push(lagMs);
+    if (this.lags.length > LAG_SAMPLES) {
+      this.lags.shift();
+    }
+    this.totals.rows += batch.length;
+    this.totals.batches++;
+    this.lastFlush = {
+      at: new Date(now).toISOString(),
+      rows: batch.length,
+      devices,
+      durationMs: now - started,
+      lagMs,
+    };
+  }
+
+  /**
+   * Queue depth, flush lag and write counters
+   */
+  getStats() {
+    const sorted = [...this.lags].sort((a, b) => a - b);
+    const percentile = (pct: number) =>
+      sorted.length > 0
+        ? sorted[
+            Math.min(sorted.length - 1, Math.floor((sorted.length * pct) / 100))
+          ]
+        : null;
+    return {
+      queueDepth: this.queue.length,
+      oldestQueuedMs:
+        this.queue.length > 0 ? Date.now() - this.queue[0]!.enqueuedAt : 0,
+      flushing: this.flushing !== null,
+      flushLagMs: {
+        p50: percentile(50),
+        p95: percentile(95),
+        max: sorted.length > 0 ? sorted[sorted.length - 1] : null,
+      },
+      lastFlush: this.lastFlush,
+      totals: { ...this.totals },
+      knownDevices: this.knownDevices.size,
+      config: {
+        flushIntervalMs: FLUSH_INTERVAL_MS,
+        maxBatchRows: MAX_BATCH_ROWS,
+        maxQueueRows: MAX_QUEUE_ROWS,
+      },
+    };
+  }
+}
+
+// One buffer per server process, kept across hot reloads in dev
+const globalForIngest = globalThis as unknown as {
+  ingestBuffer: IngestBuffer | undefined;
+};
+
+const ingestBuffer = (globalForIngest.ingestBuffer ??= new IngestBuffer());
+
+/**
+ * Queue a snapshot for the next batched write; resolves once it is committed
+ * Rejects with IngestOverloadedError when the backlog is full
+ */
+export function enqueueDeviceData(
+  device: IngestDevice,
+  row: DeviceDataInput,
+): Promise<void> {
+  return ingestBuffer.enqueue(device, row);
+}
+
+/**
+ * Write everything queued right away (e.g., before shutdown)
+ */
+export function flushDeviceData(): Promise<void> {
+  return ingestBuffer.drain();
+}
+
+/**
+ * Ingest queue depth, flush lag and write counters
+ */
+export function getIngestStats() {
+  return ingestBuffer.getStats();
+}
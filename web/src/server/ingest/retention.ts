@@ -0,0 +1,57 @@
+import { applyDeviceDataRetention } from "@/server/db/queries/device-rollup";
+
+// First pass shortly after the server starts taking telemetry, then hourly
+const FIRST_RUN_DELAY_MS = 60 * 1000;
+const RUN_INTERVAL_MS = 60 * 60 * 1000;
+
+// One schedule per server process, kept across hot reloads in dev
+const globalForRetention = globalThis as unknown as {
+  retentionTimer: ReturnType<typeof setTimeout> | undefined;
+  retentionRunning: boolean | undefined;
+};
+
+/**
+ * Run the retention policy once (skipped if a run is still in progress)
+ */
+export async function runDeviceDataRetention() {
+  if (globalForRetention.retentionRunning) {
+    return null;
+  }
+  globalForRetention.retentionRunning = true;
+  try {
+    const started = Date.now();
+    const result = await applyDeviceDataRetention();
+    const rollups = Object.values(result.rollupsDeleted).reduce(
+      (total, count) => total + count,
+      0,
+    );
+    if (result.compacted || result.rawDeleted || rollups) {
+      console.log(
+        `🧹 Retention: compacted ${result.compacted}, deleted ${result.rawDeleted} raw and ${rollups} rollup row(s) in ${Date.now() - started} ms`,
+      );
+    }
+    return result;
+  } catch (error) {
+    console.error("❌ Retention run failed:", error);
+    return null;
+  } finally {
+    globalForRetention.retentionRunning = false;
+  }
+}
+
+/**
+ * Start the periodic retention runs (no-op once scheduled)
+ */
+export function scheduleDeviceDataRetention() {
+  if (globalForRetention.retentionTimer) {
+    return;
+  }
+  const run = (delay: number) => {
+    globalForRetention.retentionTimer = setTimeout(() => {
+      void runDeviceDataRetention().finally(() => run(RUN_INTERVAL_MS));
+    }, delay);
+    // Never keep the process alive just for retention
+    globalForRetention.retentionTimer.unref?.();
+  };
+  run(FIRST_RUN_DELAY_MS);
+}
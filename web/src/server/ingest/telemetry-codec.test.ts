@@ -0,0 +1,45 @@
+import { describe, expect, it } from "vitest";
+import { decodeTelemetry } from "./telemetry-codec";
+
+const envelope = (deviceId: string, seq: number) => ({
+  deviceId,
+  timestamp: "2026-01-01T00:00:00",
+  hostname: "laptop",
+  seq,
+});
+
+describe("decodeTelemetry", () => {
+  it("keeps edgeAlerts on keyframes and deltas", () => {
+    const deviceId = "codec-edge-alerts";
+    const keyframe = decodeTelemetry({
+      ...envelope(deviceId, 1),
+      encoding: "keyframe",
+      edgeAlerts: true,
+      data: { cpu_info: { cpu_usage_percent: 10, cores: 8 } },
+    });
+    expect(keyframe.body).toMatchObject({ deviceId, edgeAlerts: true });
+    keyframe.commit();
+
+    const delta = decodeTelemetry({
+      ...envelope(deviceId, 2),
+      encoding: "delta",
+      baseSeq: 1,
+      edgeAlerts: true,
+      delta: { changed: { cpu_info: { cpu_usage_percent: 20 } }, removed: [] },
+    });
+    expect(delta.body).toMatchObject({
+      deviceId,
+      edgeAlerts: true,
+      data: { cpu_info: { cpu_usage_percent: 20, cores: 8 } },
+    });
+  });
+
+  it("leaves edgeAlerts unset when the device doesn't evaluate alerts", () => {
+    const { body } = decodeTelemetry({
+      ...envelope("codec-server-alerts", 1),
+      encoding: "keyframe",
+      data: {},
+    });
+    expect((body as { edgeAlerts?: boolean }).edgeAlerts).toBeUndefined();
+  });
+});
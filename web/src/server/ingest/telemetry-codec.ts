@@ -0,0 +1,171 @@
+import { gunzipSync } from "node:zlib";
+import { type NextRequest } from "next/server";
+import { decodeMsgpack } from "@/lib/msgpack";
+import {
+  TelemetryEnvelopeSchema,
+  type TelemetryDelta,
+} from "@/lib/validations/telemetry-envelope";
+
+type JsonObject = Record<string, unknown>;
+
+/**
+ * Headers advertising the compact encodings and features this server understands
+ * Clients switch to gzip/delta/MessagePack payloads once they see them
+ */
+export const TELEMETRY_RESPONSE_HEADERS = {
+  "Accept-Encoding": "gzip",
+  "Accept-Post": "application/json, application/msgpack",
+  "X-Telemetry-Delta": "1",
+  // Alerts evaluated on the device are accepted at /api/devices/{id}/alerts
+  "X-Edge-Alerts": "1",
+};
+
+const MSGPACK_CONTENT_TYPES = ["application/msgpack", "application/x-msgpack"];
+
+// Decompressed bodies larger than this are rejected
+const MAX_BODY_BYTES = 10 * 1024 * 1024;
+
+/**
+ * Thrown when a delta arrives without a matching base snapshot
+ * (e.g., after a server restart); the client must resend a keyframe
+ */
+export class KeyframeRequiredError extends Error {
+  constructor(deviceId: string) {
+    super(`Keyframe required for device ${deviceId}`);
+    this.name = "KeyframeRequiredError";
+  }
+}
+
+// Delta bases kept at most (least recently used devices are dropped first)
+const MAX_TELEMETRY_BASES = 10_000;
+// A base unused for this long is dropped; the device resends a keyframe
+const TELEMETRY_BASE_TTL_MS = 60 * 60 * 1000;
+
+type TelemetryBase = { seq: number; data: JsonObject; usedAt: number };
+
+// Last stored snapshot per device, in least recently used order
+// (kept across hot reloads in dev)
+const globalForTelemetry = globalThis as unknown as {
+  telemetryBases: Map<string, TelemetryBase> | undefined;
+};
+
+const telemetryBases = (globalForTelemetry.telemetryBases ??= new Map());
+
+function getTelemetryBase(deviceId: string): TelemetryBase | undefined {
+  const base = telemetryBases.get(deviceId);
+  if (!base) {
+    return undefined;
+  }
+  telemetryBases.delete(deviceId);
+  if (Date.now() - base.usedAt > TELEMETRY_BASE_TTL_MS) {
+    return undefined;
+  }
+  base.usedAt = Date.now();
+  telemetryBases.set(deviceId, base);
+  return base;
+}
+
+function setTelemetryBase(deviceId: string, seq: number, data: JsonObject) {
+  telemetryBases.delete(deviceId);
+  telemetryBases.set(deviceId, { seq, data, usedAt: Date.now() });
+  for (const oldest of telemetryBases.keys()) {
+    if (telemetryBases.size <= MAX_TELEMETRY_BASES) break;
+    telemetryBases.delete(oldest);
+  }
+}
+
+/**
+ * Read a JSON or MessagePack request body (chosen by Content-Type),
+ * decompressing it first if Content-Encoding is gzip
+ */
+export async function readTelemetryBody(req: NextRequest): Promise<unknown> {
+  const encoding = req.headers.get("content-encoding")?.toLowerCase();
+  const contentType = req.headers
+    .get("content-type")
+    ?.split(";")[0]
+    ?.trim()
+    .toLowerCase();
+
+  let body: Buffer = Buffer.from(await req.arrayBuffer());
+  if (encoding === "gzip") {
+    body = gunzipSync(body, { maxOutputLength: MAX_BODY_BYTES });
+  }
+
+  if (contentType && MSGPACK_CONTENT_TYPES.includes(contentType)) {
+    return decodeMsgpack(body);
+  }
+  return JSON.parse(body.toString("utf8")) as unknown;
+}
+
+function isObject(value: unknown): value is JsonObject {
+  return typeof value === "object" && value !== null && !Array.isArray(value);
+}
+
+/**
+ * Apply a delta produced by the desktop client's diff_snapshots
+ */
+function applyDelta(base: JsonObject, delta: TelemetryDelta): JsonObject {
+  const result = structuredClone(base);
+
+  const merge = (target: JsonObject, changed: JsonObject) => {
+    for (const [key, value] of Object.entries(changed)) {
+      const current = target[key];
+      if (isObject(value) && isObject(current)) {
+        merge(current, value);
+      } else {
+        target[key] = value;
+      }
+    }
+  };
+  merge(result, delta.changed);
+
+  for (const path of delta.removed) {
+    let parent: unknown = result;
+    for (const key of path.slice(0, -1)) {
+      parent = isObject(parent) ? parent[key] : undefined;
+    }
+    const last = path[path.length - 1];
+    if (isObject(parent) && last !== undefined) {
+      delete parent[last];
+    }
+  }
+
+  return result;
+}
+
+/**
+ * Turn a (possibly compact) request body into the regular
+ * { deviceId, timestamp, hostname, reportId, edgeAlerts, data } shape
+ * Plain requests without an "encoding" field are passed through unchanged
+ * Call commit() once the snapshot is stored: only then does it become the
+ * base for the device's next delta (the client also only advances on success)
+ */
+export function decodeTelemetry(body: unknown): {
+  body: unknown;
+  commit: () => void;
+} {
+  if (!isObject(body) || body.encoding === undefined) {
+    return { body, commit: () => undefined };
+  }
+
+  const envelope = TelemetryEnvelopeSchema.parse(body);
+  const { deviceId, timestamp, hostname, seq, reportId, edgeAlerts } =
+    envelope;
+
+  let data: JsonObject;
+  if (envelope.encoding === "keyframe") {
+    data = envelope.data;
+  } else {
+    const base = getTelemetryBase(deviceId);
+    if (!base || base.seq !== envelope.baseSeq) {
+      throw new KeyframeRequiredError(deviceId);
+    }
+    data = applyDelta(base.data, envelope.delta);
+  }
+
+  return {
+    // edgeAlerts tells the route the device already evaluated its alerts
+    body: { deviceId, timestamp, hostname, reportId, edgeAlerts, data },
+    commit: () => setTelemetryBase(deviceId, seq, data),
+  };
+}